@@ -0,0 +1,74 @@
+"""
+Benchmark the storage backends of ``Cards``.
+
+Usage: ``python benchmarks/bench_backends.py [users] [cards_per_user]``
+
+Reports per-operation latency of ``put``/``get``/``delete`` and the throughput
+of ``putmany``/``iterate`` for every backend, on a temporary directory.
+"""
+
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from diceutils.backends import DbmBackend, MemoryBackend
+from diceutils.cards import CardsManager
+
+import statistics
+import sys
+import tempfile
+import time
+
+BACKENDS: Dict[str, Callable[[Path], object]] = {
+    "sqlite": lambda path: CardsManager(path / "cards.db"),
+    "memory": lambda path: MemoryBackend(path / "cards.json"),
+    "dbm": lambda path: DbmBackend(path / "cards"),
+}
+
+
+def latency(func: Callable[[str], object], user_ids: List[str]) -> str:
+    timings = []
+    for user_id in user_ids:
+        start = time.perf_counter()
+        func(user_id)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    median = statistics.median(timings) * 1e6
+    p99 = timings[int(len(timings) * 0.99) - 1] * 1e6
+    return f"{median:9.1f} {p99:9.1f}"
+
+
+def throughput(func: Callable[[], int]) -> str:
+    start = time.perf_counter()
+    count = func()
+    return f"{count / (time.perf_counter() - start):12.0f}"
+
+
+def bench(name: str, users: int, cards_per_user: int) -> str:
+    cards = [{"name": f"card {index}", "str": 60, "dex": 50} for index in range(cards_per_user)]
+    user_ids = [str(user_id) for user_id in range(users)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        backend = BACKENDS[name](Path(directory))
+        put = latency(lambda user_id: backend.put(user_id, cards, 0), user_ids)
+        get = latency(backend.get, user_ids)
+        many = throughput(
+            lambda: backend.putmany((f"m{user_id}", cards, 0) for user_id in user_ids)
+        )
+        scan = throughput(lambda: sum(1 for _ in backend.iterate()))
+        delete = latency(backend.delete, user_ids)
+        backend.close()
+    return f"{name:8} {put} {get} {delete} {many} {scan}"
+
+
+def main(users: int = 2000, cards_per_user: int = 3) -> None:
+    print(f"{users} users, {cards_per_user} cards each, latency in µs (median p99)")
+    print(
+        f"{'backend':8} {'put':>19} {'get':>19} {'delete':>19} "
+        f"{'putmany/s':>12} {'iterate/s':>12}"
+    )
+    for name in BACKENDS:
+        print(bench(name, users, cards_per_user))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
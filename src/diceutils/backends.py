@@ -0,0 +1,359 @@
+"""
+@author         :     苏向夜 <fu050409@163.com>
+@date           :     Oct. 19th, 2026.
+@description    :     This Module Provides Pluggable Storage Backends for Cards.
+"""
+
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Protocol,
+    Set,
+    Tuple,
+    Union,
+    runtime_checkable,
+)
+
+from diceutils.cards import BATCH_SIZE, MAX_CARDS_PER_USER
+from diceutils.exceptions import TooManyCardsError
+
+import abc
+import dbm
+import json
+import os
+import threading
+
+SNAPSHOT_INTERVAL = 60.0
+"""Seconds between snapshots of ``MemoryBackend``."""
+
+UserCards = Tuple[str, List[Dict[str, Any]], int]
+
+
+@runtime_checkable
+class CardsBackend(Protocol):
+    """Storage interface of ``Cards``, keyed by user.
+
+    ``diceutils.cards.CardsManager`` is the SQLite implementation, see
+    ``MemoryBackend`` and ``DbmBackend`` for the others. ``BaseCardsBackend``
+    provides ``save``, ``load`` and the change detection methods on top of
+    the per-user ones.
+    """
+
+    def get(self, user_id: str) -> Tuple[List[Dict[str, Any]], int]:
+        """Get ``(cards, selected_card)`` of a user, ``([], 0)`` if missing."""
+        ...
+
+    def put(
+        self, user_id: str, cards: List[Dict[str, Any]], selected_card: int = 0
+    ) -> None:
+        """Replace all cards of a user."""
+        ...
+
+    def delete(self, user_id: str) -> None:
+        """Delete all cards of a user."""
+        ...
+
+    def iterate(self, batch_size: int = BATCH_SIZE) -> Iterator[UserCards]:
+        """Iterate ``(user_id, cards, selected_card)`` of every user."""
+        ...
+
+    def putmany(self, rows: Iterable[UserCards]) -> int:
+        """Replace cards of many users at once."""
+        ...
+
+    def save(
+        self, cards: Dict[str, List[Dict[str, Any]]], selected_cards: Dict[str, int]
+    ) -> None:
+        """Save the cards of every user, deleting users left out."""
+        ...
+
+    def load(
+        self, target: str = "*"
+    ) -> Tuple[
+        Union[Dict[str, Any], List[Dict[str, Any]]], Union[Dict[str, int], int]
+    ]:
+        """Load ``(cards, selected_cards)`` of every user, or of the user ``target``."""
+        ...
+
+    def changed(self) -> bool:
+        """Check whether another process may have written since the last check."""
+        ...
+
+    def changes(self) -> List[UserCards]:
+        """Users written by another process since the last save, load or changes."""
+        ...
+
+    def removed(self, user_ids: Iterable[str]) -> List[str]:
+        """Which of ``user_ids`` another process deleted, noticed by ``changes``."""
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+class BaseCardsBackend(metaclass=abc.ABCMeta):
+    """Base class for key-value backends.
+
+    Subclasses implement the ``CardsBackend`` methods, this class provides the
+    ``save``/``load`` interface ``Cards`` expects from its cards manager on top
+    of them, writing only the users changed since the last save. Users written
+    directly through ``putmany`` are handed to ``Cards.sync`` by ``changes``.
+    """
+
+    def __init__(self, max_cards_per_user: Union[int, str] = MAX_CARDS_PER_USER):
+        self.max_cards_per_user = int(max_cards_per_user)
+        self._saved: Dict[str, Tuple[str, int]] = {}
+        self._written: Set[str] = set()
+        self._written_lock = threading.Lock()
+
+    @abc.abstractmethod
+    def get(self, user_id: str) -> Tuple[List[Dict[str, Any]], int]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def put(
+        self, user_id: str, cards: List[Dict[str, Any]], selected_card: int = 0
+    ) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete(self, user_id: str) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def iterate(self, batch_size: int = BATCH_SIZE) -> Iterator[UserCards]:
+        raise NotImplementedError
+
+    def putmany(self, rows: Iterable[UserCards]) -> int:
+        rows = list(rows)
+        count = self._putmany(rows)
+        with self._written_lock:
+            self._written.update(user_id for user_id, _, _ in rows)
+        return count
+
+    def _putmany(self, rows: List[UserCards]) -> int:
+        for _, cards, _ in rows:
+            self._check(cards)
+        for user_id, cards, selected_card in rows:
+            self.put(user_id, cards, selected_card)
+        return len(rows)
+
+    def close(self) -> None:
+        pass
+
+    def _check(self, cards: List[Dict[str, Any]]) -> None:
+        if len(cards) > self.max_cards_per_user:
+            raise TooManyCardsError("Exceeded maximum allowed cards per user")
+
+    @staticmethod
+    def _dumps(cards: List[Dict[str, Any]], selected_card: int) -> str:
+        return json.dumps(
+            {"cards": cards, "selected": selected_card}, ensure_ascii=False
+        )
+
+    @staticmethod
+    def _loads(value: Union[str, bytes]) -> Tuple[List[Dict[str, Any]], int]:
+        data = json.loads(value)
+        return data["cards"], data["selected"]
+
+    def save(
+        self, cards: Dict[str, List[Dict[str, Any]]], selected_cards: Dict[str, int]
+    ) -> None:
+        """Save user cards data, writing only changed users."""
+        saved = {}
+        for user_id, card_data in cards.items():
+            self._check(card_data)
+            selected_card = selected_cards.get(user_id) or 0
+            row = (json.dumps(card_data, ensure_ascii=False), selected_card)
+            if self._saved.get(user_id) != row:
+                saved[user_id] = row
+        removed = [user_id for user_id in self._saved if user_id not in cards]
+
+        self._putmany(
+            [
+                (user_id, cards[user_id], selected_card)
+                for user_id, (_, selected_card) in saved.items()
+            ]
+        )
+        for user_id in removed:
+            self.delete(user_id)
+        self._saved.update(saved)
+        for user_id in removed:
+            del self._saved[user_id]
+
+    def load(
+        self, target: str = "*"
+    ) -> Tuple[
+        Union[Dict[str, Any], List[Dict[str, Any]]], Union[Dict[str, int], int]
+    ]:
+        """Load user cards data, see ``CardsManager.load``."""
+        if target == "*":
+            datas, selected_cards = {}, {}
+            self._saved = {}
+            for user_id, cards, selected_card in self.iterate():
+                datas[user_id] = cards
+                selected_cards[user_id] = selected_card
+                self._saved[user_id] = (
+                    json.dumps(cards, ensure_ascii=False),
+                    selected_card,
+                )
+            return datas, selected_cards
+
+        cards, selected_card = self.get(target)
+        if cards:
+            self._saved[target] = (json.dumps(cards, ensure_ascii=False), selected_card)
+        return cards, selected_card
+
+    def changed(self) -> bool:
+        """Check whether ``putmany`` wrote users since the last ``changes``.
+
+        Key-value backends are private to a process, only direct writes such
+        as ``Cards.import_ndjson`` bypass the ``Cards`` copy.
+        """
+        return bool(self._written)
+
+    def changes(self) -> List[UserCards]:
+        """Users written by ``putmany`` since the last call."""
+        with self._written_lock:
+            written, self._written = self._written, set()
+        rows = []
+        for user_id in written:
+            cards, selected_card = self.get(user_id)
+            if cards:
+                self._saved[user_id] = (
+                    json.dumps(cards, ensure_ascii=False),
+                    selected_card,
+                )
+                rows.append((user_id, cards, selected_card))
+        return rows
+
+    def removed(self, user_ids: Iterable[str]) -> List[str]:
+        return []
+
+
+class MemoryBackend(BaseCardsBackend):
+    """Cards kept in a dict, optionally snapshotted to a JSON file.
+
+    A snapshot is written ``snapshot_interval`` seconds after the first
+    unsnapshotted write and on ``close``, and loaded back on creation.
+    """
+
+    def __init__(
+        self,
+        snapshot_path: Optional[Union[str, Path]] = None,
+        snapshot_interval: float = SNAPSHOT_INTERVAL,
+        max_cards_per_user: Union[int, str] = MAX_CARDS_PER_USER,
+    ):
+        super().__init__(max_cards_per_user)
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.data: Dict[str, str] = {}
+        self.lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+
+        if snapshot_path is not None and os.path.exists(snapshot_path):
+            with open(snapshot_path, "r", encoding="utf-8") as file:
+                self.data = json.load(file)
+
+    def get(self, user_id: str) -> Tuple[List[Dict[str, Any]], int]:
+        value = self.data.get(user_id)
+        return self._loads(value) if value is not None else ([], 0)
+
+    def put(
+        self, user_id: str, cards: List[Dict[str, Any]], selected_card: int = 0
+    ) -> None:
+        self._check(cards)
+        with self.lock:
+            self.data[user_id] = self._dumps(cards, selected_card)
+            self._schedule()
+
+    def delete(self, user_id: str) -> None:
+        with self.lock:
+            if self.data.pop(user_id, None) is not None:
+                self._schedule()
+
+    def iterate(self, batch_size: int = BATCH_SIZE) -> Iterator[UserCards]:
+        for user_id, value in list(self.data.items()):
+            yield (user_id, *self._loads(value))
+
+    def _schedule(self) -> None:
+        if self.snapshot_path is None or self._timer is not None:
+            return
+        self._timer = threading.Timer(self.snapshot_interval, self.snapshot)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def snapshot(self) -> None:
+        """Write the cards to the snapshot file atomically."""
+        if self.snapshot_path is None:
+            return
+        with self.lock:
+            self._timer = None
+            data = dict(self.data)
+        temp_path = f"{self.snapshot_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False)
+        os.replace(temp_path, self.snapshot_path)
+
+    def close(self) -> None:
+        with self.lock:
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+        self.snapshot()
+
+
+class DbmBackend(BaseCardsBackend):
+    """Cards kept in a ``dbm`` key-value file, one JSON value per user."""
+
+    def __init__(
+        self,
+        db_path: Union[str, Path],
+        max_cards_per_user: Union[int, str] = MAX_CARDS_PER_USER,
+    ):
+        super().__init__(max_cards_per_user)
+        self.db_path = db_path
+        self.db = dbm.open(str(db_path), "c")
+        self.lock = threading.RLock()
+
+    def get(self, user_id: str) -> Tuple[List[Dict[str, Any]], int]:
+        with self.lock:
+            value = self.db.get(user_id.encode())
+        return self._loads(value) if value is not None else ([], 0)
+
+    def put(
+        self, user_id: str, cards: List[Dict[str, Any]], selected_card: int = 0
+    ) -> None:
+        self._check(cards)
+        with self.lock:
+            self.db[user_id.encode()] = self._dumps(cards, selected_card).encode()
+
+    def delete(self, user_id: str) -> None:
+        with self.lock:
+            if user_id.encode() in self.db:
+                del self.db[user_id.encode()]
+
+    def iterate(self, batch_size: int = BATCH_SIZE) -> Iterator[UserCards]:
+        with self.lock:
+            keys = list(self.db.keys())
+        for key in keys:
+            with self.lock:
+                value = self.db.get(key)
+            if value is not None:
+                yield (key.decode(), *self._loads(value))
+
+    def _putmany(self, rows: List[UserCards]) -> int:
+        count = super()._putmany(rows)
+        with self.lock:
+            if hasattr(self.db, "sync"):
+                self.db.sync()
+        return count
+
+    def close(self) -> None:
+        with self.lock:
+            self.db.close()
@@ -6,16 +6,74 @@
                       Database Connection Functions for Cards Management. 
 """
 
+import json
+import os
 import pickle
 import sqlite3
+import threading
+import time
+import weakref
 
+from contextlib import contextmanager
 from pathlib import Path
 from functools import wraps
-from typing import Dict, Any, List, Optional, Set, Union
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Dict,
+    Any,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
+from diceutils.charactors import Template
+from diceutils.database import (
+    POOL_IDLE_TIMEOUT,
+    POOL_MAX_SIZE,
+    ConnectionPool,
+    expired,
+)
 from diceutils.exceptions import TooManyCardsError, UnkownMode
 
+if TYPE_CHECKING:
+    from diceutils.backends import CardsBackend
+
 MAX_CARDS_PER_USER = 9
+BATCH_SIZE = 500
+"""Users fetched or written per batch when streaming cards."""
+
+QUERY_OPERATORS = ("=", "!=", "<", "<=", ">", ">=", "LIKE", "IN")
+"""Comparison operators accepted by card attribute queries."""
+
+LOCK_STRIPES = 64
+"""Locks shared by users of one ``Cards``, users hashing alike share a lock."""
+
+_UPSERT = """
+    INSERT INTO user_cards (user_id, card_data, selected_card, version)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (user_id) DO UPDATE SET
+        card_data = excluded.card_data,
+        selected_card = excluded.selected_card,
+        version = excluded.version
+"""
+
+
+def update_card(
+    cards: List[Dict[str, Any]], index: int, attributes: Dict[str, Any]
+) -> None:
+    """Update the card at ``index`` in place, appending a card past the end."""
+    if len(cards) == 0:
+        cards.append(attributes)
+    if index > len(cards) - 1:
+        cards.append(attributes)
+    else:
+        cards[index].update(attributes)
 
 
 class CachedProperty:
@@ -23,7 +81,7 @@ class CachedProperty:
 
     def __init__(self, func):
         self.func = func
-        self.cache = {}
+        self.cache = weakref.WeakKeyDictionary()
 
     def __get__(self, instance, owner):
         if instance is None:
@@ -33,6 +91,27 @@ class CachedProperty:
         return self.cache[instance]
 
 
+class LockStripes:
+    """A fixed set of re-entrant locks picked by the hash of a key."""
+
+    def __init__(self, stripes: int = LOCK_STRIPES):
+        self._locks = [threading.RLock() for _ in range(stripes)]
+        self._held = threading.local()
+
+    @contextmanager
+    def __call__(self, key: str) -> Iterator[None]:
+        with self._locks[hash(key) % len(self._locks)]:
+            self._held.count = getattr(self._held, "count", 0) + 1
+            try:
+                yield
+            finally:
+                self._held.count -= 1
+
+    def held(self) -> bool:
+        """Check whether the current thread holds any of the locks."""
+        return getattr(self._held, "count", 0) > 0
+
+
 def cached_method(func):
     """A decorator for caching method results."""
 
@@ -51,9 +130,36 @@ def cached_method(func):
     return wrapper
 
 
+def uncached_method(func):
+    """A decorator excluding a method from ``CardsManagerMeta`` caching."""
+    func.__uncached__ = True
+    return func
+
+
 class CardsPool(object):
+    """Cards of every registered mode.
+
+    Modes unused for ``idle_timeout`` seconds, and the least recently used
+    ones beyond ``max_size``, are dropped from the pool and reopened on their
+    next access. Dropped cards are closed once no caller holds them, and
+    handed out again if their mode is accessed before that.
+    """
+
     _cards_pool = {}
     _cache_cards_pool = {}
+    _evicted: "weakref.WeakValueDictionary[str, Cards]" = weakref.WeakValueDictionary()
+    _evicted_cache: "weakref.WeakValueDictionary[str, Cards]" = (
+        weakref.WeakValueDictionary()
+    )
+    _shared_pool: Optional[ConnectionPool] = None
+    _shared_cache_pool: Optional[ConnectionPool] = None
+    # Every registered mode with its ``normalized`` flag, open or not, and
+    # the last access of the open ones.
+    _registered: Dict[str, bool] = {}
+    _last_access: Dict[str, float] = {}
+    _lock = threading.RLock()
+    max_size: int = POOL_MAX_SIZE
+    idle_timeout: float = POOL_IDLE_TIMEOUT
 
     @CachedProperty
     def cards_pool(self):
@@ -70,21 +176,125 @@ class CardsPool(object):
         return self._cards_pool.__repr__()
 
     @staticmethod
-    def register(mode_name: str):
-        if mode_name not in CardsPool._cards_pool.keys():
-            CardsPool._cards_pool[mode_name] = Cards(mode=mode_name, store=True)
-            CardsPool._cache_cards_pool[mode_name] = Cards(mode=mode_name)
+    def share(db_path: Union[str, Path] = "cards.db"):
+        """Store every mode registered afterwards in one shared database.
+
+        All modes then live in the normalized layout keyed by mode, sharing a
+        single connection pool and page cache instead of a file per mode.
+        Cache cards of all modes share one in-memory database likewise.
+        """
+        CardsPool._shared_pool = ConnectionPool(db_path)
+        CardsPool._shared_cache_pool = ConnectionPool()
+
+    @staticmethod
+    def register(mode_name: str, normalized: bool = False):
+        with CardsPool._lock:
+            if mode_name not in CardsPool._registered:
+                CardsPool._registered[mode_name] = normalized
+            if mode_name not in CardsPool._cards_pool.keys():
+                CardsPool._open(mode_name)
+            CardsPool._touch(mode_name)
+
+    @staticmethod
+    def _open(mode_name: str) -> None:
+        cards = CardsPool._evicted.pop(mode_name, None)
+        if cards is None:
+            cards = CardsPool._closing(CardsPool._create(mode_name))
+        CardsPool._cards_pool[mode_name] = cards
+        if mode_name not in CardsPool._cache_cards_pool:
+            cache = CardsPool._evicted_cache.pop(mode_name, None)
+            if cache is None:
+                cache = CardsPool._closing(CardsPool._create_cache(mode_name))
+            CardsPool._cache_cards_pool[mode_name] = cache
+
+    @staticmethod
+    def _create(mode_name: str) -> "Cards":
+        if CardsPool._shared_pool is not None:
+            cards = NormalizedCards(mode=mode_name, pool=CardsPool._shared_pool)
+            if os.path.exists(f"{mode_name}.db"):
+                cards.cards_manager.migrate_once(f"{mode_name}.db")
+            return cards
+        cards_class = NormalizedCards if CardsPool._registered[mode_name] else Cards
+        return cards_class(mode=mode_name, store=True)
+
+    @staticmethod
+    def _create_cache(mode_name: str) -> "Cards":
+        if CardsPool._shared_pool is not None:
+            return NormalizedCards(mode=mode_name, pool=CardsPool._shared_cache_pool)
+        return Cards(mode=mode_name)
+
+    @staticmethod
+    def _closing(cards: "Cards") -> "Cards":
+        """Close the manager of ``cards`` once ``cards`` is garbage collected."""
+        weakref.finalize(cards, cards.cards_manager.close)
+        return cards
+
+    @staticmethod
+    def _touch(mode_name: str) -> None:
+        CardsPool._last_access[mode_name] = time.monotonic()
+        for name in expired(
+            CardsPool._last_access, CardsPool.max_size, CardsPool.idle_timeout
+        ):
+            if name != mode_name:
+                CardsPool.evict(name)
+
+    @staticmethod
+    def evict(mode_name: str) -> None:
+        """Save the cards of a mode and drop them, they reopen on next access.
+
+        Cards still held by a caller stay open until released. In-memory
+        cache cards are only dropped once empty, closing would lose them.
+        """
+        with CardsPool._lock:
+            CardsPool._last_access.pop(mode_name, None)
+            cards = CardsPool._cards_pool.pop(mode_name, None)
+            if cards is not None:
+                cards.save()
+                CardsPool._evicted[mode_name] = cards
+            cache = CardsPool._cache_cards_pool.get(mode_name)
+            if cache is not None and (isinstance(cache, NormalizedCards) or not cache.data):
+                CardsPool._evicted_cache[mode_name] = cache
+                del CardsPool._cache_cards_pool[mode_name]
 
     @staticmethod
     def get(mode_name: str) -> Optional["Cards"]:
-        return CardsPool._cards_pool.get(mode_name)
+        with CardsPool._lock:
+            if mode_name not in CardsPool._registered:
+                return None
+            if mode_name not in CardsPool._cards_pool:
+                CardsPool._open(mode_name)
+            CardsPool._touch(mode_name)
+            return CardsPool._cards_pool[mode_name]
+
+    @staticmethod
+    def get_cache(mode_name: str) -> Optional["Cards"]:
+        with CardsPool._lock:
+            if CardsPool.get(mode_name) is None:
+                return None
+            return CardsPool._cache_cards_pool[mode_name]
+
+    @staticmethod
+    def sizes() -> Dict[str, int]:
+        """Count registered modes and open cards and cache cards."""
+        return {
+            "registered": len(CardsPool._registered),
+            "cards": len(CardsPool._cards_pool),
+            "cache": len(CardsPool._cache_cards_pool),
+        }
 
     @staticmethod
     def reload(mode_name: str):
-        if mode_name not in CardsPool._cards_pool.keys():
-            raise UnkownMode(f'Mode "{mode_name}" was not regitered yet.')
-        CardsPool._cards_pool[mode_name] = Cards(mode=mode_name, store=True)
-        CardsPool._cache_cards_pool[mode_name] = Cards(mode=mode_name)
+        with CardsPool._lock:
+            if mode_name not in CardsPool._registered:
+                raise UnkownMode(f'Mode "{mode_name}" was not regitered yet.')
+            cards = CardsPool.get(mode_name)
+            if type(cards) is NormalizedCards:
+                # Normalized cards hold no in-memory copy, nothing is stale.
+                return
+            # Callers still holding the old cards keep them open until released.
+            del CardsPool._cards_pool[mode_name]
+            del CardsPool._cache_cards_pool[mode_name]
+            CardsPool._open(mode_name)
 
 
 class CardsManagerMeta(type):
@@ -92,7 +302,7 @@ class CardsManagerMeta(type):
 
     def __new__(cls, name, bases, dct):
         for attr_name, attr_value in dct.items():
-            if callable(attr_value):
+            if callable(attr_value) and not getattr(attr_value, "__uncached__", False):
                 dct[attr_name] = cached_method(attr_value)
         return super().__new__(cls, name, bases, dct)
 
@@ -113,26 +323,100 @@ class CardsManager(metaclass=CardsManagerMeta):
         """
         self.db_path = db_path
         self.max_cards_per_user = int(max_cards_per_user)
-        self.conn = sqlite3.connect(db_path)
+        self.pool = ConnectionPool(db_path)
+        self.conn = self.pool.conn
 
         self._create_table()
         self._method_cache = {}
+        # What this manager last wrote or read per user, and the newest row
+        # version and data version it has seen, for change detection.
+        self._saved: Dict[str, Tuple[str, int]] = {}
+        self._removed: Set[str] = set()
+        self._version = 0
+        self._data_version = self.pool.data_version()
 
+    @uncached_method
     def _create_table(self):
         """Create table for storing user cards if not exists."""
-        cursor = self.conn.cursor()
-        cursor.execute(
+        with self.pool.writer() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS user_cards (
+                    user_id TEXT,
+                    card_data TEXT,
+                    selected_card INTERGER,
+                    version INTEGER NOT NULL DEFAULT 0
+                )
             """
-            CREATE TABLE IF NOT EXISTS user_cards (
-                user_id TEXT,
-                card_data TEXT,
-                selected_card INTERGER
             )
+            columns = [column[1] for column in conn.execute("PRAGMA table_info(user_cards)")]
+            if "version" not in columns:
+                conn.execute(
+                    "ALTER TABLE user_cards ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+                )
+                conn.execute(
+                    "DELETE FROM user_cards WHERE rowid NOT IN "
+                    "(SELECT MAX(rowid) FROM user_cards GROUP BY user_id)"
+                )
+            conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS user_cards_user_id "
+                "ON user_cards (user_id)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS user_cards_version ON user_cards (version)"
+            )
+            # Row versions come from a counter instead of ``MAX(version) + 1``,
+            # which hands out a deleted row's version again.
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS user_cards_sequence "
+                "(version INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "INSERT INTO user_cards_sequence (version) "
+                "SELECT (SELECT COALESCE(MAX(version), 0) FROM user_cards) "
+                "WHERE NOT EXISTS (SELECT 1 FROM user_cards_sequence)"
+            )
+            # The version each user was deleted at, for ``changes``.
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS user_cards_removed (
+                    user_id TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS user_cards_removed_version "
+                "ON user_cards_removed (version)"
+            )
+
+    @uncached_method
+    def _next_versions(self, conn: sqlite3.Connection, count: int = 1) -> int:
+        """Take ``count`` row versions inside the write transaction of ``conn``.
+
+        Returns:
+            int: The first of the taken versions.
         """
+        conn.execute("UPDATE user_cards_sequence SET version = version + ?", (count,))
+        last = conn.execute("SELECT version FROM user_cards_sequence").fetchone()[0]
+        return last - count + 1
+
+    @uncached_method
+    def _remove(
+        self, conn: sqlite3.Connection, user_ids: List[str], version: int
+    ) -> None:
+        """Delete users, recording versions from ``version`` on as their deletion."""
+        conn.executemany(
+            "DELETE FROM user_cards WHERE user_id = ?",
+            [(user_id,) for user_id in user_ids],
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO user_cards_removed (user_id, version) "
+            "VALUES (?, ?)",
+            [(user_id, version + offset) for offset, user_id in enumerate(user_ids)],
         )
-        self.conn.commit()
-        cursor.close()
 
+    @uncached_method
     def save(
         self, cards: Dict[str, List[Dict[str, Any]]], selected_cards: Dict[str, int]
     ) -> None:
@@ -144,29 +428,39 @@ class CardsManager(metaclass=CardsManagerMeta):
 
         Raises:
             TooManyCardsError: If the number of cards exceeds the maximum allowed limit.
-        """
-        if not cards:
-            cursor = self.conn.cursor()
-            cursor.execute("DELETE FROM user_cards")
-            self.conn.commit()
-            cursor.close()
-            return
 
-        cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM user_cards")
+        Only users changed since they were last saved or loaded are written, each
+        with a new row version, so other processes can refresh just those users.
+        """
+        saved = {}
         for user_id, card_data in cards.items():
             if len(card_data) > self.max_cards_per_user:
                 raise TooManyCardsError("Exceeded maximum allowed cards per user")
-            cursor.execute(
-                "INSERT INTO user_cards VALUES (?, ?, ?)",
-                (user_id, str(card_data), selected_cards.get(user_id) or 0),
+            row = (str(card_data), selected_cards.get(user_id) or 0)
+            if self._saved.get(user_id) != row:
+                saved[user_id] = row
+        removed = [user_id for user_id in self._saved if user_id not in cards]
+        if not saved and not removed:
+            return
+
+        with self.pool.writer() as conn:
+            version = self._next_versions(conn, len(saved) + len(removed))
+            conn.executemany(
+                _UPSERT,
+                [
+                    (user_id, *row, version + offset)
+                    for offset, (user_id, row) in enumerate(saved.items())
+                ],
             )
-        self.conn.commit()
-        cursor.close()
+            self._remove(conn, removed, version + len(saved))
+        self._saved.update(saved)
+        for user_id in removed:
+            del self._saved[user_id]
 
+    @uncached_method
     def load(
         self, target: str = "*"
-    ) -> tuple[Union[Dict[str, Any], List[Dict[str, Any]]], Union[Dict[str, int], int]]:
+    ) -> Tuple[Union[Dict[str, Any], List[Dict[str, Any]]], Union[Dict[str, int], int]]:
         """Load user cards data.
 
         Parameters:
@@ -175,59 +469,801 @@ class CardsManager(metaclass=CardsManagerMeta):
         Returns:
             Union[Dict[str, Any], List[Dict[str, Any]]]: Dictionary containing user cards data.
         """
-        cursor = self.conn.cursor()
-        if target.lower() == "*":
-            cursor.execute("SELECT user_id, card_data, selected_card FROM user_cards")
-            result = cursor.fetchall()
-            datas = {}
-            selected_cards = {}
-            for user_id, card_data, selected_card in result:
-                datas[user_id] = eval(card_data)
-                selected_cards[user_id] = selected_card
-            cursor.close()
-            return datas, selected_cards
-        else:
-            user_id = target
-            cursor.execute(
+        with self.pool.reader() as conn:
+            cursor = conn.cursor()
+            if target.lower() == "*":
+                cursor.execute(
+                    "SELECT user_id, card_data, selected_card, version FROM user_cards"
+                )
+                result = cursor.fetchall()
+                datas = {}
+                selected_cards = {}
+                self._saved = {}
+                for user_id, card_data, selected_card, version in result:
+                    datas[user_id] = eval(card_data)
+                    selected_cards[user_id] = selected_card
+                    self._saved[user_id] = (card_data, selected_card)
+                    self._version = max(self._version, version)
+                cursor.close()
+                return datas, selected_cards
+            else:
+                user_id = target
+                cursor.execute(
+                    "SELECT card_data, selected_card, version FROM user_cards "
+                    "WHERE user_id=?",
+                    (user_id,),
+                )
+                if result := cursor.fetchone():
+                    self._saved[user_id] = (result[0], result[1])
+                    self._version = max(self._version, result[2])
+                    results = (eval(result[0]), result[1])
+                else:
+                    results = ([], 0)
+                cursor.close()
+                return results
+
+    @uncached_method
+    def get(self, user_id: str) -> Tuple[List[Dict[str, Any]], int]:
+        """Get ``(cards, selected_card)`` of a user, ``([], 0)`` if missing."""
+        with self.pool.reader() as conn:
+            result = conn.execute(
                 "SELECT card_data, selected_card FROM user_cards WHERE user_id=?",
                 (user_id,),
+            ).fetchone()
+        return (eval(result[0]), result[1] or 0) if result else ([], 0)
+
+    @uncached_method
+    def put(
+        self, user_id: str, cards: List[Dict[str, Any]], selected_card: int = 0
+    ) -> None:
+        """Replace all cards of a user."""
+        self.putmany([(user_id, cards, selected_card)])
+
+    @uncached_method
+    def delete(self, user_id: str) -> None:
+        """Delete all cards of a user."""
+        with self.pool.writer() as conn:
+            self._remove(conn, [user_id], self._next_versions(conn))
+        self._saved.pop(user_id, None)
+
+    @uncached_method
+    def changed(self) -> bool:
+        """Check cheaply whether another connection wrote to the database."""
+        data_version = self.pool.data_version()
+        if data_version == self._data_version:
+            return False
+        self._data_version = data_version
+        return True
+
+    @uncached_method
+    def changes(self) -> List[Tuple[str, List[Dict[str, Any]], int]]:
+        """Load users written by others since the last save, load or changes.
+
+        Returns:
+            List[Tuple[str, List[Dict[str, Any]], int]]: ``(user_id, cards, selected_card)`` tuples.
+        """
+        with self.pool.reader() as conn:
+            # Deleted users come back without cards, in one statement so
+            # both tables are read from the same snapshot.
+            cursor = conn.execute(
+                "SELECT user_id, card_data, selected_card, version FROM user_cards "
+                "WHERE version > ? UNION ALL "
+                "SELECT user_id, NULL, NULL, version FROM user_cards_removed "
+                "WHERE version > ? ORDER BY version",
+                (self._version, self._version),
             )
-            results = (
-                (eval(result[0]), result[1])
-                if (result := cursor.fetchone())
-                else ([], 0)
-            )
+            results = []
+            for user_id, card_data, selected_card, version in cursor.fetchall():
+                self._version = version
+                if card_data is None:
+                    # Users never loaded or saved here are not in ``Cards``.
+                    if self._saved.pop(user_id, None) is not None:
+                        self._removed.add(user_id)
+                    continue
+                self._removed.discard(user_id)
+                if self._saved.get(user_id) == (card_data, selected_card):
+                    continue
+                self._saved[user_id] = (card_data, selected_card)
+                results.append((user_id, eval(card_data), selected_card))
             cursor.close()
-            return results
+        return results
+
+    @uncached_method
+    def removed(self, user_ids: Iterable[str]) -> List[str]:
+        """Find which of the given users were deleted by others.
+
+        Deletions are noticed by ``changes``, call it first.
+
+        Returns:
+            List[str]: user ids deleted since the last ``removed``.
+        """
+        removed, self._removed = self._removed, set()
+        return [user_id for user_id in user_ids if user_id in removed]
+
+    @uncached_method
+    def iterate(
+        self, batch_size: int = BATCH_SIZE
+    ) -> Iterator[Tuple[str, List[Dict[str, Any]], int]]:
+        """Stream every user's cards without loading the whole table.
+
+        Yields:
+            Tuple[str, List[Dict[str, Any]], int]: ``(user_id, cards, selected_card)`` tuples.
+        """
+        with self.pool.reader() as conn:
+            cursor = conn.execute(
+                "SELECT user_id, card_data, selected_card FROM user_cards"
+            )
+            try:
+                while rows := cursor.fetchmany(batch_size):
+                    for user_id, card_data, selected_card in rows:
+                        yield user_id, eval(card_data), selected_card or 0
+            finally:
+                cursor.close()
+
+    @uncached_method
+    def putmany(self, rows: Iterable[Tuple[str, List[Dict[str, Any]], int]]) -> int:
+        """Write many users' cards in a single transaction.
+
+        Raises:
+            TooManyCardsError: If a user has more cards than allowed, nothing is written.
+
+        Returns:
+            int: Number of written users.
+        """
+        params = []
+        for user_id, card_data, selected_card in rows:
+            if len(card_data) > self.max_cards_per_user:
+                raise TooManyCardsError("Exceeded maximum allowed cards per user")
+            params.append((user_id, str(card_data), selected_card or 0))
+
+        with self.pool.writer() as conn:
+            version = self._next_versions(conn, len(params))
+            conn.executemany(
+                _UPSERT,
+                [(*row, version + offset) for offset, row in enumerate(params)],
+            )
+        # Let ``changes`` hand the written users to ``Cards.sync``.
+        self._data_version = -1
+        return len(params)
+
+    @uncached_method
+    def backup(self, target: Union[str, Path], **kwargs) -> Path:
+        """Snapshot the database online, see ``ConnectionPool.backup``."""
+        return self.pool.backup(target, **kwargs)
+
+    @uncached_method
+    def restore(self, source: Union[str, Path]) -> None:
+        """Restore the database from a snapshot, see ``ConnectionPool.restore``.
+
+        Change detection is reset so ``Cards.sync`` picks up the restored rows.
+        """
+        self.pool.restore(source)
+        self._create_table()
+        # Users known before the restore are removed unless ``changes`` finds them.
+        self._removed = set(self._saved)
+        self._saved = {}
+        self._version = 0
+        self._data_version = -1
 
     def close(self):
         """Close the database connection."""
-        self.conn.close()
+        self.pool.close()
+
+
+class NormalizedCardsManager:
+    """A class for managing user cards data with one row per card.
+
+    Cards live in the ``cards`` table keyed by ``(mode, user_id, card_index)``
+    and the selected card of each user lives in ``selected_cards``, so every
+    operation only touches the rows it needs instead of a whole serialized
+    card list. Several modes may share one database and connection pool.
+    """
+
+    def __init__(
+        self,
+        db_path: Union[str, Path] = ":memory:",
+        max_cards_per_user: Union[int, str] = MAX_CARDS_PER_USER,
+        *,
+        mode: str = "",
+        pool: Optional[ConnectionPool] = None,
+    ):
+        """Initialize NormalizedCardsManager.
+
+        Args:
+            db_path (Union[str, Path], optional): Path to the SQLite database file.. Defaults to ":memory:".
+            max_cards_per_user (Union[int, str], optional): Defaults to MAX_CARDS_PER_USER.
+            mode (str, optional): Mode of the managed cards. Defaults to ``""``.
+            pool (Optional[ConnectionPool], optional): Shared connection pool, ``db_path``
+                is ignored when provided and the pool is left open on ``close``.
+        """
+        self.db_path = pool.db_path if pool else db_path
+        self.max_cards_per_user = int(max_cards_per_user)
+        self.mode = mode
+        self.pool = pool or ConnectionPool(db_path)
+        self.conn = self.pool.conn
+        self._owns_pool = pool is None
+
+        self._create_table()
+        self._untype_attributes()
+        self._indexed_attributes = self._load_indexed_attributes()
+
+    def _create_table(self):
+        """Create tables for storing user cards if not exists."""
+        with self.pool.writer() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cards (
+                    mode TEXT NOT NULL DEFAULT '',
+                    user_id TEXT NOT NULL,
+                    card_index INTEGER NOT NULL,
+                    card_data TEXT NOT NULL,
+                    PRIMARY KEY (mode, user_id, card_index)
+                )
+            """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS selected_cards (
+                    mode TEXT NOT NULL DEFAULT '',
+                    user_id TEXT NOT NULL,
+                    selected_card INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (mode, user_id)
+                )
+            """
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS migrated_modes (mode TEXT PRIMARY KEY)"
+            )
+
+    @staticmethod
+    def _attribute_path(name: str) -> str:
+        if '"' in name:
+            raise ValueError(f"Attribute name '{name}' should not contain '\"'.")
+        return f'$."{name}"'
+
+    @staticmethod
+    def _attribute_column(name: str) -> str:
+        return '"attr:' + name.replace('"', '""') + '"'
+
+    def _load_indexed_attributes(self) -> Set[str]:
+        with self.pool.reader() as conn:
+            cursor = conn.execute("PRAGMA table_xinfo(cards)")
+            columns = {
+                column[1][len("attr:") :]
+                for column in cursor.fetchall()
+                if column[1].startswith("attr:")
+            }
+            cursor.close()
+        return columns
+
+    def index_attributes(
+        self, template: Template, names: Optional[Iterable[str]] = None
+    ) -> None:
+        """Index card attributes declared by a template.
+
+        Each attribute becomes a virtual generated column extracting the value
+        from the card JSON with an index on it, queries on these attributes
+        are then answered from the index. Requires SQLite 3.31 or newer.
+
+        Args:
+            template (Template): template declaring the attributes.
+            names (Optional[Iterable[str]]): attribute names or aliases to index,
+                all attributes of the template when ``None``.
+        """
+        if names is None:
+            names = template.get_attr_names()
+        self._indexed_attributes |= self._load_indexed_attributes()
+        with self.pool.writer() as conn:
+            for name in names:
+                main_name = template.get_main_name_or_raise(name)
+                if main_name in self._indexed_attributes:
+                    continue
+                self._add_attribute_column(conn, main_name)
+                self._indexed_attributes.add(main_name)
+
+    def _add_attribute_column(self, conn: sqlite3.Connection, name: str) -> None:
+        # Without a declared type the column has no affinity and compares
+        # exactly like ``json_extract`` on unindexed attributes.
+        column = self._attribute_column(name)
+        path = self._attribute_path(name).replace("'", "''")
+        conn.execute(
+            f"ALTER TABLE cards ADD COLUMN {column} "
+            f"GENERATED ALWAYS AS (json_extract(card_data, '{path}')) VIRTUAL"
+        )
+        conn.execute(
+            f'CREATE INDEX IF NOT EXISTS "cards_{column[1:]} ON cards (mode, {column})'
+        )
+
+    def _untype_attributes(self) -> None:
+        """Rebuild attribute columns declared with a type, whose affinity made
+        queries match differently once an attribute was indexed."""
+        with self.pool.writer() as conn:
+            typed = [
+                column[1][len("attr:") :]
+                for column in conn.execute("PRAGMA table_xinfo(cards)").fetchall()
+                if column[1].startswith("attr:") and column[2]
+            ]
+            for name in typed:
+                column = self._attribute_column(name)
+                conn.execute(f'DROP INDEX IF EXISTS "cards_{column[1:]}')
+                conn.execute(f"ALTER TABLE cards DROP COLUMN {column}")
+                self._add_attribute_column(conn, name)
+
+    def _attribute_expression(self, name: str, params: List[Any]) -> str:
+        if name in self._indexed_attributes:
+            return "cards." + self._attribute_column(name)
+        params.append(self._attribute_path(name))
+        return "json_extract(cards.card_data, ?)"
+
+    def query(
+        self,
+        where: Optional[Sequence[Tuple[str, str, Any]]] = None,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+        user_ids: Optional[Iterable[str]] = None,
+        selected_only: bool = False,
+    ) -> List[Tuple[str, int, Dict[str, Any]]]:
+        """Query cards by their attributes.
+
+        Args:
+            where (Optional[Sequence[Tuple[str, str, Any]]]): filters as
+                ``(attribute, operator, value)``, see ``QUERY_OPERATORS``.
+            order_by (Optional[str]): attribute to order results by.
+            descending (bool): order results descending. Defaults to ``False``.
+            limit (Optional[int]): maximum number of results.
+            user_ids (Optional[Iterable[str]]): only query cards of these users.
+            selected_only (bool): only query the selected card of each user.
+
+        Returns:
+            List[Tuple[str, int, Dict[str, Any]]]: ``(user_id, card_index, card)`` tuples.
+        """
+        params: List[Any] = []
+        sql = "SELECT cards.user_id, cards.card_index, cards.card_data FROM cards"
+        if selected_only:
+            sql += (
+                " LEFT JOIN selected_cards ON selected_cards.mode = cards.mode"
+                " AND selected_cards.user_id = cards.user_id"
+            )
+        conditions = ["cards.mode = ?"]
+        params.append(self.mode)
+        if selected_only:
+            conditions.append(
+                "cards.card_index = COALESCE(selected_cards.selected_card, 0)"
+            )
+        if user_ids is not None:
+            user_ids = list(user_ids)
+            conditions.append(
+                f"cards.user_id IN ({', '.join('?' * len(user_ids))})"
+            )
+            params.extend(user_ids)
+        for name, operator, value in where or ():
+            operator = operator.upper()
+            if operator not in QUERY_OPERATORS:
+                raise ValueError(f"Unknown query operator '{operator}'.")
+            expression = self._attribute_expression(name, params)
+            if operator == "IN":
+                value = list(value)
+                conditions.append(
+                    f"{expression} IN ({', '.join('?' * len(value))})"
+                )
+                params.extend(value)
+            else:
+                conditions.append(f"{expression} {operator} ?")
+                params.append(value)
+        sql += " WHERE " + " AND ".join(conditions)
+        if order_by is not None:
+            sql += " ORDER BY " + self._attribute_expression(order_by, params)
+            sql += " DESC" if descending else " ASC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self.pool.reader() as conn:
+            cursor = conn.execute(sql, params)
+            results = [
+                (user_id, card_index, json.loads(card_data))
+                for user_id, card_index, card_data in cursor.fetchall()
+            ]
+            cursor.close()
+        return results
+
+    def migrate(self, source: Optional[Union[str, Path]] = None) -> int:
+        """Copy cards from a legacy ``user_cards`` table into this mode.
+
+        Args:
+            source (Optional[Union[str, Path]]): Database holding the legacy table,
+                e.g. ``<mode>.db``. Defaults to this manager's database.
+
+        Returns:
+            int: Number of migrated users.
+        """
+        if source is None:
+            with self.pool.reader() as conn:
+                rows = self._legacy_rows(conn)
+        else:
+            conn = sqlite3.connect(source)
+            rows = self._legacy_rows(conn)
+            conn.close()
+
+        with self.pool.writer() as conn:
+            for user_id, card_data, selected_card in rows:
+                conn.execute(
+                    "DELETE FROM cards WHERE mode = ? AND user_id = ?",
+                    (self.mode, user_id),
+                )
+                conn.executemany(
+                    "INSERT INTO cards (mode, user_id, card_index, card_data) "
+                    "VALUES (?, ?, ?, ?)",
+                    [
+                        (self.mode, user_id, index, json.dumps(card, ensure_ascii=False))
+                        for index, card in enumerate(eval(card_data))
+                    ],
+                )
+                self._set_selected(conn, user_id, selected_card or 0)
+        return len(rows)
+
+    def migrate_once(self, source: Optional[Union[str, Path]] = None) -> int:
+        """Run ``migrate`` unless this mode was migrated before.
+
+        Cards written after the first migration are not overwritten by the
+        legacy rows, which stay behind untouched.
+
+        Returns:
+            int: Number of migrated users, 0 when already migrated.
+        """
+        with self.pool.writer() as conn:
+            if conn.execute(
+                "SELECT 1 FROM migrated_modes WHERE mode = ?", (self.mode,)
+            ).fetchone():
+                return 0
+            count = self.migrate(source)
+            conn.execute("INSERT INTO migrated_modes (mode) VALUES (?)", (self.mode,))
+        return count
+
+    @staticmethod
+    def _legacy_rows(conn: sqlite3.Connection) -> List[Tuple[str, str, int]]:
+        cursor = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'user_cards'"
+        )
+        if not cursor.fetchone():
+            cursor.close()
+            return []
+        cursor.execute("SELECT user_id, card_data, selected_card FROM user_cards")
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+
+    def _set_selected(self, conn: sqlite3.Connection, user_id: str, index: int) -> None:
+        conn.execute(
+            "INSERT INTO selected_cards (mode, user_id, selected_card) VALUES (?, ?, ?) "
+            "ON CONFLICT (mode, user_id) DO UPDATE SET "
+            "selected_card = excluded.selected_card",
+            (self.mode, user_id, index),
+        )
+
+    def count(self, user_id: str) -> int:
+        """Count the cards of a user."""
+        with self.pool.reader() as conn:
+            cursor = conn.execute(
+                "SELECT COUNT(*) FROM cards WHERE mode = ? AND user_id = ?",
+                (self.mode, user_id),
+            )
+            count = cursor.fetchone()[0]
+            cursor.close()
+        return count
+
+    def get(self, user_id: str, index: int) -> Optional[Dict[str, Any]]:
+        """Get a single card of a user.
+
+        Args:
+            user_id (str): user id.
+            index (int): card index.
+
+        Returns:
+            Optional[Dict[str, Any]]: card data, ``None`` if it does not exist.
+        """
+        with self.pool.reader() as conn:
+            return self._get(conn, user_id, index)
+
+    def _get(
+        self, conn: sqlite3.Connection, user_id: str, index: int
+    ) -> Optional[Dict[str, Any]]:
+        cursor = conn.execute(
+            "SELECT card_data FROM cards "
+            "WHERE mode = ? AND user_id = ? AND card_index = ?",
+            (self.mode, user_id, index),
+        )
+        result = cursor.fetchone()
+        cursor.close()
+        return json.loads(result[0]) if result else None
+
+    def getall(self, user_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Get all cards of a user ordered by index.
+
+        Like ``Cards`` a user cleared or left without cards has an empty list,
+        only users never seen or deleted entirely have ``None``.
+        """
+        with self.pool.reader() as conn:
+            cursor = conn.execute(
+                "SELECT card_data FROM cards WHERE mode = ? AND user_id = ? "
+                "ORDER BY card_index",
+                (self.mode, user_id),
+            )
+            results = [json.loads(card_data) for card_data, in cursor.fetchall()]
+            if not results:
+                cursor.execute(
+                    "SELECT 1 FROM selected_cards WHERE mode = ? AND user_id = ?",
+                    (self.mode, user_id),
+                )
+                if cursor.fetchone() is None:
+                    results = None
+            cursor.close()
+        return results
+
+    def append(self, user_id: str, attributes: Dict[str, Any]) -> None:
+        """Append a card to a user's card list.
+
+        Args:
+            user_id (str): user id.
+            attributes (Dict[str, Any]): card content.
+
+        Raises:
+            TooManyCardsError: If the user already has the maximum allowed cards.
+        """
+        with self.pool.writer() as conn:
+            cursor = conn.execute(
+                """
+                INSERT INTO cards (mode, user_id, card_index, card_data)
+                SELECT ?, ?, total, ? FROM (
+                    SELECT COUNT(*) AS total FROM cards WHERE mode = ? AND user_id = ?
+                ) WHERE total < ?
+                """,
+                (
+                    self.mode,
+                    user_id,
+                    json.dumps(attributes, ensure_ascii=False),
+                    self.mode,
+                    user_id,
+                    self.max_cards_per_user,
+                ),
+            )
+            appended = cursor.rowcount > 0
+            cursor.close()
+        if not appended:
+            raise TooManyCardsError(
+                f"Cards count for a user should not more than {self.max_cards_per_user}."
+            )
+
+    def update(self, user_id: str, index: int, attributes: Dict[str, Any]) -> bool:
+        """Merge attributes into an existing card.
+
+        Returns:
+            bool: ``False`` if the card does not exist.
+        """
+        with self.pool.writer() as conn:
+            card = self._get(conn, user_id, index)
+            if card is None:
+                return False
+            card.update(attributes)
+            conn.execute(
+                "UPDATE cards SET card_data = ? "
+                "WHERE mode = ? AND user_id = ? AND card_index = ?",
+                (json.dumps(card, ensure_ascii=False), self.mode, user_id, index),
+            )
+        return True
+
+    def delete(self, user_id: str, index: Optional[int] = None) -> bool:
+        """Delete a card, or every card of a user when index is ``None``.
+
+        Cards after the deleted one are shifted down so indexes stay contiguous.
+
+        Returns:
+            bool: True if any card was deleted.
+        """
+        with self.pool.writer() as conn:
+            if index is None:
+                cursor = conn.execute(
+                    "DELETE FROM cards WHERE mode = ? AND user_id = ?",
+                    (self.mode, user_id),
+                )
+                conn.execute(
+                    "DELETE FROM selected_cards WHERE mode = ? AND user_id = ?",
+                    (self.mode, user_id),
+                )
+            else:
+                cursor = conn.execute(
+                    "DELETE FROM cards WHERE mode = ? AND user_id = ? AND card_index = ?",
+                    (self.mode, user_id, index),
+                )
+                if cursor.rowcount:
+                    conn.execute(
+                        "UPDATE cards SET card_index = card_index - 1 "
+                        "WHERE mode = ? AND user_id = ? AND card_index > ?",
+                        (self.mode, user_id, index),
+                    )
+                    # The user stays known with no cards left, see ``getall``.
+                    conn.execute(
+                        "INSERT OR IGNORE INTO selected_cards (mode, user_id) "
+                        "VALUES (?, ?)",
+                        (self.mode, user_id),
+                    )
+            deleted = cursor.rowcount > 0
+            cursor.close()
+        return deleted
+
+    def select(self, user_id: str, index: int) -> bool:
+        """Set a card index as a user's selected card.
+
+        Returns:
+            bool: ``False`` if the card does not exist.
+        """
+        with self.pool.writer() as conn:
+            cursor = conn.execute(
+                """
+                INSERT INTO selected_cards (mode, user_id, selected_card)
+                SELECT ?, ?, ? WHERE EXISTS (
+                    SELECT 1 FROM cards
+                    WHERE mode = ? AND user_id = ? AND card_index = ?
+                )
+                ON CONFLICT (mode, user_id) DO UPDATE SET
+                    selected_card = excluded.selected_card
+                """,
+                (self.mode, user_id, index, self.mode, user_id, index),
+            )
+            selected = cursor.rowcount > 0
+            cursor.close()
+        return selected
+
+    def selected(self, user_id: str) -> int:
+        """Get the selected card index of a user."""
+        with self.pool.reader() as conn:
+            cursor = conn.execute(
+                "SELECT selected_card FROM selected_cards WHERE mode = ? AND user_id = ?",
+                (self.mode, user_id),
+            )
+            result = cursor.fetchone()
+            cursor.close()
+        return result[0] if result else 0
+
+    def clear(self, user_id: str) -> None:
+        """Delete all cards of a user and reset the selected card."""
+        with self.pool.writer() as conn:
+            conn.execute(
+                "DELETE FROM cards WHERE mode = ? AND user_id = ?", (self.mode, user_id)
+            )
+            self._set_selected(conn, user_id, 0)
+
+    def iterate(
+        self, batch_size: int = BATCH_SIZE
+    ) -> Iterator[Tuple[str, List[Dict[str, Any]], int]]:
+        """Stream every user's cards of this mode without loading them all.
+
+        Yields:
+            Tuple[str, List[Dict[str, Any]], int]: ``(user_id, cards, selected_card)`` tuples.
+        """
+        with self.pool.reader() as conn:
+            cursor = conn.execute(
+                """
+                SELECT cards.user_id, cards.card_data,
+                    COALESCE(selected_cards.selected_card, 0)
+                FROM cards LEFT JOIN selected_cards
+                    ON selected_cards.mode = cards.mode
+                    AND selected_cards.user_id = cards.user_id
+                WHERE cards.mode = ?
+                ORDER BY cards.user_id, cards.card_index
+                """,
+                (self.mode,),
+            )
+            user_id, user_cards, selected_card = None, [], 0
+            try:
+                while rows := cursor.fetchmany(batch_size):
+                    for row_user_id, card_data, row_selected_card in rows:
+                        if row_user_id != user_id:
+                            if user_id is not None:
+                                yield user_id, user_cards, selected_card
+                            user_id, user_cards = row_user_id, []
+                            selected_card = row_selected_card
+                        user_cards.append(json.loads(card_data))
+            finally:
+                cursor.close()
+            if user_id is not None:
+                yield user_id, user_cards, selected_card
+
+    def putmany(self, rows: Iterable[Tuple[str, List[Dict[str, Any]], int]]) -> int:
+        """Replace many users' cards in a single transaction.
+
+        Raises:
+            TooManyCardsError: If a user has more cards than allowed, nothing is written.
+
+        Returns:
+            int: Number of written users.
+        """
+        users, cards, selected_cards = [], [], []
+        for user_id, card_data, selected_card in rows:
+            if len(card_data) > self.max_cards_per_user:
+                raise TooManyCardsError("Exceeded maximum allowed cards per user")
+            users.append((self.mode, user_id))
+            cards.extend(
+                (self.mode, user_id, index, json.dumps(card, ensure_ascii=False))
+                for index, card in enumerate(card_data)
+            )
+            selected_cards.append((self.mode, user_id, selected_card or 0))
+
+        with self.pool.writer() as conn:
+            conn.executemany(
+                "DELETE FROM cards WHERE mode = ? AND user_id = ?", users
+            )
+            conn.executemany(
+                "INSERT INTO cards (mode, user_id, card_index, card_data) "
+                "VALUES (?, ?, ?, ?)",
+                cards,
+            )
+            conn.executemany(
+                "INSERT INTO selected_cards (mode, user_id, selected_card) "
+                "VALUES (?, ?, ?) ON CONFLICT (mode, user_id) DO UPDATE SET "
+                "selected_card = excluded.selected_card",
+                selected_cards,
+            )
+        return len(users)
+
+    def backup(self, target: Union[str, Path], **kwargs) -> Path:
+        """Snapshot the database online, see ``ConnectionPool.backup``."""
+        return self.pool.backup(target, **kwargs)
+
+    def restore(self, source: Union[str, Path]) -> None:
+        """Restore the database from a snapshot, see ``ConnectionPool.restore``."""
+        self.pool.restore(source)
+
+    def close(self):
+        """Close the database connection unless the pool is shared."""
+        if self._owns_pool:
+            self.pool.close()
 
 
 class Cards:
     """A class for handling card operations such as saving, loading, updating, and deleting."""
 
-    cards_manager: CardsManager
+    cards_manager: Union[CardsManager, "CardsBackend"]
 
-    def __init__(self, mode: Optional[str] = None, store: bool = False):
+    def __init__(
+        self,
+        mode: Optional[str] = None,
+        store: bool = False,
+        backend: Optional["CardsBackend"] = None,
+    ):
         """Initialize Cards.
 
         Args:
             mode (str): Mode of the cards.
             store (bool): Decide whether this class save to disk or memory. (Defaults to ``False``)
+            backend (Optional[CardsBackend]): Storage backend from ``diceutils.backends``,
+                overrides ``store``. (Defaults to a SQLite ``CardsManager``)
         """
         if mode is None or not mode:
             mode = "unknown_mode"
         self.data: Dict[str, List[Dict[str, Any]]] = {}
         self.selected_cards: Dict[str, int] = {}
         self.mode = mode
-        self.cards_manager = CardsManager(f"{mode}.db" if store else ":memory:")
+        if backend is not None:
+            self.cards_manager = backend
+        else:
+            self.cards_manager = CardsManager(f"{mode}.db" if store else ":memory:")
+        # Operations on one user are serialized by its lock stripe, calls
+        # into the manager by the manager lock, always taken in this order.
+        # ``sync`` runs under the sync lock and holds at most one other lock.
+        self.locks = LockStripes()
+        self.manager_lock = threading.RLock()
+        self.sync_lock = threading.Lock()
         self.load()
 
     def save(self):
-        """Save the current card data."""
-        self.cards_manager.save(self.data, self.selected_cards)
+        """Save a snapshot of the current card data."""
+        with self.manager_lock:
+            self.cards_manager.save(
+                {user_id: list(cards) for user_id, cards in self.data.copy().items()},
+                self.selected_cards.copy(),
+            )
 
     def load(self, target: Union[Set[str], str] = "*"):
         """Load the card data."""
@@ -254,17 +1290,123 @@ class Cards:
                     self.data[user_id] = user_data
                     self.selected_cards[user_id] = selected_card
 
+    def sync(self) -> None:
+        """Refresh users changed by other connections since the last check.
+
+        Costs a single ``PRAGMA data_version`` when nothing changed, otherwise
+        only the changed users are reloaded.
+        """
+        if self.locks.held():
+            # Called within an operation that synced before taking its lock,
+            # waiting for other users' locks here could deadlock.
+            return
+        with self.sync_lock:
+            with self.manager_lock:
+                if not self.cards_manager.changed():
+                    return
+                changes = self.cards_manager.changes()
+                removed = self.cards_manager.removed(
+                    [*self.data, *(user_id for user_id, _, _ in changes)]
+                )
+            for user_id, user_data, selected_card in changes:
+                with self.locks(user_id):
+                    self.data[user_id] = user_data
+                    self.selected_cards[user_id] = selected_card
+            for user_id in removed:
+                with self.locks(user_id):
+                    self.data.pop(user_id, None)
+                    self.selected_cards.pop(user_id, None)
+
     def _get_selected_id(self, user_id: str) -> int:
         return self.selected_cards.get(user_id) or 0
 
+    def close(self) -> None:
+        """Close the cards manager."""
+        self.cards_manager.close()
+
+    def export_ndjson(
+        self, file: Union[str, Path, IO[str]], batch_size: int = BATCH_SIZE
+    ) -> int:
+        """Stream all cards to NDJSON, one user per line.
+
+        Each line is ``{"user_id": ..., "selected": ..., "cards": [...]}``.
+
+        Args:
+            file (Union[str, Path, IO[str]]): Path or text file to write.
+            batch_size (int): Users fetched per batch. Defaults to BATCH_SIZE.
+
+        Returns:
+            int: Number of exported users.
+        """
+        if isinstance(file, (str, Path)):
+            with open(file, "w", encoding="utf-8") as fp:
+                return self.export_ndjson(fp, batch_size)
+
+        count = 0
+        for user_id, user_data, selected_card in self.cards_manager.iterate(
+            batch_size
+        ):
+            file.write(
+                json.dumps(
+                    {"user_id": user_id, "selected": selected_card, "cards": user_data},
+                    ensure_ascii=False,
+                )
+                + "\n"
+            )
+            count += 1
+        return count
+
+    def import_ndjson(
+        self, file: Union[str, Path, IO[str]], batch_size: int = BATCH_SIZE
+    ) -> int:
+        """Stream cards from NDJSON written by ``export_ndjson``.
+
+        Users are written in batches of one transaction each, existing cards
+        of an imported user are replaced.
+
+        Args:
+            file (Union[str, Path, IO[str]]): Path or text file to read.
+            batch_size (int): Users written per transaction. Defaults to BATCH_SIZE.
+
+        Raises:
+            TooManyCardsError: If a user has more than MAX_CARDS_PER_USER cards,
+                users of earlier batches stay imported.
+
+        Returns:
+            int: Number of imported users.
+        """
+        if isinstance(file, (str, Path)):
+            with open(file, "r", encoding="utf-8") as fp:
+                return self.import_ndjson(fp, batch_size)
+
+        count = 0
+        batch = []
+        for line in file:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if len(row["cards"]) > MAX_CARDS_PER_USER:
+                raise TooManyCardsError(
+                    f"Cards count for a user should not more than {MAX_CARDS_PER_USER}."
+                )
+            batch.append((row["user_id"], row["cards"], row.get("selected") or 0))
+            if len(batch) >= batch_size:
+                count += self.cards_manager.putmany(batch)
+                batch = []
+        if batch:
+            count += self.cards_manager.putmany(batch)
+        return count
+
     def new(self, user_id: str, attributes: Optional[Dict[str, Any]] = None) -> None:
         """Set up a new card."""
-        length = self.count(user_id)
-        if length >= MAX_CARDS_PER_USER:
-            raise TooManyCardsError(
-                f"Cards count for a user should not more than {MAX_CARDS_PER_USER}."
-            )
-        self.update(user_id, length, attributes=attributes or {})
+        self.sync()
+        with self.locks(user_id):
+            length = self.count(user_id)
+            if length >= MAX_CARDS_PER_USER:
+                raise TooManyCardsError(
+                    f"Cards count for a user should not more than {MAX_CARDS_PER_USER}."
+                )
+            self.update(user_id, length, attributes=attributes or {})
 
     def update(
         self,
@@ -279,18 +1421,15 @@ class Cards:
             index (Optional[int]): card index.
             attributes (Optional[Dict[str, Any]]): card content, default is ``None``.
         """
-        index = index or self._get_selected_id(user_id)
-        if attributes is None:
-            attributes = {}
-        if user_id not in self.data:
-            self.data[user_id] = []
-        if len(self.data[user_id]) == 0:
-            self.data[user_id].append(attributes)
-        if index > len(self.data[user_id]) - 1:
-            self.data[user_id].append(attributes)
-        else:
-            self.data[user_id][index].update(attributes)
-        self.save()
+        self.sync()
+        with self.locks(user_id):
+            index = index or self._get_selected_id(user_id)
+            if attributes is None:
+                attributes = {}
+            if user_id not in self.data:
+                self.data[user_id] = []
+            update_card(self.data[user_id], index, attributes)
+            self.save()
 
     def get(
         self, user_id: str, index: Optional[int] = None
@@ -304,6 +1443,7 @@ class Cards:
         Returns:
             Optional[Dict[str, Any]]: card data.
         """
+        self.sync()
         if index is None:
             index = self._get_selected_id(user_id)
 
@@ -315,6 +1455,7 @@ class Cards:
 
     def getall(self, user_id: str) -> Optional[List[Dict[str, Any]]]:
         """Get all card datas of a user."""
+        self.sync()
         return self.data.get(user_id)
 
     def delete(self, user_id: str, index: Optional[int] = None) -> bool:
@@ -327,41 +1468,199 @@ class Cards:
         Returns:
             bool: True if deletion is successful, False otherwise.
         """
-        if user_id in self.data:
-            if index is None:
-                del self.data[user_id]
-                self.save()
-                return True
-            if (
-                0 <= index < len(self.data[user_id])
-                and self.data[user_id][index] is not None
-            ):
-                del self.data[user_id][index]
-                self.save()
-                return True
+        self.sync()
+        with self.locks(user_id):
+            if user_id in self.data:
+                if index is None:
+                    del self.data[user_id]
+                    self.save()
+                    return True
+                if (
+                    0 <= index < len(self.data[user_id])
+                    and self.data[user_id][index] is not None
+                ):
+                    del self.data[user_id][index]
+                    self.save()
+                    return True
 
         return False
 
     def select(self, user_id: str, index: int = 0) -> None:
         """Set a card index as default card."""
-        if index > self.count(user_id) - 1:
-            raise TooManyCardsError(
-                f"This user has only {self.count(user_id)} cards, "
-                f"but index {index} was provided."
-            )
-        self.selected_cards[user_id] = index
-        self.save()
+        self.sync()
+        with self.locks(user_id):
+            if index > self.count(user_id) - 1:
+                raise TooManyCardsError(
+                    f"This user has only {self.count(user_id)} cards, "
+                    f"but index {index} was provided."
+                )
+            self.selected_cards[user_id] = index
+            self.save()
 
     def get_selected_id(self, user_id: str) -> int:
         """Get the current selected card id."""
+        self.sync()
         return self._get_selected_id(user_id)
 
     def count(self, user_id: str) -> int:
         """Count the number of a related user's cards."""
+        self.sync()
         return len(self.data.get(user_id, []))
 
     def clear(self, user_id: str) -> None:
         """Clear all cards of a user."""
-        self.selected_cards[user_id] = 0
-        self.data[user_id] = []
-        self.save()
+        self.sync()
+        with self.locks(user_id):
+            self.selected_cards[user_id] = 0
+            self.data[user_id] = []
+            self.save()
+
+
+class NormalizedCards(Cards):
+    """Cards backed by ``NormalizedCardsManager``.
+
+    Unlike ``Cards`` no card list is kept in memory, every operation is a
+    single indexed query against the database.
+    """
+
+    cards_manager: NormalizedCardsManager
+
+    def __init__(
+        self,
+        mode: Optional[str] = None,
+        store: bool = False,
+        pool: Optional[ConnectionPool] = None,
+    ):
+        """Initialize NormalizedCards.
+
+        Args:
+            mode (str): Mode of the cards.
+            store (bool): Decide whether this class save to disk or memory. (Defaults to ``False``)
+            pool (Optional[ConnectionPool]): Database shared with other modes, cards
+                are then keyed by mode inside it and ``store`` is ignored.
+        """
+        if mode is None or not mode:
+            mode = "unknown_mode"
+        if pool is not None:
+            manager = NormalizedCardsManager(mode=mode, pool=pool)
+        else:
+            manager = NormalizedCardsManager(
+                f"{mode}.db" if store else ":memory:", mode=mode
+            )
+            # Legacy ``Cards`` of this mode kept ``user_cards`` in the same file.
+            manager.migrate_once()
+        super().__init__(mode, store, backend=manager)  # type: ignore
+
+    def save(self):
+        """Cards are written on every operation, nothing to save."""
+
+    def load(self, target: Union[Set[str], str] = "*"):
+        """Cards are read on every operation, nothing to load."""
+
+    def sync(self) -> None:
+        """Normalized cards read the database on every operation."""
+
+    def _get_selected_id(self, user_id: str) -> int:
+        return self.cards_manager.selected(user_id)
+
+    def new(self, user_id: str, attributes: Optional[Dict[str, Any]] = None) -> None:
+        """Set up a new card."""
+        self.cards_manager.append(user_id, attributes or {})
+
+    def update(
+        self,
+        user_id: str,
+        index: Optional[int] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Update Card Data.
+
+        Args:
+            user_id (str): target user id.
+            index (Optional[int]): card index.
+            attributes (Optional[Dict[str, Any]]): card content, default is ``None``.
+        """
+        if attributes is None:
+            attributes = {}
+        # One transaction, so no delete or append slips in before the fallback.
+        with self.cards_manager.pool.writer():
+            index = index or self._get_selected_id(user_id)
+            if not self.cards_manager.update(user_id, index, attributes):
+                self.cards_manager.append(user_id, attributes)
+
+    def get(
+        self, user_id: str, index: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Get Card Data.
+
+        Args:
+            user_id (str): user id.
+            index (Optional[int]): index to select.
+
+        Returns:
+            Optional[Dict[str, Any]]: card data.
+        """
+        if index is None:
+            index = self._get_selected_id(user_id)
+        return self.cards_manager.get(user_id, index)
+
+    def getall(self, user_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Get all card datas of a user."""
+        return self.cards_manager.getall(user_id)
+
+    def delete(self, user_id: str, index: Optional[int] = None) -> bool:
+        """Delete Card Data.
+
+        Args:
+            user_id (str): user id.
+            index (Optional[int], optional): index of card data. Defaults to ``None``.
+
+        Returns:
+            bool: True if deletion is successful, False otherwise.
+        """
+        return self.cards_manager.delete(user_id, index)
+
+    def select(self, user_id: str, index: int = 0) -> None:
+        """Set a card index as default card."""
+        if not self.cards_manager.select(user_id, index):
+            count = self.count(user_id)
+            raise TooManyCardsError(
+                f"This user has only {count} cards, "
+                f"but index {index} was provided."
+            )
+
+    def count(self, user_id: str) -> int:
+        """Count the number of a related user's cards."""
+        return self.cards_manager.count(user_id)
+
+    def index_attributes(
+        self, template: Template, names: Optional[Iterable[str]] = None
+    ) -> None:
+        """Index card attributes declared by a template for ``query``."""
+        self.cards_manager.index_attributes(template, names)
+
+    def query(
+        self,
+        where: Optional[Sequence[Tuple[str, str, Any]]] = None,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+        user_ids: Optional[Iterable[str]] = None,
+        selected_only: bool = False,
+    ) -> List[Tuple[str, int, Dict[str, Any]]]:
+        """Query cards by their attributes, e.g. ``query([("san", "<", 30)])``.
+
+        See ``NormalizedCardsManager.query`` for the arguments.
+        """
+        return self.cards_manager.query(
+            where,
+            order_by=order_by,
+            descending=descending,
+            limit=limit,
+            user_ids=user_ids,
+            selected_only=selected_only,
+        )
+
+    def clear(self, user_id: str) -> None:
+        """Clear all cards of a user."""
+        self.cards_manager.clear(user_id)
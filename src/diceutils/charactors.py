@@ -58,6 +58,9 @@ class Template:
             return None
         return self.__template[name].type
 
+    def get_attr_names(self) -> List[str]:
+        return list(self.__template)
+
     def get_attr_names_by_group(self, name: str):
         if name not in self.__raw_template:
             raise KeyError(f"Group '{name}' is not defined.")
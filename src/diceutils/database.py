@@ -0,0 +1,329 @@
+"""
+@author         :     苏向夜 <fu050409@163.com>
+@date           :     Oct. 19th, 2026.
+@description    :     This Module Provides the Shared SQLite Connection Factory
+                      Used by Cards, Status and Log Managers.
+"""
+
+from contextlib import contextmanager
+from pathlib import Path
+from queue import Empty, LifoQueue
+from typing import Dict, Iterator, List, Optional, Union
+
+import bz2
+import gzip
+import lzma
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+MMAP_SIZE = 256 * 1024 * 1024
+"""Bytes of the database file mapped into memory by each connection."""
+CACHE_SIZE = -16 * 1024
+"""Page cache size of each connection, negative values are in KiB."""
+BUSY_TIMEOUT = 5.0
+"""Seconds a connection waits for a lock held by another connection."""
+MAX_READERS = 4
+BACKUP_PAGES = 1024
+"""Pages copied per backup step."""
+BACKUP_SLEEP = 0.005
+"""Seconds slept between backup steps to leave room for live traffic."""
+
+POOL_MAX_SIZE = 64
+"""Open entries kept by ``CardsPool`` and ``StatusPool``."""
+POOL_IDLE_TIMEOUT = 30 * 60.0
+"""Seconds after which an unused ``CardsPool`` or ``StatusPool`` entry is closed."""
+
+COMPRESSIONS = {"gzip": gzip.open, "bz2": bz2.open, "lzma": lzma.open}
+_MAGIC_NUMBERS = {
+    b"\x1f\x8b": "gzip",
+    b"BZh": "bz2",
+    b"\xfd7zXZ\x00": "lzma",
+}
+
+
+def detect_compression(path: Union[str, Path]) -> Optional[str]:
+    """Detect the compression of a snapshot file from its magic number."""
+    with open(path, "rb") as file:
+        head = file.read(6)
+    for magic, compression in _MAGIC_NUMBERS.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def is_memory(db_path: Union[str, Path]) -> bool:
+    """Whether a database path refers to a private in-memory database."""
+    return str(db_path) in (":memory:", "")
+
+
+def expired(
+    last_access: Dict[str, float],
+    max_size: int = POOL_MAX_SIZE,
+    idle_timeout: float = POOL_IDLE_TIMEOUT,
+) -> List[str]:
+    """Pick pool entries to close, idle ones and the least recently used
+    beyond ``max_size``.
+
+    Args:
+        last_access (Dict[str, float]): ``time.monotonic()`` of each entry's last use.
+        max_size (int, optional): Entries to keep at most. Defaults to POOL_MAX_SIZE.
+        idle_timeout (float, optional): Defaults to POOL_IDLE_TIMEOUT.
+
+    Returns:
+        List[str]: Names of the entries to close.
+    """
+    names = sorted(last_access, key=last_access.__getitem__)
+    deadline = time.monotonic() - idle_timeout
+    overflow = len(names) - max(max_size, 0)
+    return [
+        name
+        for index, name in enumerate(names)
+        if index < overflow or last_access[name] < deadline
+    ]
+
+
+def connect(
+    db_path: Union[str, Path] = ":memory:",
+    *,
+    readonly: bool = False,
+    mmap_size: int = MMAP_SIZE,
+    cache_size: int = CACHE_SIZE,
+) -> sqlite3.Connection:
+    """Open a tuned SQLite connection usable from any thread.
+
+    File databases are switched to WAL with ``synchronous=NORMAL`` so readers
+    never block the writer and commits do not fsync the main database file.
+
+    Args:
+        db_path (Union[str, Path], optional): Path to the SQLite database file. Defaults to ":memory:".
+        readonly (bool, optional): Open the database read-only. Defaults to ``False``.
+        mmap_size (int, optional): Defaults to MMAP_SIZE.
+        cache_size (int, optional): Defaults to CACHE_SIZE.
+    """
+    if readonly and not is_memory(db_path):
+        uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(
+            uri, uri=True, timeout=BUSY_TIMEOUT, check_same_thread=False
+        )
+    else:
+        conn = sqlite3.connect(
+            db_path, timeout=BUSY_TIMEOUT, check_same_thread=False
+        )
+
+    if not readonly and not is_memory(db_path):
+        conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+    conn.execute(f"PRAGMA cache_size={int(cache_size)}")
+    return conn
+
+
+class ConnectionPool:
+    """One writer connection plus a pool of read-only connections.
+
+    The writer is serialized by a lock, readers are handed out to one thread at
+    a time and run concurrently with the writer thanks to WAL. In-memory
+    databases are private to a connection, so their reads use the writer.
+    """
+
+    def __init__(
+        self,
+        db_path: Union[str, Path] = ":memory:",
+        *,
+        max_readers: int = MAX_READERS,
+        mmap_size: int = MMAP_SIZE,
+        cache_size: int = CACHE_SIZE,
+    ):
+        """Initialize ConnectionPool.
+
+        Args:
+            db_path (Union[str, Path], optional): Path to the SQLite database file. Defaults to ":memory:".
+            max_readers (int, optional): Maximum read-only connections. Defaults to MAX_READERS.
+            mmap_size (int, optional): Defaults to MMAP_SIZE.
+            cache_size (int, optional): Defaults to CACHE_SIZE.
+        """
+        self.db_path = db_path
+        self.max_readers = max_readers
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+        self.conn = connect(db_path, mmap_size=mmap_size, cache_size=cache_size)
+        self.lock = threading.RLock()
+        self.closed = False
+
+        self._readers: "LifoQueue[Optional[sqlite3.Connection]]" = LifoQueue()
+        self._readers_count = 0
+        self._readers_lock = threading.Lock()
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """Borrow the writer connection inside an immediate transaction.
+
+        The transaction commits on success and rolls back on error, nested
+        blocks join the outermost transaction.
+        """
+        with self.lock:
+            if self.conn.in_transaction:
+                yield self.conn
+                return
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.rollback()
+                raise
+            else:
+                self.conn.commit()
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a read-only connection."""
+        if is_memory(self.db_path) or self.max_readers <= 0:
+            with self.lock:
+                yield self.conn
+            return
+
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            with self._readers_lock:
+                if not self.closed:
+                    self._readers.put(conn)
+                    conn = None
+                else:
+                    self._readers_count -= 1
+            if conn is not None:
+                conn.close()
+
+    def data_version(self) -> int:
+        """A counter that changes whenever another connection commits."""
+        with self.lock:
+            return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def backup(
+        self,
+        target: Union[str, Path],
+        *,
+        pages: int = BACKUP_PAGES,
+        sleep: float = BACKUP_SLEEP,
+        compression: Optional[str] = None,
+    ) -> Path:
+        """Snapshot the database online without blocking the writer.
+
+        The copy runs on a read-only connection holding one read transaction,
+        so it sees a consistent snapshot and is never restarted by concurrent
+        writes, which WAL lets proceed in the meantime.
+
+        Args:
+            target (Union[str, Path]): Path of the snapshot file.
+            pages (int, optional): Pages copied per step. Defaults to BACKUP_PAGES.
+            sleep (float, optional): Seconds slept between steps. Defaults to BACKUP_SLEEP.
+            compression (Optional[str], optional): One of ``COMPRESSIONS``. Defaults to ``None``.
+
+        Returns:
+            Path: Path of the snapshot file.
+        """
+        target = Path(target)
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression '{compression}'.")
+
+        def progress(status: int, remaining: int, total: int) -> None:
+            if remaining and sleep > 0:
+                time.sleep(sleep)
+
+        fd, snapshot = tempfile.mkstemp(suffix=".db", dir=target.parent)
+        os.close(fd)
+        try:
+            dest = sqlite3.connect(snapshot)
+            with self.reader() as conn:
+                in_transaction = conn.in_transaction
+                if not in_transaction:
+                    conn.execute("BEGIN")
+                    conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+                try:
+                    conn.backup(dest, pages=pages, progress=progress)
+                finally:
+                    if not in_transaction:
+                        conn.rollback()
+            dest.close()
+
+            if compression is None:
+                os.replace(snapshot, target)
+            else:
+                with open(snapshot, "rb") as source, COMPRESSIONS[compression](
+                    target, "wb"
+                ) as file:
+                    shutil.copyfileobj(source, file)
+        finally:
+            if os.path.exists(snapshot):
+                os.remove(snapshot)
+        return target
+
+    def restore(self, source: Union[str, Path]) -> None:
+        """Replace the database content with a snapshot from ``backup``.
+
+        Compressed snapshots are detected automatically. Writers wait until
+        the restore completes, in-memory copies should be reloaded afterwards.
+        """
+        compression = detect_compression(source)
+        snapshot = str(source)
+        if compression is not None:
+            fd, snapshot = tempfile.mkstemp(suffix=".db")
+            with COMPRESSIONS[compression](source, "rb") as file, os.fdopen(
+                fd, "wb"
+            ) as dest:
+                shutil.copyfileobj(file, dest)
+        try:
+            conn = sqlite3.connect(snapshot)
+            with self.lock:
+                conn.backup(self.conn)
+            conn.close()
+        finally:
+            if compression is not None:
+                os.remove(snapshot)
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        try:
+            conn = self._readers.get_nowait()
+        except Empty:
+            with self._readers_lock:
+                if self.closed:
+                    raise sqlite3.ProgrammingError("Cannot operate on a closed pool.")
+                if self._readers_count < self.max_readers:
+                    self._readers_count += 1
+                    return connect(
+                        self.db_path,
+                        readonly=True,
+                        mmap_size=self.mmap_size,
+                        cache_size=self.cache_size,
+                    )
+            conn = self._readers.get()
+        if conn is None:
+            # ``close`` leaves a marker waking every waiting thread in turn.
+            self._readers.put(None)
+            raise sqlite3.ProgrammingError("Cannot operate on a closed pool.")
+        return conn
+
+    def close(self) -> None:
+        """Close the writer and every idle reader, borrowed readers close on return.
+
+        Borrowing a reader afterwards raises ``sqlite3.ProgrammingError``.
+        """
+        with self._readers_lock:
+            self.closed = True
+        with self.lock:
+            self.conn.close()
+        while True:
+            try:
+                conn = self._readers.get_nowait()
+            except Empty:
+                break
+            if conn is not None:
+                conn.close()
+                with self._readers_lock:
+                    self._readers_count -= 1
+        self._readers.put(None)
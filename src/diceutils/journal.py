@@ -0,0 +1,390 @@
+"""
+@author         :     苏向夜 <fu050409@163.com>
+@date           :     Oct. 19th, 2026.
+@description    :     This Module Provides an Append-Only Journal for Cards
+                      with Background Compaction into Snapshots.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from diceutils.cards import (
+    BATCH_SIZE,
+    MAX_CARDS_PER_USER,
+    Cards,
+    LockStripes,
+    update_card,
+)
+from diceutils.exceptions import TooManyCardsError
+
+import json
+import os
+import threading
+import time
+
+JOURNAL_THRESHOLD = 1024 * 1024
+"""Bytes of the active journal segment before it is compacted."""
+JOURNAL_HISTORY = 4
+"""Snapshots kept for point-in-time restore."""
+
+Record = Dict[str, Any]
+State = Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, int]]
+
+
+def apply_record(
+    data: Dict[str, List[Dict[str, Any]]], selected_cards: Dict[str, int], record: Record
+) -> None:
+    """Apply one journal record to cards state in place."""
+    op, user_id = record["op"], record["user_id"]
+    if op == "put" or (op == "update" and "cards" in record):
+        # Older journals recorded every update with the user's whole card list.
+        data[user_id] = record["cards"]
+    elif op == "update":
+        update_card(data.setdefault(user_id, []), record["index"], record["attributes"])
+    elif op == "select":
+        selected_cards[user_id] = record["index"]
+    elif op == "delete":
+        if record.get("index") is None:
+            data.pop(user_id, None)
+        else:
+            del data[user_id][record["index"]]
+    elif op == "clear":
+        data[user_id] = []
+        selected_cards[user_id] = 0
+    else:
+        raise ValueError(f"Unknown journal operation '{op}'.")
+
+
+class CardsJournal:
+    """Cards state in memory, persisted as an append-only journal.
+
+    The journal directory holds ``segment-<seq>.ndjson`` files of records
+    numbered from ``seq`` and ``snapshot-<seq>.json`` files with the state
+    after record ``seq``. Once the active segment outgrows ``threshold`` a
+    new segment is started and a background thread folds the finished ones
+    into a new snapshot. The last ``history`` snapshots and the segments after
+    the oldest of them are kept for point-in-time restore.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        threshold: int = JOURNAL_THRESHOLD,
+        history: int = JOURNAL_HISTORY,
+        durable: bool = False,
+    ):
+        """Initialize CardsJournal and recover its state.
+
+        Args:
+            path (Union[str, Path]): Journal directory, created if missing.
+            threshold (int, optional): Segment size in bytes that triggers compaction. Defaults to JOURNAL_THRESHOLD.
+            history (int, optional): Snapshots to keep, at least 1. Defaults to JOURNAL_HISTORY.
+            durable (bool, optional): ``fsync`` every record. Defaults to ``False``.
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.threshold = threshold
+        self.history = max(history, 1)
+        self.durable = durable
+        self.lock = threading.RLock()
+        self.seq = 0
+
+        self._compaction: Optional[threading.Thread] = None
+        self._compaction_lock = threading.Lock()
+        self.data, self.selected_cards = self._recover()
+        self._file = open(self._segment_path(self.seq + 1), "a", encoding="utf-8")
+
+    def _segment_path(self, seq: int) -> Path:
+        return self.path / f"segment-{seq:012d}.ndjson"
+
+    def _snapshot_path(self, seq: int) -> Path:
+        return self.path / f"snapshot-{seq:012d}.json"
+
+    def _list(self, prefix: str) -> List[Tuple[int, Path]]:
+        files = []
+        for file in self.path.glob(f"{prefix}-*"):
+            seq = file.name[len(prefix) + 1 :].split(".", 1)[0]
+            if seq.isdigit():
+                files.append((int(seq), file))
+        return sorted(files)
+
+    @staticmethod
+    def _read_segment(path: Path) -> Iterator[Record]:
+        with open(path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn write at the tail of a crashed segment.
+                    return
+
+    def _read_snapshot(self, path: Optional[Path]) -> Tuple[int, float, State]:
+        if path is None:
+            return 0, 0.0, ({}, {})
+        with open(path, "r", encoding="utf-8") as file:
+            snapshot = json.load(file)
+        return snapshot["seq"], snapshot["ts"], (snapshot["data"], snapshot["selected"])
+
+    def _replay(
+        self,
+        state: State,
+        after: int,
+        until: Optional[int] = None,
+        before: Optional[float] = None,
+        user_id: Optional[str] = None,
+    ) -> Tuple[int, float]:
+        """Apply records ``after < seq <= until`` with ``ts <= before``."""
+        seq, ts = after, 0.0
+        for _, segment in self._list("segment"):
+            for record in self._read_segment(segment):
+                if record["seq"] <= after:
+                    continue
+                if until is not None and record["seq"] > until:
+                    return seq, ts
+                if before is not None and record["ts"] > before:
+                    return seq, ts
+                if user_id is None or record["user_id"] == user_id:
+                    apply_record(*state, record)
+                seq, ts = record["seq"], record["ts"]
+        return seq, ts
+
+    def _recover(self) -> State:
+        snapshots = self._list("snapshot")
+        seq, _, state = self._read_snapshot(snapshots[-1][1] if snapshots else None)
+        self.seq, _ = self._replay(state, seq)
+        return state
+
+    def append(self, op: str, user_id: str, **fields: Any) -> None:
+        """Append a record, compacting in the background when needed."""
+        with self.lock:
+            self.seq += 1
+            record = {"seq": self.seq, "ts": time.time(), "op": op, "user_id": user_id}
+            record.update(fields)
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+            if self.durable:
+                os.fsync(self._file.fileno())
+            if self._file.tell() >= self.threshold:
+                self._rotate()
+
+    def _rotate(self) -> None:
+        self._file.close()
+        self._file = open(self._segment_path(self.seq + 1), "a", encoding="utf-8")
+        self._start_compaction()
+
+    def _start_compaction(self) -> None:
+        with self._compaction_lock:
+            if self._compaction is not None and self._compaction.is_alive():
+                return
+            self._compaction = threading.Thread(
+                target=self._compact, args=(self.seq,), daemon=True
+            )
+            self._compaction.start()
+
+    def compact(self) -> None:
+        """Fold every record into a snapshot and wait for it."""
+        with self._compaction_lock:
+            thread = self._compaction
+        if thread is not None:
+            thread.join()
+        with self.lock:
+            # The active segment may be empty while finished ones were skipped
+            # by a compaction that was still running when they were rotated.
+            if self._file.tell():
+                self._rotate()
+            else:
+                self._start_compaction()
+            thread = self._compaction
+        if thread is not None:
+            thread.join()
+
+    def _compact(self, until: int) -> None:
+        snapshots = self._list("snapshot")
+        seq, ts, state = self._read_snapshot(snapshots[-1][1] if snapshots else None)
+        if until <= seq:
+            return
+        seq, ts = self._replay(state, seq, until)
+
+        path = self._snapshot_path(seq)
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(
+                {"seq": seq, "ts": ts, "data": state[0], "selected": state[1]},
+                file,
+                ensure_ascii=False,
+            )
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+        self._prune()
+
+    def _prune(self) -> None:
+        snapshots = self._list("snapshot")
+        for _, snapshot in snapshots[: -self.history]:
+            snapshot.unlink()
+        oldest = snapshots[-self.history :][0][0]
+
+        segments = self._list("segment")
+        for (_, segment), (next_seq, _) in zip(segments, segments[1:]):
+            if next_seq - 1 <= oldest:
+                segment.unlink()
+
+    def at(self, user_id: str, timestamp: float) -> Tuple[List[Dict[str, Any]], int]:
+        """Rebuild a user's ``(cards, selected_card)`` as of ``timestamp``.
+
+        Raises:
+            ValueError: If ``timestamp`` is older than the retained history.
+        """
+        snapshots = self._list("snapshot")
+        base = None
+        for _, snapshot in reversed(snapshots):
+            seq, ts, state = self._read_snapshot(snapshot)
+            if ts <= timestamp:
+                base = (seq, state)
+                break
+        if base is None:
+            segments = self._list("segment")
+            if segments and segments[0][0] != 1:
+                raise ValueError("Journal history does not reach that far back.")
+            base = (0, ({}, {}))
+
+        seq, (data, selected_cards) = base
+        with self.lock:
+            self._file.flush()
+            self._replay((data, selected_cards), seq, self.seq, timestamp, user_id)
+        return data.get(user_id, []), selected_cards.get(user_id) or 0
+
+    def iterate(
+        self, batch_size: int = BATCH_SIZE
+    ) -> Iterator[Tuple[str, List[Dict[str, Any]], int]]:
+        """Iterate ``(user_id, cards, selected_card)`` of every user."""
+        with self.lock:
+            rows = [
+                (user_id, cards, self.selected_cards.get(user_id) or 0)
+                for user_id, cards in self.data.copy().items()
+            ]
+        yield from rows
+
+    def putmany(self, rows: Iterable[Tuple[str, List[Dict[str, Any]], int]]) -> int:
+        """Replace cards of many users, one record per change."""
+        rows = list(rows)
+        for _, cards, _ in rows:
+            if len(cards) > MAX_CARDS_PER_USER:
+                raise TooManyCardsError("Exceeded maximum allowed cards per user")
+        with self.lock:
+            for user_id, cards, selected_card in rows:
+                self.data[user_id] = cards
+                self.selected_cards[user_id] = selected_card or 0
+                self.append("put", user_id, cards=cards)
+                self.append("select", user_id, index=selected_card or 0)
+        return len(rows)
+
+    def close(self) -> None:
+        """Wait for a running compaction and close the active segment."""
+        with self._compaction_lock:
+            thread = self._compaction
+        if thread is not None:
+            thread.join()
+        with self.lock:
+            self._file.close()
+
+
+class JournaledCards(Cards):
+    """Cards served from memory and persisted through a ``CardsJournal``.
+
+    Every ``update``, ``delete``, ``select`` and ``clear`` appends one small
+    record instead of rewriting stored card data, ``update`` records only the
+    index and attributes it changed.
+    """
+
+    cards_manager: CardsJournal
+
+    def __init__(
+        self,
+        mode: Optional[str] = None,
+        path: Optional[Union[str, Path]] = None,
+        threshold: int = JOURNAL_THRESHOLD,
+        history: int = JOURNAL_HISTORY,
+        durable: bool = False,
+    ):
+        """Initialize JournaledCards.
+
+        Args:
+            mode (str): Mode of the cards.
+            path (Optional[Union[str, Path]]): Journal directory. Defaults to ``<mode>.journal``.
+            threshold (int, optional): See ``CardsJournal``. Defaults to JOURNAL_THRESHOLD.
+            history (int, optional): See ``CardsJournal``. Defaults to JOURNAL_HISTORY.
+            durable (bool, optional): See ``CardsJournal``. Defaults to ``False``.
+        """
+        if mode is None or not mode:
+            mode = "unknown_mode"
+        self.mode = mode
+        self.cards_manager = CardsJournal(
+            path or f"{mode}.journal", threshold, history, durable
+        )
+        self.data = self.cards_manager.data
+        self.selected_cards = self.cards_manager.selected_cards
+        self.locks = LockStripes()
+
+    def save(self):
+        """Changes are journaled by every operation, nothing to save."""
+
+    def load(self, target: Union[Set[str], str] = "*"):
+        """Cards are recovered from the journal on creation, nothing to load."""
+
+    def sync(self) -> None:
+        """A journal has a single writer, nothing to refresh."""
+
+    def update(
+        self,
+        user_id: str,
+        index: Optional[int] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        with self.locks(user_id):
+            index = index or self._get_selected_id(user_id)
+            attributes = {} if attributes is None else attributes
+            super().update(user_id, index, attributes)
+            self.cards_manager.append(
+                "update", user_id, index=index, attributes=attributes
+            )
+
+    def delete(self, user_id: str, index: Optional[int] = None) -> bool:
+        with self.locks(user_id):
+            if not super().delete(user_id, index):
+                return False
+            self.cards_manager.append("delete", user_id, index=index)
+            return True
+
+    def select(self, user_id: str, index: int = 0) -> None:
+        with self.locks(user_id):
+            super().select(user_id, index)
+            self.cards_manager.append("select", user_id, index=index)
+
+    def clear(self, user_id: str) -> None:
+        with self.locks(user_id):
+            super().clear(user_id)
+            self.cards_manager.append("clear", user_id)
+
+    def restore(self, user_id: str, timestamp: float) -> List[Dict[str, Any]]:
+        """Restore a user's cards to their state at ``timestamp``.
+
+        The restore is journaled itself, so it can be restored over again.
+
+        Raises:
+            ValueError: If ``timestamp`` is older than the retained history.
+
+        Returns:
+            List[Dict[str, Any]]: The restored cards.
+        """
+        with self.locks(user_id):
+            cards, selected_card = self.cards_manager.at(user_id, timestamp)
+            self.data[user_id] = cards
+            self.selected_cards[user_id] = selected_card
+            self.cards_manager.append("put", user_id, cards=cards)
+            self.cards_manager.append("select", user_id, index=selected_card)
+        return cards
+
+    def close(self) -> None:
+        """Close the journal."""
+        self.cards_manager.close()
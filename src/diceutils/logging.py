@@ -1,53 +1,610 @@
+from diceutils.database import ConnectionPool, is_memory
 from diceutils.exceptions import TooManyLoggersError
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Any, Literal, Optional, Tuple, Union
+from queue import Empty, Queue
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Any,
+    Literal,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
+import functools
+import heapq
+import itertools
+import json
+import lzma
+import re
 import sqlite3
+import threading
+import time
+import zlib
 
 MAX_LOGGERS_PER_SESSION = 3
+LOG_QUEUE_SIZE = 10000
+"""Calls to ``add`` or ``add_many`` queued for the background writer before
+they block."""
+LOG_FLUSH_INTERVAL = 0.05
+"""Seconds the background writer gathers records into one transaction."""
+LOG_BATCH_SIZE = 500
+"""Rows fetched per page by the streaming reads."""
+
+ARCHIVE_CHUNK_SIZE = 1000
+"""Records packed into one compressed block by ``LogManager.archive``."""
+ARCHIVE_CODECS = {
+    "zlib": (zlib.compress, zlib.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+PRUNE_INTERVAL = 60.0
+"""Seconds between passes of the retention pruner."""
+PRUNE_BATCH_SIZE = 500
+"""Records deleted per transaction by the retention pruner."""
+SNIPPET_TOKENS = 16
+"""Tokens of context around a search hit, characters for the trigram index."""
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_COLUMNS = (
+    "session_id, id, user_id, user_role, card_name, date, data, message_sequence, "
+    "text, ts, roll"
+)
+# Message sequences moved into archive blocks count as logged as well, and
+# rowids continue past archived ones, which the log table would hand out again.
+_INSERT = f"""
+    INSERT INTO log (rowid, {_COLUMNS})
+    SELECT MAX(
+        (SELECT COALESCE(MAX(rowid), 0) FROM log),
+        (SELECT COALESCE(MAX(last_rowid), 0) FROM log_archive)
+    ) + 1, ?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9, ?10, ?11
+    WHERE NOT EXISTS (
+        SELECT 1 FROM log_archive_keys
+        WHERE session_id = ?1 AND id = ?2 AND message_sequence = ?8
+    )
+    ON CONFLICT (session_id, id, message_sequence) DO
+"""
+# What an insert does with a message sequence already logged: keep the first
+# record, or overwrite it in place, keeping its position.
+_INSERTS = {
+    "ignore": _INSERT + "NOTHING",
+    "replace": _INSERT
+    + "UPDATE SET user_id = excluded.user_id, user_role = excluded.user_role, "
+    "card_name = excluded.card_name, date = excluded.date, data = excluded.data, "
+    "text = excluded.text, ts = excluded.ts, roll = excluded.roll",
+}
+OnConflict = Literal["ignore", "replace"]
+
+COMMAND_PREFIXES = (".", "。", "/")
+"""Text prefixes of dice commands, counted as rolls by ``LogManager.stats`` and
+hidden by the renderers, see ``is_command_text``."""
+
+# Statistics statements, formatted with the columns of a log row: ``new.`` or
+# ``old.`` ones inside triggers, placeholders in the same order otherwise.
+# Rolls are the ``roll`` column set by ``is_roll``, up to migration 12 they
+# were judged by the joined text in SQL.
+_ROLL = "COALESCE({row}roll, 0)"
+_TEXT_ROLL = "COALESCE(substr(ltrim({row}text), 1, 1) IN ({prefixes}), 0)"
+_COUNT = (
+    "INSERT INTO log_stats (session_id, id, user_id, user_role, messages, rolls) "
+    "VALUES ({session_id}, {id}, COALESCE({user_id}, ''), COALESCE({user_role}, ''), "
+    "1, {rolls}) ON CONFLICT (session_id, id, user_id, user_role) "
+    "DO UPDATE SET messages = messages + 1, rolls = rolls + excluded.rolls"
+)
+_UNCOUNT = (
+    "UPDATE log_stats SET messages = messages - 1, rolls = rolls - {rolls} "
+    "WHERE session_id = {session_id} AND id = {id} "
+    "AND user_id = COALESCE({user_id}, '') AND user_role = COALESCE({user_role}, '')"
+)
+_PRUNE_STATS = (
+    "DELETE FROM log_stats "
+    "WHERE session_id = {session_id} AND id = {id} AND messages <= 0"
+)
+_ARCHIVE_KEY = "INSERT OR REPLACE INTO log_archive_keys VALUES (?, ?, ?, ?)"
+_STOP = object()
+# Columns of a record as passed to ``LogManager._record``, and as packed into
+# archive blocks, which store their column names so blocks outlive schema changes.
+_RECORD_COLUMNS = (
+    "rowid",
+    "user_id",
+    "user_role",
+    "card_name",
+    "date",
+    "data",
+    "message_sequence",
+)
+_ARCHIVE_COLUMNS = _RECORD_COLUMNS + ("text", "ts")
+
+
+def message_text(data: Any) -> str:
+    """Plain text of a logged message, its text segments joined.
+
+    Segments are ``{"type": "text", "data": ...}`` dicts with the text as
+    ``data`` or ``data["text"]``, other segment types are skipped.
+    """
+    if isinstance(data, str):
+        return data
+    texts = []
+    for segment in data if isinstance(data, (list, tuple)) else [data]:
+        if isinstance(segment, str):
+            texts.append(segment)
+        elif isinstance(segment, dict) and segment.get("type", "text") == "text":
+            text = segment.get("data")
+            if isinstance(text, dict):
+                text = text.get("text")
+            if isinstance(text, str):
+                texts.append(text)
+    return "".join(texts)
+
+
+def first_content(data: Any) -> Optional[str]:
+    """Content of the first text or image segment of a logged message, the
+    first element the renderers show, see ``message_text`` for segments."""
+    for segment in data if isinstance(data, (list, tuple)) else [data]:
+        if isinstance(segment, str):
+            return segment
+        if isinstance(segment, dict) and segment.get("type") in ("text", "image"):
+            content = segment.get("data")
+            if isinstance(content, dict):
+                content = content.get("text" if segment["type"] == "text" else "url")
+            return None if content is None else str(content)
+    return None
+
+
+def _decode(data: str) -> Any:
+    try:
+        return eval(data)
+    except Exception:
+        return data
+
+
+def _decode_text(data: str) -> str:
+    try:
+        return message_text(eval(data))
+    except Exception:
+        return data
+
+
+def timestamp(date: Union[str, int, float, datetime]) -> Optional[int]:
+    """Epoch seconds of a log date, naive dates being local time.
+
+    Returns:
+        Optional[int]: ``None`` for strings not in ``DATE_FORMAT``.
+    """
+    if isinstance(date, str):
+        try:
+            date = datetime.strptime(date, DATE_FORMAT)
+        except ValueError:
+            return None
+    if isinstance(date, datetime):
+        return int(date.timestamp())
+    return int(date)
+
+
+def is_command_text(content: Optional[str]) -> bool:
+    """Whether the content of a message's first element is a dice command,
+    ignoring surrounding whitespace."""
+    return bool(content) and content.strip().startswith(COMMAND_PREFIXES)
+
+
+def is_roll(data: Any) -> bool:
+    """Whether a logged message is a dice command, judged like the renderers
+    do by its first element alone, see ``first_content``."""
+    return is_command_text(first_content(data))
+
+
+def _stats_columns(row: str, roll: str = _ROLL) -> Dict[str, str]:
+    columns = {
+        column: f"{row}{column}"
+        for column in ("session_id", "id", "user_id", "user_role")
+    }
+    prefixes = ", ".join(f"'{prefix}'" for prefix in COMMAND_PREFIXES)
+    columns["rolls"] = roll.format(row=row, prefixes=prefixes)
+    return columns
+
+
+def _stats_triggers(roll: str, columns: str) -> Tuple[str, ...]:
+    new, old = _stats_columns("new.", roll), _stats_columns("old.", roll)
+    return (
+        f"CREATE TRIGGER log_stats_insert AFTER INSERT ON log BEGIN "
+        f"{_COUNT.format(**new)}; END",
+        f"CREATE TRIGGER log_stats_delete AFTER DELETE ON log BEGIN "
+        f"{_UNCOUNT.format(**old)}; {_PRUNE_STATS.format(**old)}; END",
+        f"CREATE TRIGGER log_stats_update "
+        f"AFTER UPDATE OF user_id, user_role, {columns} ON log BEGIN "
+        f"{_UNCOUNT.format(**old)}; {_PRUNE_STATS.format(**old)}; "
+        f"{_COUNT.format(**new)}; END",
+    )
+
+
+_PARAMS = dict.fromkeys(("session_id", "id", "user_id", "user_role", "rolls"), "?")
+
+
+def _backfill_stats(conn: sqlite3.Connection, roll: str = _ROLL) -> None:
+    conn.execute(
+        "INSERT INTO log_stats SELECT session_id, id, COALESCE(user_id, ''), "
+        f"COALESCE(user_role, ''), COUNT(*), SUM({_stats_columns('', roll)['rolls']}) "
+        "FROM log GROUP BY 1, 2, 3, 4"
+    )
+    for session_id, id, compression, data in conn.execute(
+        "SELECT session_id, id, compression, data FROM log_archive"
+    ).fetchall():
+        conn.executemany(
+            _COUNT.format(**_PARAMS),
+            [
+                (
+                    session_id,
+                    id,
+                    row["user_id"],
+                    row["user_role"],
+                    is_roll(_decode(row["data"])),
+                )
+                for row in LogManager._unpack(compression, data)
+            ],
+        )
+
+
+def _backfill_roll(conn: sqlite3.Connection) -> None:
+    rows = conn.execute("SELECT rowid, data FROM log").fetchall()
+    conn.executemany(
+        "UPDATE log SET roll = ? WHERE rowid = ?",
+        [(is_roll(_decode(data)), rowid) for rowid, data in rows],
+    )
+
+
+def _backfill_archive_keys(conn: sqlite3.Connection) -> None:
+    for session_id, id, chunk, compression, data in conn.execute(
+        "SELECT session_id, id, chunk, compression, data FROM log_archive"
+    ).fetchall():
+        conn.executemany(
+            _ARCHIVE_KEY,
+            [
+                (session_id, id, row["message_sequence"], chunk)
+                for row in LogManager._unpack(compression, data)
+                if row["message_sequence"] is not None
+            ],
+        )
+
+
+def _backfill_text(conn: sqlite3.Connection) -> None:
+    rows = conn.execute("SELECT rowid, data FROM log").fetchall()
+    conn.executemany(
+        "UPDATE log SET text = ? WHERE rowid = ?",
+        [(_decode_text(data), rowid) for rowid, data in rows],
+    )
+
+
+_FTS = (
+    "CREATE VIRTUAL TABLE log_fts USING fts5("
+    "text, content='log', content_rowid='rowid', tokenize='trigram')",
+    "INSERT INTO log_fts (log_fts) VALUES ('rebuild')",
+    "CREATE TRIGGER log_fts_insert AFTER INSERT ON log BEGIN "
+    "INSERT INTO log_fts (rowid, text) VALUES (new.rowid, new.text); END",
+    "CREATE TRIGGER log_fts_delete AFTER DELETE ON log BEGIN "
+    "INSERT INTO log_fts (log_fts, rowid, text) "
+    "VALUES ('delete', old.rowid, old.text); END",
+    "CREATE TRIGGER log_fts_update AFTER UPDATE OF text ON log BEGIN "
+    "INSERT INTO log_fts (log_fts, rowid, text) "
+    "VALUES ('delete', old.rowid, old.text); "
+    "INSERT INTO log_fts (rowid, text) VALUES (new.rowid, new.text); END",
+)
+
+
+def _trigram_available(conn: sqlite3.Connection) -> bool:
+    """Whether SQLite has FTS5 with the trigram tokenizer, from 3.34 on."""
+    try:
+        conn.execute(
+            "CREATE VIRTUAL TABLE temp.log_fts_probe "
+            "USING fts5(text, tokenize='trigram')"
+        )
+    except sqlite3.OperationalError:
+        return False
+    conn.execute("DROP TABLE temp.log_fts_probe")
+    return True
+
+
+def _has_fts(conn: sqlite3.Connection) -> bool:
+    return (
+        conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'log_fts'"
+        ).fetchone()
+        is not None
+    )
+
+
+def _create_fts(conn: sqlite3.Connection) -> None:
+    """Index message text by trigrams, skipped where SQLite lacks them."""
+    if _has_fts(conn) or not _trigram_available(conn):
+        return
+    for statement in _FTS:
+        conn.execute(statement)
+
+
+# Schema changes applied in order, ``PRAGMA user_version`` counts the applied ones.
+_MIGRATIONS: List[Tuple[Union[str, Callable[[sqlite3.Connection], None]], ...]] = [
+    (
+        # Also serves lookups by ``(session_id, id)`` alone.
+        "CREATE INDEX IF NOT EXISTS log_session_message "
+        "ON log (session_id, id, message_sequence)",
+    ),
+    (
+        # Rowids trail every index entry, so this one serves a logger's rows
+        # in insertion order and keyset pagination by rowid without sorting.
+        "CREATE INDEX IF NOT EXISTS log_session_id ON log (session_id, id)",
+    ),
+    (
+        # Full-text search: the message text is kept next to its data and
+        # indexed by trigrams, which match Chinese text without word breaks.
+        "ALTER TABLE log ADD COLUMN text TEXT",
+        _backfill_text,
+        _create_fts,
+    ),
+    (
+        # Compressed blocks of archived loggers, see ``LogManager.archive``.
+        "CREATE TABLE log_archive ("
+        "session_id TEXT NOT NULL, id TEXT NOT NULL, chunk INTEGER NOT NULL, "
+        "first_rowid INTEGER, last_rowid INTEGER, count INTEGER, "
+        "compression TEXT, data BLOB, PRIMARY KEY (session_id, id, chunk))",
+    ),
+    (
+        # Epoch seconds of ``date``, which is local time like ``timestamp``
+        # assumes, so the ``utc`` modifier converts it the same way.
+        "ALTER TABLE log ADD COLUMN ts INTEGER",
+        "UPDATE log SET ts = CAST(strftime('%s', date, 'utc') AS INTEGER)",
+        "CREATE INDEX IF NOT EXISTS log_session_ts ON log (session_id, id, ts)",
+    ),
+    (
+        # Message sequences identify records, redelivered duplicates keep the first.
+        "DELETE FROM log WHERE rowid NOT IN "
+        "(SELECT MIN(rowid) FROM log GROUP BY session_id, id, message_sequence)",
+        "DROP INDEX IF EXISTS log_session_message",
+        "CREATE UNIQUE INDEX log_session_message "
+        "ON log (session_id, id, message_sequence)",
+    ),
+    (
+        # Messages and rolls per user and role of each logger, kept up to
+        # date by triggers, see ``LogManager.stats``.
+        "CREATE TABLE log_stats ("
+        "session_id TEXT NOT NULL, id TEXT NOT NULL, user_id TEXT NOT NULL, "
+        "user_role TEXT NOT NULL, messages INTEGER NOT NULL, rolls INTEGER NOT NULL, "
+        "PRIMARY KEY (session_id, id, user_id, user_role)) WITHOUT ROWID",
+        functools.partial(_backfill_stats, roll=_TEXT_ROLL),
+        *_stats_triggers(_TEXT_ROLL, "text"),
+    ),
+    (
+        # Oldest records first for the retention pruner.
+        "CREATE INDEX IF NOT EXISTS log_ts ON log (ts)",
+    ),
+    (
+        # A session's records in insertion order across its loggers, for
+        # pruning them oldest first without sorting.
+        "CREATE INDEX IF NOT EXISTS log_session ON log (session_id)",
+    ),
+    (
+        # Message sequences of archived records and their blocks, so inserts
+        # skip redelivered duplicates of records no longer in the log table.
+        "CREATE TABLE log_archive_keys ("
+        "session_id TEXT NOT NULL, id TEXT NOT NULL, message_sequence TEXT NOT NULL, "
+        "chunk INTEGER NOT NULL, PRIMARY KEY (session_id, id, message_sequence)) "
+        "WITHOUT ROWID",
+        _backfill_archive_keys,
+        "DELETE FROM log WHERE EXISTS (SELECT 1 FROM log_archive_keys AS archived "
+        "WHERE archived.session_id = log.session_id AND archived.id = log.id "
+        "AND archived.message_sequence = log.message_sequence)",
+    ),
+    (
+        # The last archived rowid, which new records are numbered after.
+        "CREATE INDEX IF NOT EXISTS log_archive_last ON log_archive (last_rowid)",
+    ),
+    (
+        # Rolls judged by the first element like the renderers do, which SQL
+        # cannot read from the data, so each record stores its own.
+        "ALTER TABLE log ADD COLUMN roll INTEGER",
+        _backfill_roll,
+        "DROP TRIGGER log_stats_insert",
+        "DROP TRIGGER log_stats_delete",
+        "DROP TRIGGER log_stats_update",
+        *_stats_triggers(_ROLL, "roll"),
+        "DELETE FROM log_stats",
+        _backfill_stats,
+    ),
+]
+SCHEMA_VERSION = len(_MIGRATIONS)
 
 
 class LogManager:
     def __init__(
         self,
         db_path: Union[str, Path] = ":memory:",
+        *,
+        background: bool = False,
+        queue_size: int = LOG_QUEUE_SIZE,
+        flush_interval: float = LOG_FLUSH_INTERVAL,
+        max_age: Optional[float] = None,
+        max_rows_per_session: Optional[int] = None,
+        max_size: Optional[int] = None,
+        rotate_dir: Optional[Union[str, Path]] = None,
+        prune_interval: float = PRUNE_INTERVAL,
     ):
+        """Initialize LogManager.
+
+        Retention policies are enforced by ``prune``, run every
+        ``prune_interval`` seconds by a background thread when any is set.
+
+        Args:
+            db_path (Union[str, Path], optional): Path to the SQLite database file. Defaults to ":memory:".
+            background (bool, optional): Insert records from a background thread in
+                batches, ``add`` then only queues them. Defaults to ``False``.
+            queue_size (int, optional): Queued calls before ``add`` blocks. Defaults to LOG_QUEUE_SIZE.
+            flush_interval (float, optional): Seconds gathered per batch. Defaults to LOG_FLUSH_INTERVAL.
+            max_age (Optional[float], optional): Seconds records are kept. Defaults to ``None``.
+            max_rows_per_session (Optional[int], optional): Records kept per session,
+                the oldest are pruned first. Defaults to ``None``.
+            max_size (Optional[int], optional): Bytes of used database pages, the
+                oldest records are pruned until below. Defaults to ``None``.
+            rotate_dir (Optional[Union[str, Path]], optional): Directory of the monthly
+                files pruned records are moved to, ``None`` to drop them. Defaults to ``None``.
+            prune_interval (float, optional): Defaults to PRUNE_INTERVAL.
+        """
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        self.pool = ConnectionPool(db_path)
+        self.conn = self.pool.conn
         self._create_table()
+        # Logger ids per session, filled on first use and dropped whenever
+        # another connection writes.
+        self._ids: Dict[str, Set[str]] = {}
+        self._data_version = self.pool.data_version()
+
+        self.flush_interval = flush_interval
+        self._queue: "Optional[Queue[Any]]" = None
+        self._writer: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+        if background:
+            self._queue = Queue(queue_size)
+            self._writer = threading.Thread(target=self._write_loop, daemon=True)
+            self._writer.start()
+
+        self.max_age = max_age
+        self.max_rows_per_session = max_rows_per_session
+        self.max_size = max_size
+        self.rotate_dir = None if rotate_dir is None else Path(rotate_dir)
+        self.prune_interval = prune_interval
+        self._rotations: Dict[str, LogManager] = {}
+        self._stop_pruner = threading.Event()
+        self._pruner: Optional[threading.Thread] = None
+        self._prune_error: Optional[BaseException] = None
+        if (max_age, max_rows_per_session, max_size) != (None, None, None):
+            self._pruner = threading.Thread(target=self._prune_loop, daemon=True)
+            self._pruner.start()
 
     def _create_table(self):
-        cursor = self.conn.cursor()
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS log (
-                session_id TEXT,
-                id TEXT,
-                user_id TEXT,
-                user_role TEXT,
-                card_name TEXT,
-                date TEXT,
-                data TEXT,
-                message_sequence TEXT
-            );
-            """
-        )
-        self.conn.commit()
-        cursor.close()
+        with self.pool.writer() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS log (
+                    session_id TEXT,
+                    id TEXT,
+                    user_id TEXT,
+                    user_role TEXT,
+                    card_name TEXT,
+                    date TEXT,
+                    data TEXT,
+                    message_sequence TEXT
+                );
+                """
+            )
+            self._migrate(conn)
+            # Databases migrated by an SQLite without trigrams get the index
+            # once opened by one with them, ``search`` scans text until then.
+            _create_fts(conn)
+            self._fts = _has_fts(conn)
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for version, statements in enumerate(_MIGRATIONS[version:], version + 1):
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {version}")
 
     def _insert(
         self,
         cursor: sqlite3.Cursor,
-        data: Tuple[str, str, str, str, str, str, str, str],
+        rows: List[Tuple[Any, ...]],
+        on_conflict: OnConflict = "ignore",
     ):
-        cursor.execute(
-            """
-            INSERT INTO log (session_id, id, user_id, user_role, card_name, date, data, message_sequence) 
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            data,
-        )
+        if on_conflict == "replace":
+            # The insert skips archived records, they are replaced in place.
+            self._replace_archived(cursor.connection, rows)
+        cursor.executemany(_INSERTS[on_conflict], rows)
+
+    def _replace_archived(
+        self, conn: sqlite3.Connection, rows: List[Tuple[Any, ...]]
+    ) -> None:
+        blocks: Dict[Tuple[str, str, int], Dict[str, Tuple[Any, ...]]] = {}
+        for row in rows:
+            archived = conn.execute(
+                "SELECT chunk FROM log_archive_keys "
+                "WHERE session_id = ? AND id = ? AND message_sequence = ?",
+                (row[0], row[1], row[7]),
+            ).fetchone()
+            if archived is not None:
+                blocks.setdefault((row[0], row[1], archived[0]), {})[row[7]] = row
+        for (session_id, id, chunk), replaced in blocks.items():
+
+            def replace(
+                record: Dict[str, Any],
+                replaced: Dict[str, Tuple[Any, ...]] = replaced,
+            ) -> Optional[Dict[str, Any]]:
+                row = replaced.get(record["message_sequence"])
+                if row is None:
+                    return record
+                return {
+                    "rowid": record["rowid"],
+                    **dict(zip(_ARCHIVE_COLUMNS[1:], row[2:])),
+                }
+
+            self._repack(conn, session_id, id, [chunk], replace)
+
+    def _write_loop(self) -> None:
+        """Insert queued records, one transaction per batch."""
+        while True:
+            item = self._queue.get()
+            batch, flushed, stop = [], [], False
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stop = True
+                    break
+                if isinstance(item, threading.Event):
+                    flushed.append(item)
+                    break
+                batch.extend(item)
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except Empty:
+                    break
+
+            if batch:
+                try:
+                    with self.pool.writer() as conn:
+                        cursor = conn.cursor()
+                        for on_conflict, rows in itertools.groupby(
+                            batch, key=lambda item: item[0]
+                        ):
+                            self._insert(cursor, [row for _, row in rows], on_conflict)
+                        cursor.close()
+                except BaseException as err:
+                    self._error = err
+                    self._ids = {}
+            for event in flushed:
+                event.set()
+            if stop:
+                return
+
+    def flush(self) -> None:
+        """Wait until every queued record is written.
+
+        Raises:
+            Exception: The error of a failed background batch, whose records are
+                lost, or of a failed background prune.
+        """
+        if self._writer is not None and self._writer.is_alive():
+            event = threading.Event()
+            self._queue.put(event)
+            event.wait()
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
 
     def add(
         self,
@@ -60,50 +617,134 @@ class LogManager:
         date: str,
         data: str,
         message_sequence: str,
+        text: Optional[str] = None,
+        ts: Optional[int] = None,
+        roll: Optional[bool] = None,
+        on_conflict: OnConflict = "ignore",
     ) -> None:
-        count = self.count(session_id)
-        if (
-            count == MAX_LOGGERS_PER_SESSION and int(id) >= MAX_LOGGERS_PER_SESSION
-        ) or count > MAX_LOGGERS_PER_SESSION:
-            raise TooManyLoggersError(
-                f"Too many loggers, expected less than {MAX_LOGGERS_PER_SESSION}, "
-                f"but given index is '{id}'."
-            )
-        cursor = self.conn.cursor()
-        self._insert(
-            cursor,
-            (
-                session_id,
-                id,
-                user_id,
-                user_role,
-                card_name,
-                date,
-                data,
-                message_sequence,
-            ),
+        """Log a record, once per message sequence of a logger.
+
+        Args:
+            on_conflict (OnConflict, optional): Keep the record already logged with
+                this message sequence, or replace it. Defaults to "ignore".
+        """
+        self.add_many(
+            [
+                {
+                    "session_id": session_id,
+                    "id": id,
+                    "user_id": user_id,
+                    "user_role": user_role,
+                    "card_name": card_name,
+                    "date": date,
+                    "data": data,
+                    "message_sequence": message_sequence,
+                    "text": text,
+                    "ts": ts,
+                    "roll": roll,
+                }
+            ],
+            on_conflict,
         )
-        self.conn.commit()
-        cursor.close()
+
+    def add_many(
+        self, records: Iterable[Dict[str, Any]], on_conflict: OnConflict = "ignore"
+    ) -> None:
+        """Log records in one transaction, see ``add`` for their keys.
+
+        Raises:
+            TooManyLoggersError: A record would open one logger too many, then
+                nothing is logged.
+        """
+        if on_conflict not in _INSERTS:
+            raise ValueError(f"Unknown conflict resolution '{on_conflict}'.")
+        added: Dict[str, Set[str]] = {}
+        rows = []
+        for record in records:
+            session_id, id = record["session_id"], record["id"]
+            ids = added.get(session_id)
+            if ids is None:
+                ids = added[session_id] = set(self._logger_ids(session_id))
+            count = len(ids)
+            if (
+                count == MAX_LOGGERS_PER_SESSION and int(id) >= MAX_LOGGERS_PER_SESSION
+            ) or count > MAX_LOGGERS_PER_SESSION:
+                raise TooManyLoggersError(
+                    f"Too many loggers, expected less than {MAX_LOGGERS_PER_SESSION}, "
+                    f"but given index is '{id}'."
+                )
+            ids.add(id)
+            date, data = record["date"], record["data"]
+            text, ts, roll = record.get("text"), record.get("ts"), record.get("roll")
+            rows.append(
+                (
+                    session_id,
+                    id,
+                    record["user_id"],
+                    record["user_role"],
+                    record["card_name"],
+                    date,
+                    data,
+                    record["message_sequence"],
+                    _decode_text(data) if text is None else text,
+                    timestamp(date) if ts is None else ts,
+                    is_roll(_decode(data)) if roll is None else roll,
+                )
+            )
+        if not rows:
+            return
+
+        if self._queue is not None:
+            if self._error is not None:
+                self.flush()
+            # Blocks while the queue is full, slowing callers to the writer.
+            self._queue.put([(on_conflict, row) for row in rows])
+        else:
+            with self.pool.writer() as conn:
+                cursor = conn.cursor()
+                self._insert(cursor, rows, on_conflict)
+                cursor.close()
+        self._ids.update(added)
+
+    def _logger_ids(self, session_id: str) -> Set[str]:
+        data_version = self.pool.data_version()
+        if data_version != self._data_version:
+            self._data_version = data_version
+            self._ids = {}
+        ids = self._ids.get(session_id)
+        if ids is None:
+            with self.pool.reader() as conn:
+                cursor = conn.execute(
+                    "SELECT id FROM log WHERE session_id = ? "
+                    "UNION SELECT id FROM log_archive WHERE session_id = ?",
+                    (session_id, session_id),
+                )
+                ids = self._ids[session_id] = {id for id, in cursor}
+                cursor.close()
+        return ids
 
     def count(self, session_id: str) -> int:
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "SELECT COUNT(DISTINCT id) AS unique_ids FROM log WHERE session_id = ?;",
-            (session_id,),
-        )
-        count = cursor.fetchone()[0]
-        cursor.close()
-        return count
+        return len(self._logger_ids(session_id))
 
     def loadall(self) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "SELECT session_id, id, user_id, user_role, card_name, date, data FROM log"
-        )
-        result = cursor.fetchall()
+        self.flush()
+        with self.pool.reader() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT session_id, id, user_id, user_role, card_name, date, data "
+                "FROM log ORDER BY rowid"
+            )
+            result = cursor.fetchall()
+            cursor.close()
         datas: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
-        for session_id, id, user_id, user_role, card_name, date, data in result:
+        archived = (
+            (session_id, id, *(row[column] for column in _RECORD_COLUMNS[1:6]))
+            for session_id, id, row in self._archived()
+        )
+        for session_id, id, user_id, user_role, card_name, date, data in (
+            *archived,
+            *result,
+        ):
             if session_id not in datas:
                 datas[session_id] = {}
             if id not in datas[session_id]:
@@ -119,20 +760,25 @@ class LogManager:
                 }
             )
 
-        cursor.close()
         return datas
 
     def load(self, session_id: str, id: str) -> List[Dict[str, Any]]:
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "SELECT user_id, user_role, card_name, date, data FROM log "
-            "WHERE session_id = ? AND id = ?",
-            (session_id, id),
+        self.flush()
+        with self.pool.reader() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT user_id, user_role, card_name, date, data FROM log "
+                "WHERE session_id = ? AND id = ? ORDER BY rowid",
+                (session_id, id),
+            )
+            result = cursor.fetchall()
+            cursor.close()
+        archived = (
+            tuple(row[column] for column in _RECORD_COLUMNS[1:6])
+            for _, _, row in self._archived(session_id, id)
         )
-
-        result = cursor.fetchall()
         datas: List[Dict[str, Any]] = []
-        for user_id, user_role, card_name, date, data in result:
+        for user_id, user_role, card_name, date, data in (*archived, *result):
             datas.append(
                 {
                     "user_id": user_id,
@@ -143,41 +789,804 @@ class LogManager:
                 }
             )
 
-        cursor.close()
         return datas
 
-    def remove(self, session_id: str, id: str, message_sequence: str):
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "DELETE FROM log WHERE session_id = ? AND id = ? AND message_sequence = ?",
-            (session_id, id, message_sequence),
+    @staticmethod
+    def _record(
+        rowid: int,
+        user_id: str,
+        user_role: str,
+        card_name: str,
+        date: str,
+        data: str,
+        message_sequence: str,
+    ) -> Dict[str, Any]:
+        return {
+            "user_id": user_id,
+            "user_role": user_role,
+            "card_name": card_name,
+            "date": date,
+            "data": eval(data),
+            "rowid": rowid,
+            "message_sequence": message_sequence,
+        }
+
+    def iterload(
+        self,
+        session_id: str,
+        id: str,
+        *,
+        batch_size: int = LOG_BATCH_SIZE,
+        after: Optional[Union[int, str]] = None,
+        order_by: Literal["rowid", "message_sequence"] = "rowid",
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream the records of a logger page by page.
+
+        Pages are fetched by keyset pagination on an index and the reader
+        connection is released between pages, each payload is decoded only
+        when its record is reached. Records also carry ``rowid`` and
+        ``message_sequence`` to resume from. Archived records are merged in,
+        one block at a time in rowid order.
+
+        Args:
+            batch_size (int, optional): Rows per page. Defaults to LOG_BATCH_SIZE.
+            after (Optional[Union[int, str]], optional): Start after this rowid, or this
+                message sequence when ordered by it. Defaults to the start.
+            order_by (Literal["rowid", "message_sequence"], optional): Defaults to "rowid".
+        """
+        self.flush()
+        columns = "rowid, user_id, user_role, card_name, date, data, message_sequence"
+        if order_by == "rowid":
+            query = (
+                f"SELECT {columns} FROM log WHERE session_id = ? AND id = ? "
+                "AND rowid > ? ORDER BY rowid LIMIT ?"
+            )
+            key: Tuple[Any, ...] = (-1 if after is None else int(after),)
+        elif order_by == "message_sequence":
+            query = (
+                f"SELECT {columns} FROM log WHERE session_id = ? AND id = ? "
+                "AND (message_sequence, rowid) > (?, ?) "
+                "ORDER BY message_sequence, rowid LIMIT ?"
+            )
+            # Strictly after ``after``: past its largest possible rowid.
+            key = ("", -1) if after is None else (str(after), 2**63 - 1)
+        else:
+            raise ValueError(f"Unknown log order '{order_by}'.")
+
+        def sort_key(row: Tuple[Any, ...]) -> Tuple[Any, ...]:
+            return (row[0],) if order_by == "rowid" else (row[6], row[0])
+
+        def live(key: Tuple[Any, ...]) -> Iterator[Tuple[Any, ...]]:
+            while True:
+                with self.pool.reader() as conn:
+                    rows = conn.execute(
+                        query, (session_id, id, *key, batch_size)
+                    ).fetchall()
+                yield from rows
+                if len(rows) < batch_size:
+                    return
+                key = sort_key(rows[-1])
+
+        archived: Iterator[Tuple[Any, ...]] = (
+            row
+            for row in (
+                tuple(row[column] for column in _RECORD_COLUMNS)
+                for _, _, row in self._archived(session_id, id)
+            )
+            if sort_key(row) > key
+        )
+        if order_by == "message_sequence":
+            # Blocks are packed in rowid order.
+            archived = iter(sorted(archived, key=sort_key))
+        for row in heapq.merge(archived, live(key), key=sort_key):
+            yield self._record(*row)
+
+    def iterloadall(
+        self, *, batch_size: int = LOG_BATCH_SIZE, after: Optional[int] = None
+    ) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """Stream every record in rowid order, see ``iterload``.
+
+        Archived records come first, logger by logger, unless resuming with
+        ``after``, which counts among the records still in the log table.
+
+        Yields:
+            Tuple[str, str, Dict[str, Any]]: ``(session_id, id, record)`` tuples.
+        """
+        self.flush()
+        if after is None:
+            for session_id, id, row in self._archived():
+                yield session_id, id, self._record(
+                    *(row[column] for column in _RECORD_COLUMNS)
+                )
+        rowid = -1 if after is None else after
+        while True:
+            with self.pool.reader() as conn:
+                rows = conn.execute(
+                    "SELECT rowid, session_id, id, user_id, user_role, card_name, "
+                    "date, data, message_sequence FROM log "
+                    "WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (rowid, batch_size),
+                ).fetchall()
+            for rowid, session_id, id, *row in rows:
+                yield session_id, id, self._record(rowid, *row)
+            if len(rows) < batch_size:
+                return
+
+    def load_range(
+        self,
+        session_id: str,
+        id: str,
+        start: Optional[Union[int, float, datetime]] = None,
+        end: Optional[Union[int, float, datetime]] = None,
+        *,
+        batch_size: int = LOG_BATCH_SIZE,
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream the records of a logger dated in ``[start, end)``.
+
+        Records come in date order, paged by keyset pagination on the
+        ``(session_id, id, ts)`` index like ``iterload``.
+
+        Args:
+            start (Optional[Union[int, float, datetime]], optional): Epoch seconds or a
+                datetime, naive ones in local time. Defaults to the first record.
+            end (Optional[Union[int, float, datetime]], optional): Defaults to after the last record.
+            batch_size (int, optional): Rows per page. Defaults to LOG_BATCH_SIZE.
+        """
+        self.flush()
+        first = -(2**63) if start is None else timestamp(start)
+        last = 2**63 - 1 if end is None else timestamp(end)
+        query = (
+            "SELECT ts, rowid, user_id, user_role, card_name, date, data, "
+            "message_sequence FROM log WHERE session_id = ? AND id = ? "
+            "AND (ts, rowid) > (?, ?) AND ts < ? ORDER BY ts, rowid LIMIT ?"
+        )
+
+        def live(key: Tuple[int, int]) -> Iterator[Tuple[Any, ...]]:
+            while True:
+                with self.pool.reader() as conn:
+                    rows = conn.execute(
+                        query, (session_id, id, *key, last, batch_size)
+                    ).fetchall()
+                yield from rows
+                if len(rows) < batch_size:
+                    return
+                key = rows[-1][:2]
+
+        archived = []
+        for _, _, row in self._archived(session_id, id):
+            ts = row.get("ts")
+            if ts is None:
+                ts = timestamp(row["date"])
+            if ts is not None and first <= ts < last:
+                archived.append((ts, *(row[column] for column in _RECORD_COLUMNS)))
+        archived.sort(key=lambda row: row[:2])
+
+        for row in heapq.merge(archived, live((first, -1)), key=lambda row: row[:2]):
+            yield self._record(*row[1:])
+
+    def stats(self, session_id: str, id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Messages and rolls per user and role, read from counters kept up to
+        date on every write instead of from the records.
+
+        Args:
+            session_id (str): Session to report.
+            id (Optional[str], optional): Logger to report, ``None`` for all of the session.
+
+        Returns:
+            List[Dict[str, Any]]: ``id``, ``user_id``, ``user_role``, ``messages``
+                and ``rolls`` of each user and role, logger by logger.
+        """
+        self.flush()
+        where, params = "session_id = ?", (session_id,)
+        if id is not None:
+            where, params = "session_id = ? AND id = ?", (session_id, id)
+        with self.pool.reader() as conn:
+            rows = conn.execute(
+                "SELECT id, user_id, user_role, messages, rolls FROM log_stats "
+                f"WHERE {where} ORDER BY session_id, id, user_id, user_role",
+                params,
+            ).fetchall()
+        return [
+            {
+                "id": id,
+                "user_id": user_id,
+                "user_role": user_role,
+                "messages": messages,
+                "rolls": rolls,
+            }
+            for id, user_id, user_role, messages, rolls in rows
+        ]
+
+    def search(
+        self, session_id: Optional[str], query: str, limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """Search message text, best matches first.
+
+        Queries of three or more characters use the trigram index ranked by
+        bm25, shorter ones, and every query where SQLite lacks the trigram
+        tokenizer, fall back to a case-insensitive substring scan of the
+        session. Archived loggers are not searched.
+
+        Args:
+            session_id (Optional[str]): Session to search, ``None`` for all.
+            query (str): Text to find.
+            limit (int, optional): Hits to return at most. Defaults to 20.
+
+        Returns:
+            List[Dict[str, Any]]: Hits with ``session_id``, ``id``, ``rowid``,
+                ``message_sequence``, ``user_id``, ``card_name``, ``date``,
+                ``snippet`` with the match in brackets, and ``rank``.
+        """
+        self.flush()
+        if not query:
+            return []
+        columns = (
+            "log.rowid, log.session_id, log.id, log.message_sequence, log.user_id, "
+            "log.card_name, log.date"
         )
-        self.conn.commit()
-        cursor.close()
+        session = "" if session_id is None else "AND log.session_id = ?"
+        params: List[Any] = [] if session_id is None else [session_id]
+
+        if len(query) >= 3 and self._fts:
+            sql = (
+                f"SELECT {columns}, snippet(log_fts, 0, '[', ']', '…', "
+                f"{SNIPPET_TOKENS}), log_fts.rank FROM log_fts "
+                "JOIN log ON log.rowid = log_fts.rowid "
+                f"WHERE log_fts MATCH ? {session} ORDER BY log_fts.rank LIMIT ?"
+            )
+            params = ['"' + query.replace('"', '""') + '"', *params, limit]
+        else:
+            pattern = (
+                query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            )
+            sql = (
+                f"SELECT {columns}, log.text, 0.0 FROM log "
+                f"WHERE log.text LIKE ? ESCAPE '\\' {session} "
+                "ORDER BY log.rowid DESC LIMIT ?"
+            )
+            params = [f"%{pattern}%", *params, limit]
+
+        with self.pool.reader() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        hits = []
+        for row in rows:
+            rowid, session_id, id, sequence, user_id, card_name, date, text, rank = row
+            if len(query) < 3 or not self._fts:
+                text = self._snippet(text, query)
+            hits.append(
+                {
+                    "session_id": session_id,
+                    "id": id,
+                    "rowid": rowid,
+                    "message_sequence": sequence,
+                    "user_id": user_id,
+                    "card_name": card_name,
+                    "date": date,
+                    "snippet": text,
+                    "rank": rank,
+                }
+            )
+        return hits
+
+    @staticmethod
+    def _snippet(text: str, query: str) -> str:
+        """Bracket the first match of ``query`` in ``text`` with some context."""
+        # Matched case-insensitively like ``LIKE``.
+        match = re.search(re.escape(query), text, re.IGNORECASE)
+        if match is None:
+            return text[: SNIPPET_TOKENS * 2] + (
+                "…" if len(text) > SNIPPET_TOKENS * 2 else ""
+            )
+        start, end = match.span()
+        return (
+            ("…" if start > SNIPPET_TOKENS else "")
+            + text[max(start - SNIPPET_TOKENS, 0) : start]
+            + f"[{text[start:end]}]"
+            + text[end : end + SNIPPET_TOKENS]
+            + ("…" if end + SNIPPET_TOKENS < len(text) else "")
+        )
+
+    def remove(self, session_id: str, id: str, message_sequence: str):
+        self.flush()
+        with self.pool.writer() as conn:
+            deleted = conn.execute(
+                "DELETE FROM log "
+                "WHERE session_id = ? AND id = ? AND message_sequence = ?",
+                (session_id, id, message_sequence),
+            ).rowcount
+            # Otherwise the record may be archived, in the one block its key names.
+            archived = (
+                None
+                if deleted
+                else conn.execute(
+                    "SELECT chunk FROM log_archive_keys "
+                    "WHERE session_id = ? AND id = ? AND message_sequence = ?",
+                    (session_id, id, message_sequence),
+                ).fetchone()
+            )
+            if archived is not None:
+                self._repack(
+                    conn,
+                    session_id,
+                    id,
+                    archived,
+                    lambda row: (
+                        None if row["message_sequence"] == message_sequence else row
+                    ),
+                )
+        # The logger may be gone with its last message.
+        self._ids.pop(session_id, None)
 
     def clear(self, session_id: str, id: str) -> None:
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "DELETE FROM log WHERE session_id = ? AND id = ?", (session_id, id)
+        self.flush()
+        with self.pool.writer() as conn:
+            conn.execute(
+                "DELETE FROM log WHERE session_id = ? AND id = ?", (session_id, id)
+            )
+            conn.execute(
+                "DELETE FROM log_archive WHERE session_id = ? AND id = ?",
+                (session_id, id),
+            )
+            conn.execute(
+                "DELETE FROM log_archive_keys WHERE session_id = ? AND id = ?",
+                (session_id, id),
+            )
+            conn.execute(
+                "DELETE FROM log_stats WHERE session_id = ? AND id = ?",
+                (session_id, id),
+            )
+        self._ids.get(session_id, set()).discard(id)
+
+    def archive(
+        self,
+        session_id: str,
+        id: str,
+        *,
+        compression: str = "zlib",
+        chunk_size: int = ARCHIVE_CHUNK_SIZE,
+        vacuum: bool = False,
+    ) -> int:
+        """Move the records of a finished logger into compressed blocks.
+
+        Archived records stay readable through ``load``, ``loadall`` and the
+        streaming reads, and are removed from the search index. Records added
+        to the logger afterwards stay in the log table until archived again.
+
+        Args:
+            compression (str, optional): One of ``ARCHIVE_CODECS``. Defaults to "zlib".
+            chunk_size (int, optional): Records per block. Defaults to ARCHIVE_CHUNK_SIZE.
+            vacuum (bool, optional): Run ``vacuum`` afterwards. Defaults to ``False``.
+
+        Returns:
+            int: Number of records archived.
+        """
+        if compression not in ARCHIVE_CODECS:
+            raise ValueError(f"Unknown compression '{compression}'.")
+        self.flush()
+        archived = 0
+        with self.pool.writer() as conn:
+            chunk = conn.execute(
+                "SELECT COALESCE(MAX(chunk) + 1, 0) FROM log_archive "
+                "WHERE session_id = ? AND id = ?",
+                (session_id, id),
+            ).fetchone()[0]
+            rowid = -1
+            while True:
+                rows = conn.execute(
+                    f"SELECT {', '.join(_ARCHIVE_COLUMNS)} FROM log "
+                    "WHERE session_id = ? AND id = ? AND rowid > ? "
+                    "ORDER BY rowid LIMIT ?",
+                    (session_id, id, rowid, chunk_size),
+                ).fetchall()
+                if not rows:
+                    break
+                self._pack(conn, session_id, id, chunk, compression, rows)
+                chunk += 1
+                archived += len(rows)
+                rowid = rows[-1][0]
+            # Archived records still count, restore what the delete triggers take.
+            stats = conn.execute(
+                "SELECT * FROM log_stats WHERE session_id = ? AND id = ?",
+                (session_id, id),
+            ).fetchall()
+            conn.execute(
+                "DELETE FROM log WHERE session_id = ? AND id = ?", (session_id, id)
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO log_stats VALUES (?, ?, ?, ?, ?, ?)", stats
+            )
+        if vacuum:
+            self.vacuum()
+        return archived
+
+    @staticmethod
+    def _pack(
+        conn: sqlite3.Connection,
+        session_id: str,
+        id: str,
+        chunk: int,
+        compression: str,
+        rows: List[Tuple[Any, ...]],
+    ) -> None:
+        block = json.dumps(
+            {"columns": _ARCHIVE_COLUMNS, "rows": rows}, ensure_ascii=False
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO log_archive VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                session_id,
+                id,
+                chunk,
+                rows[0][0],
+                rows[-1][0],
+                len(rows),
+                compression,
+                ARCHIVE_CODECS[compression][0](block.encode()),
+            ),
+        )
+        conn.executemany(
+            _ARCHIVE_KEY,
+            [(session_id, id, row[6], chunk) for row in rows if row[6] is not None],
         )
-        self.conn.commit()
-        cursor.close()
+
+    @staticmethod
+    def _unpack(compression: str, data: bytes) -> List[Dict[str, Any]]:
+        block = json.loads(ARCHIVE_CODECS[compression][1](data))
+        return [dict(zip(block["columns"], row)) for row in block["rows"]]
+
+    def _archived(
+        self, session_id: Optional[str] = None, id: Optional[str] = None
+    ) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """Stream archived rows block by block, of one logger or of all."""
+        where = "(session_id, id, chunk) > (?, ?, ?)"
+        params: Tuple[Any, ...] = ()
+        if session_id is not None:
+            where += " AND session_id = ? AND id = ?"
+            params = (session_id, id)
+        key: Tuple[Any, ...] = ("", "", -1)
+        while True:
+            with self.pool.reader() as conn:
+                block = conn.execute(
+                    "SELECT session_id, id, chunk, compression, data FROM log_archive "
+                    f"WHERE {where} ORDER BY session_id, id, chunk LIMIT 1",
+                    (*key, *params),
+                ).fetchone()
+            if block is None:
+                return
+            key = block[:3]
+            for row in self._unpack(*block[3:]):
+                yield block[0], block[1], row
+
+    def _repack(
+        self,
+        conn: sqlite3.Connection,
+        session_id: str,
+        id: str,
+        chunks: Iterable[int],
+        change: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]],
+    ) -> None:
+        """Rewrite archived blocks of a logger, ``change`` returns each row
+        itself to keep it, its replacement, or ``None`` to drop it."""
+        for chunk in chunks:
+            block = conn.execute(
+                "SELECT compression, data FROM log_archive "
+                "WHERE session_id = ? AND id = ? AND chunk = ?",
+                (session_id, id, chunk),
+            ).fetchone()
+            if block is None:
+                continue
+            compression, data = block
+            changes = [(row, change(row)) for row in self._unpack(compression, data)]
+            changed = [(row, new) for row, new in changes if new is not row]
+            if not changed:
+                continue
+            conn.executemany(
+                _UNCOUNT.format(**_PARAMS),
+                [
+                    (
+                        is_roll(_decode(row["data"])),
+                        session_id,
+                        id,
+                        row["user_id"],
+                        row["user_role"],
+                    )
+                    for row, _ in changed
+                ],
+            )
+            conn.executemany(
+                _COUNT.format(**_PARAMS),
+                [
+                    (
+                        session_id,
+                        id,
+                        new["user_id"],
+                        new["user_role"],
+                        is_roll(_decode(new["data"])),
+                    )
+                    for _, new in changed
+                    if new is not None
+                ],
+            )
+            conn.execute(_PRUNE_STATS.format(**_PARAMS), (session_id, id))
+            conn.executemany(
+                "DELETE FROM log_archive_keys "
+                "WHERE session_id = ? AND id = ? AND message_sequence = ?",
+                [
+                    (session_id, id, row["message_sequence"])
+                    for row, new in changed
+                    if new is None
+                ],
+            )
+            kept = [new for _, new in changes if new is not None]
+            if kept:
+                self._pack(
+                    conn,
+                    session_id,
+                    id,
+                    chunk,
+                    compression,
+                    [
+                        tuple(row.get(column) for column in _ARCHIVE_COLUMNS)
+                        for row in kept
+                    ],
+                )
+            else:
+                conn.execute(
+                    "DELETE FROM log_archive "
+                    "WHERE session_id = ? AND id = ? AND chunk = ?",
+                    (session_id, id, chunk),
+                )
+
+    def vacuum(self) -> None:
+        """Rebuild the database file, returning the space freed by ``archive``
+        and deletions to the file system."""
+        self.flush()
+        with self.pool.lock:
+            self.conn.execute("VACUUM")
+            if not is_memory(self.db_path):
+                self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def prune(self, batch_size: int = PRUNE_BATCH_SIZE) -> int:
+        """Enforce the retention policies once.
+
+        Records are deleted oldest first in batches of ``batch_size``, each in
+        its own short transaction found through an index, so writers wait at
+        most one batch. ``max_size`` may prune up to one batch more than needed,
+        and prunes nothing when the space records cannot free, such as archive
+        blocks, exceeds it. Archived loggers are kept.
+
+        Raises:
+            BaseException: The error of a failed background pass, raised once.
+
+        Returns:
+            int: Number of records pruned.
+        """
+        if self._prune_error is not None:
+            error, self._prune_error = self._prune_error, None
+            raise error
+        return self._prune(batch_size)
+
+    def _prune(self, batch_size: int = PRUNE_BATCH_SIZE) -> int:
+        pruned = 0
+        if self.max_age is not None:
+            cutoff = int(time.time() - self.max_age)
+            while count := self._prune_batch(
+                "ts < ? ORDER BY ts", (cutoff,), batch_size
+            ):
+                pruned += count
+
+        if self.max_rows_per_session is not None:
+            with self.pool.reader() as conn:
+                # Statistics count archived records too, which are kept, so
+                # they only narrow down the sessions whose live records are
+                # then counted through the session index alone.
+                sessions = [
+                    (
+                        session_id,
+                        conn.execute(
+                            "SELECT COUNT(*) FROM log WHERE session_id = ?",
+                            (session_id,),
+                        ).fetchone()[0],
+                    )
+                    for session_id, in conn.execute(
+                        "SELECT session_id FROM log_stats GROUP BY session_id "
+                        "HAVING SUM(messages) > ?",
+                        (self.max_rows_per_session,),
+                    ).fetchall()
+                ]
+            for session_id, count in sessions:
+                excess = count - self.max_rows_per_session
+                while excess > 0 and (
+                    count := self._prune_batch(
+                        "session_id = ? ORDER BY rowid",
+                        (session_id,),
+                        min(batch_size, excess),
+                    )
+                ):
+                    excess -= count
+                    pruned += count
+
+        if self.max_size is not None and (size := self.used_size()) > self.max_size:
+            prunable = self._prunable_size()
+            # Archive blocks, statistics and the schema stay, when they alone
+            # exceed the limit no record is pruned in vain.
+            if prunable is None or size - prunable < self.max_size:
+                while size > self.max_size and (
+                    count := self._prune_batch("1 ORDER BY rowid", (), batch_size)
+                ):
+                    pruned += count
+                    freed = size - (size := self.used_size())
+                    if self._fts:
+                        # Deleted entries keep their space in the search index
+                        # until its segments are merged, a bounded amount of
+                        # work per step that may grow the index for a while.
+                        with self.pool.writer() as conn:
+                            conn.execute(
+                                "INSERT INTO log_fts (log_fts, rank) "
+                                "VALUES ('merge', ?)",
+                                (-batch_size,),
+                            )
+                        size = self.used_size()
+                    if freed <= 0:
+                        # What is left cannot be freed, the only way to tell
+                        # where SQLite lacks ``dbstat``.
+                        break
+
+        if pruned:
+            self._ids = {}
+        return pruned
+
+    def _prune_batch(self, where: str, params: Tuple[Any, ...], limit: int) -> int:
+        with self.pool.writer() as conn:
+            rows = conn.execute(
+                f"SELECT rowid, {_COLUMNS} FROM log WHERE {where} LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+            if rows and self.rotate_dir is not None:
+                # Committed before the delete, a failure leaves the records in
+                # both databases and the next pass skips them as duplicates.
+                self._rotate([row[1:] for row in rows])
+            conn.executemany(
+                "DELETE FROM log WHERE rowid = ?", [(row[0],) for row in rows]
+            )
+        return len(rows)
+
+    def _rotate(self, rows: List[Tuple[Any, ...]]) -> None:
+        months: Dict[str, List[Tuple[Any, ...]]] = {}
+        for row in rows:
+            ts, date = row[9], row[5]
+            if ts is not None:
+                month = datetime.fromtimestamp(ts).strftime("%Y-%m")
+            else:
+                month = date[:7] if date else "undated"
+            months.setdefault(month, []).append(row)
+        for month, month_rows in months.items():
+            manager = self._rotations.get(month)
+            if manager is None:
+                self.rotate_dir.mkdir(parents=True, exist_ok=True)
+                manager = self._rotations[month] = LogManager(self.rotation(month))
+            with manager.pool.writer() as conn:
+                cursor = conn.cursor()
+                manager._insert(cursor, month_rows)
+                cursor.close()
+
+    def rotation(self, month: str) -> Path:
+        """Path of the log database holding the records rotated out in a month.
+
+        Args:
+            month (str): ``YYYY-MM``, see ``rotations``.
+        """
+        if self.rotate_dir is None:
+            raise ValueError("Log rotation is not enabled.")
+        return self.rotate_dir / f"log-{month}.db"
+
+    def rotations(self) -> List[str]:
+        """Months with rotated records, oldest first."""
+        if self.rotate_dir is None or not self.rotate_dir.exists():
+            return []
+        return sorted(path.stem[4:] for path in self.rotate_dir.glob("log-*.db"))
+
+    def used_size(self) -> int:
+        """Bytes of database pages in use, freed pages excluded."""
+        with self.pool.lock:
+            page_count, freelist_count, page_size = (
+                self.conn.execute(f"PRAGMA {pragma}").fetchone()[0]
+                for pragma in ("page_count", "freelist_count", "page_size")
+            )
+        return (page_count - freelist_count) * page_size
+
+    def _prunable_size(self) -> Optional[int]:
+        """Bytes of pages the pruner can free, those of the log table, its
+        indexes and its search index, ``None`` where SQLite lacks ``dbstat``."""
+        with self.pool.lock:
+            names = [
+                name
+                for name, in self.conn.execute(
+                    "SELECT name FROM sqlite_master WHERE tbl_name = 'log' "
+                    "OR tbl_name LIKE 'log\\_fts\\_%' ESCAPE '\\'"
+                )
+            ]
+            try:
+                return sum(
+                    self.conn.execute(
+                        "SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name = ?",
+                        (name,),
+                    ).fetchone()[0]
+                    for name in names
+                )
+            except sqlite3.OperationalError:
+                return None
+
+    def _prune_loop(self) -> None:
+        while not self._stop_pruner.wait(self.prune_interval):
+            try:
+                self._prune()
+            except BaseException as err:
+                # Kept apart from writer errors, ``flush`` is not about pruning.
+                self._prune_error = err
+
+    def backup(self, target: Union[str, Path], **kwargs) -> Path:
+        self.flush()
+        return self.pool.backup(target, **kwargs)
+
+    def restore(self, source: Union[str, Path]) -> None:
+        self.flush()
+        self.pool.restore(source)
+        self._ids = {}
+        self._create_table()
 
     def close(self):
-        self.conn.close()
+        """Drain the background writer and close the database."""
+        try:
+            self.flush()
+        finally:
+            if self._pruner is not None:
+                self._stop_pruner.set()
+                self._pruner.join()
+                self._pruner = None
+            if self._writer is not None:
+                self._queue.put(_STOP)
+                self._writer.join()
+                self._writer = None
+            for manager in self._rotations.values():
+                manager.close()
+            self._rotations = {}
+            self.pool.close()
 
 
 class Logger:
     log_manager: LogManager
 
-    def __init__(self, db_path: Union[Path, str] = "dicergirl.db"):
-        self.log_manager = LogManager(db_path)
+    def __init__(
+        self,
+        db_path: Union[Path, str] = "dicergirl.db",
+        background: bool = False,
+        *,
+        max_age: Optional[float] = None,
+        max_rows_per_session: Optional[int] = None,
+        max_size: Optional[int] = None,
+        rotate_dir: Optional[Union[str, Path]] = None,
+        prune_interval: float = PRUNE_INTERVAL,
+    ):
+        """Initialize Logger, see ``LogManager`` for the retention policies."""
+        self.log_manager = LogManager(
+            db_path,
+            background=background,
+            max_age=max_age,
+            max_rows_per_session=max_rows_per_session,
+            max_size=max_size,
+            rotate_dir=rotate_dir,
+            prune_interval=prune_interval,
+        )
         self.db_path = db_path
         self.logs = {}
 
     def __repr__(self) -> str:
         return f"Logger(db='{self.db_path}')"
 
+    def flush(self) -> None:
+        self.log_manager.flush()
+
     def rescue(self) -> None:
         self.log_manager.close()
 
@@ -187,6 +1596,16 @@ class Logger:
     def loadall(self) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
         return self.log_manager.loadall()
 
+    def iterload(
+        self, session_id: str, id: Union[int, str], **kwargs
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream the records of a logger, see ``LogManager.iterload``."""
+        return self.log_manager.iterload(session_id, str(id), **kwargs)
+
+    def iterloadall(self, **kwargs) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """Stream every record, see ``LogManager.iterloadall``."""
+        return self.log_manager.iterloadall(**kwargs)
+
     def next_id(self, session_id: str):
         return (
             count
@@ -205,8 +1624,50 @@ class Logger:
         data: List[Any] = [],
         date: Optional[Union[str, datetime]] = None,
         message_sequence: str = "",
+        on_conflict: OnConflict = "ignore",
     ) -> None:
-        id = str(id)
+        """Log a message, a message sequence already logged is kept or replaced
+        following ``on_conflict``."""
+        self.log_manager.add(
+            **self._message(
+                session_id,
+                id,
+                user_id=user_id,
+                user_role=user_role,
+                card_name=card_name,
+                data=data,
+                date=date,
+                message_sequence=message_sequence,
+            ),
+            on_conflict=on_conflict,
+        )
+
+    def add_many(
+        self, records: Iterable[Dict[str, Any]], on_conflict: OnConflict = "ignore"
+    ) -> None:
+        """Log messages in one transaction.
+
+        Args:
+            records (Iterable[Dict[str, Any]]): ``session_id``, ``id`` and the
+                keyword arguments of ``add`` of each message.
+            on_conflict (OnConflict, optional): Defaults to "ignore".
+        """
+        self.log_manager.add_many(
+            [self._message(**record) for record in records], on_conflict
+        )
+
+    @staticmethod
+    def _message(
+        session_id: str,
+        id: Union[str, int],
+        *,
+        user_id: str,
+        user_role: Literal["KP", "PL", "OB", "DICER"] = "OB",
+        card_name: str = "User",
+        data: List[Any] = [],
+        date: Optional[Union[str, datetime]] = None,
+        message_sequence: str = "",
+    ) -> Dict[str, Any]:
         if not data:
             raise ValueError("Could not log an empty data.")
         if not isinstance(user_role, str) or user_role.upper() not in (
@@ -219,20 +1680,72 @@ class Logger:
         if not message_sequence or not isinstance(message_sequence, str):
             raise ValueError("Message sequence string is require.")
         if date is None:
-            date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        elif isinstance(date, datetime):
-            date = date.strftime("%Y-%m-%d %H:%M:%S")
+            date = datetime.now()
+        ts = timestamp(date)
+        if isinstance(date, datetime):
+            date = date.strftime(DATE_FORMAT)
 
-        self.log_manager.add(
-            session_id,
-            id,
-            user_id=user_id,
-            user_role=user_role,
-            card_name=card_name,
-            date=date,
-            data=str(data),
-            message_sequence=message_sequence,
-        )
+        return {
+            "session_id": session_id,
+            "id": str(id),
+            "user_id": user_id,
+            "user_role": user_role,
+            "card_name": card_name,
+            "date": date,
+            "data": str(data),
+            "message_sequence": message_sequence,
+            "text": message_text(data),
+            "ts": ts,
+            "roll": is_roll(data),
+        }
+
+    def load_range(
+        self,
+        session_id: str,
+        id: Union[int, str],
+        start: Optional[Union[int, float, datetime]] = None,
+        end: Optional[Union[int, float, datetime]] = None,
+        **kwargs,
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream the records dated in ``[start, end)``, see ``LogManager.load_range``."""
+        return self.log_manager.load_range(session_id, str(id), start, end, **kwargs)
+
+    def stats(
+        self, session_id: str, id: Optional[Union[str, int]] = None
+    ) -> List[Dict[str, Any]]:
+        """Messages and rolls per user, see ``LogManager.stats``."""
+        return self.log_manager.stats(session_id, None if id is None else str(id))
+
+    def search(
+        self, session_id: Optional[str], query: str, limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """Search message text, see ``LogManager.search``."""
+        return self.log_manager.search(session_id, query, limit)
+
+    def archive(self, session_id: str, id: Union[str, int], **kwargs) -> int:
+        """Compress a finished logger, see ``LogManager.archive``."""
+        return self.log_manager.archive(session_id, str(id), **kwargs)
+
+    def vacuum(self) -> None:
+        self.log_manager.vacuum()
+
+    def prune(self) -> int:
+        """Enforce the retention policies now, see ``LogManager.prune``."""
+        return self.log_manager.prune()
+
+    def rotations(self) -> List[str]:
+        return self.log_manager.rotations()
+
+    def rotation(self, month: str) -> "Logger":
+        """Open the records rotated out in a month, see ``rotations``.
+
+        Raises:
+            FileNotFoundError: Nothing was rotated out in this month.
+        """
+        path = self.log_manager.rotation(month)
+        if not path.exists():
+            raise FileNotFoundError(f"No log rotated out in '{month}'.")
+        return Logger(path)
 
     def remove(self, session_id: str, id: Union[str, int], message_sequence: str):
         self.log_manager.remove(
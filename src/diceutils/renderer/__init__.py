@@ -1,4 +1,4 @@
-from ._models import Message, Messages, Renderer, ExportConfig, Role
+from ._models import Message, Messages, Renderer, ExportConfig, Role, log_messages
 
 
-__all__ = ["Message", "Messages", "Renderer", "ExportConfig", "Role"]
+__all__ = ["Message", "Messages", "Renderer", "ExportConfig", "Role", "log_messages"]
@@ -1,6 +1,7 @@
 from cProfile import label
+from diceutils.logging import is_command_text
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, Iterator, List, Any, Optional
 from enum import Enum
 
 import abc
@@ -88,23 +89,57 @@ class Messages(List[Message]):
             date: str,
             content: List[Dict[str, Any]],
     ):
-        elements = []
-        try:
-            for ele in content:
-                _type = ele["type"]
-                data = ele["data"]
-                if _type == "text":
-                    text = data["text"]
-                    elements.append(Text(text))
-                elif _type == "image":
-                    url = data["url"]
-                    elements.append(Image(url))
-        except KeyError as e:
-            raise KeyError(f"Message format error. Missing key field: {e}")
-        message = Message(user_code, role, nickname, date, elements)
+        message = Message(user_code, role, nickname, date, parse_elements(content))
         self.append(message)
 
 
+def parse_elements(content: Iterable[Dict[str, Any]]) -> List[Element]:
+    """Convert message segments to elements, skipping unsupported types.
+
+    Segment data is either ``{"text": ...}``/``{"url": ...}`` or the text or
+    url itself, as recorded by ``diceutils.logging.Logger``.
+    """
+    elements = []
+    try:
+        for ele in content:
+            _type = ele["type"]
+            data = ele["data"]
+            if _type == "text":
+                text = data["text"] if isinstance(data, dict) else data
+                elements.append(Text(str(text)))
+            elif _type == "image":
+                url = data["url"] if isinstance(data, dict) else data
+                elements.append(Image(url))
+    except KeyError as e:
+        raise KeyError(f"Message format error. Missing key field: {e}")
+    return elements
+
+
+LOG_ROLES = {"KP": Role.GM, "PL": Role.PL, "OB": Role.OB, "DICER": Role.DICER}
+
+
+def log_messages(records: Iterable[Dict[str, Any]]) -> Iterator[Message]:
+    """Turn log records into messages lazily, one record at a time.
+
+    Pass a streaming read such as ``Logger.iterload`` and ``Renderer.render``
+    holds a single record and message at a time, whatever the session size.
+
+    Args:
+        records (Iterable[Dict[str, Any]]): Records of ``diceutils.logging.Logger``.
+
+    Yields:
+        Message: Message of each record, sent by its card name.
+    """
+    for record in records:
+        yield Message(
+            record["user_id"],
+            LOG_ROLES.get(str(record["user_role"]).upper(), Role.OB),
+            record["card_name"],
+            record["date"],
+            parse_elements(record["data"]),
+        )
+
+
 class ExportConfig:
     def __init__(self):
         self.first_line_indent = True  # 首行缩进
@@ -184,7 +219,7 @@ class Renderer(metaclass=abc.ABCMeta):
         first_ele = elements[0]
         first_ele_content = first_ele.content.strip()
 
-        is_command = first_ele_content.startswith(('.', '。', '/'))
+        is_command = is_command_text(first_ele.content)
 
         is_first_ele_img = isinstance(first_ele, Image)
         is_first_ele_text = isinstance(first_ele, Text)
@@ -246,12 +281,15 @@ class Renderer(metaclass=abc.ABCMeta):
 
     @staticmethod
     def render(
-            messages: Messages,
+            messages: Iterable[Message],
             renderer: "Renderer",
             config: Optional[ExportConfig] = None,
     ) -> "Renderer":
+        """Render messages one at a time, from ``Messages`` or any iterable,
+        such as ``log_messages`` over a streaming log read."""
+        config = config or ExportConfig()
         for message in messages:
-            if message := renderer.parse_message(message, config or ExportConfig()):
+            if message := renderer.parse_message(message, config):
                 renderer.render_message(message)
         return renderer
 
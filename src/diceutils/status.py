@@ -4,86 +4,494 @@
 @description    :     This Module Provides Status Manager to Save Status Value into Database.
 """
 
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Any, Optional, Tuple, Union
+from types import MappingProxyType
+from typing import (
+    Dict,
+    Any,
+    Callable,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+from diceutils.database import (
+    POOL_IDLE_TIMEOUT,
+    POOL_MAX_SIZE,
+    ConnectionPool,
+    expired,
+)
 from diceutils.exceptions import UnkownMode
 
+import asyncio
+import fnmatch
 import sqlite3
+import threading
+import time
+import weakref
+
+
+FLUSH_INTERVAL = 0.2
+"""Seconds status writes are held back so repeated sets collapse into one."""
+SESSION_TTL = 30 * 60.0
+"""Seconds an unused session stays loaded in ``Status``."""
+MAX_SESSIONS = 10000
+"""Sessions kept loaded in ``Status`` at most."""
+BATCH_SIZE = 500
+"""Session ids bound per query of ``StatusManager.load_many``."""
+
+_NO_STATUS: Mapping[str, Any] = MappingProxyType({})
+"""Shared by every loaded session without any status."""
+_PATTERN_CHARS = "*?["
+MAX_PATTERN_CACHE = 1024
+"""Status names whose matching pattern subscribers are remembered."""
+
+Subscriber = Union[Callable[[str, str, Any], Any], "asyncio.Queue[Tuple[str, str, Any]]"]
+
+_UPSERT = """
+    INSERT INTO status (session_id, name, status, version)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (session_id, name) DO UPDATE SET
+        status = excluded.status, version = excluded.version;
+"""
 
 
 class StatusManager:
     def __init__(
         self,
         db_path: Union[str, Path] = ":memory:",
+        flush_interval: float = FLUSH_INTERVAL,
     ):
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        self.flush_interval = flush_interval
+        self.pool = ConnectionPool(db_path)
+        self.conn = self.pool.conn
         self._create_table()
+        with self.pool.reader() as conn:
+            self._version = conn.execute(
+                "SELECT COALESCE(MAX(version), 0) FROM status"
+            ).fetchone()[0]
+        self._data_version = self.pool.data_version()
+        # Versions written here but beyond ``_version``, skipped by ``changes``.
+        self._written: Set[int] = set()
+        # Writes waiting for the next flush, the latest per session and name.
+        self._pending: Dict[Tuple[str, str], str] = {}
+        self._pending_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
 
     def _create_table(self):
-        cursor = self.conn.cursor()
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS status (
-                session_id TEXT,
-                name TEXT,
-                status TEXT,
-                CONSTRAINT unique_session_name UNIQUE (session_id, name)
-            );
-            """
-        )
-        self.conn.commit()
+        with self.pool.writer() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS status (
+                    session_id TEXT,
+                    name TEXT,
+                    status TEXT,
+                    version INTEGER NOT NULL DEFAULT 0,
+                    CONSTRAINT unique_session_name UNIQUE (session_id, name)
+                );
+                """
+            )
+            columns = [column[1] for column in conn.execute("PRAGMA table_info(status)")]
+            if "version" not in columns:
+                conn.execute(
+                    "ALTER TABLE status ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+                )
+            conn.execute("CREATE INDEX IF NOT EXISTS status_version ON status (version)")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS status_name ON status (name, status)"
+            )
+            # Row versions come from a counter, ``MAX(version) + 1`` could hand
+            # out a version other connections have already seen.
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS status_sequence (version INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "INSERT INTO status_sequence (version) "
+                "SELECT (SELECT COALESCE(MAX(version), 0) FROM status) "
+                "WHERE NOT EXISTS (SELECT 1 FROM status_sequence)"
+            )
+
+    @staticmethod
+    def _next_versions(conn: sqlite3.Connection, count: int = 1) -> int:
+        """Take ``count`` row versions inside the write transaction of ``conn``.
+
+        Returns:
+            int: The first of the taken versions.
+        """
+        conn.execute("UPDATE status_sequence SET version = version + ?", (count,))
+        last = conn.execute("SELECT version FROM status_sequence").fetchone()[0]
+        return last - count + 1
+
+    def _wrote(self, version: int, count: int) -> None:
+        """Keep ``changes`` from returning ``count`` versions written here.
+
+        Called under the writer lock after the versions were committed.
+        """
+        if version - 1 == self._version:
+            # Nothing unseen was written before, skip past the own writes.
+            self._version = version + count - 1
+        else:
+            self._written.update(range(version, version + count))
 
     def _insert(self, cursor: sqlite3.Cursor, data: Tuple[str, str, str]):
-        cursor.execute(
-            """
-            INSERT INTO status (session_id, name, status) 
-            VALUES (?, ?, ?)
-            ON CONFLICT (session_id, name) DO UPDATE SET status = excluded.status;
-            """,
-            data,
-        )
+        cursor.execute(_UPSERT, (*data, self._next_versions(cursor.connection)))
 
     def saveall(self, data: Dict[str, Dict[str, str]]) -> None:
-        cursor = self.conn.cursor()
-        cursor.execute("BEGIN TRANSACTION")
-        for session_id in data.keys():
-            for name, status in data[session_id].items():
-                self._insert(cursor, (session_id, name, status))
+        rows = [
+            (session_id, name, str(status))
+            for session_id, statuses in data.items()
+            for name, status in statuses.items()
+        ]
+        with self.pool.lock:
+            with self.pool.writer() as conn:
+                version = self._next_versions(conn, len(rows))
+                conn.executemany(
+                    _UPSERT,
+                    [(*row, version + offset) for offset, row in enumerate(rows)],
+                )
+            self._wrote(version, len(rows))
+        # Queued writes are newer than ``data``, they are written after it.
+        self.flush()
+
+    def save(
+        self,
+        session_id: str,
+        name: str,
+        *,
+        status: Optional[str] = None,
+        durable: bool = False,
+    ) -> None:
+        """Queue a status write, flushed within ``flush_interval`` seconds.
+
+        Repeated writes of one session and name before the flush collapse
+        into one row write.
 
-        self.conn.commit()
+        Args:
+            durable (bool, optional): Flush now and ``fsync`` the commit. Defaults to ``False``.
+        """
+        with self._pending_lock:
+            self._pending[(session_id, name)] = str(status)
+            if not durable and self.flush_interval > 0:
+                if self._timer is None:
+                    self._timer = threading.Timer(self.flush_interval, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self.flush(durable=durable)
 
-    def save(self, session_id: str, name: str, *, status: Optional[str] = None) -> None:
-        cursor = self.conn.cursor()
-        self._insert(cursor, (session_id, name, str(status)))
-        self.conn.commit()
+    def flush(self, durable: bool = False) -> None:
+        """Write every queued status in one transaction.
+
+        Args:
+            durable (bool, optional): Commit with ``synchronous=FULL``. Defaults to ``False``.
+        """
+        with self.pool.lock:
+            # Hold the writer lock from taking the queue until its commit, so
+            # ``load_session`` sees queued values either queued or committed.
+            with self._pending_lock:
+                pending, self._pending = self._pending, {}
+                timer, self._timer = self._timer, None
+            if timer is not None:
+                timer.cancel()
+            if not pending:
+                return
+
+            if durable:
+                self.conn.execute("PRAGMA synchronous=FULL")
+            try:
+                with self.pool.writer() as conn:
+                    version = self._next_versions(conn, len(pending))
+                    conn.executemany(
+                        _UPSERT,
+                        [
+                            (session_id, name, status, version + offset)
+                            for offset, ((session_id, name), status) in enumerate(
+                                pending.items()
+                            )
+                        ],
+                    )
+                self._wrote(version, len(pending))
+            except BaseException:
+                with self._pending_lock:
+                    for key, status in pending.items():
+                        self._pending.setdefault(key, status)
+                raise
+            finally:
+                if durable:
+                    self.conn.execute("PRAGMA synchronous=NORMAL")
 
     def load(self) -> Dict[str, Dict[str, Any]]:
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT session_id, name, status FROM status")
-        result = cursor.fetchall()
+        with self.pool.reader() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT session_id, name, status, version FROM status")
+            result = cursor.fetchall()
+            cursor.close()
         datas = {}
-        for session_id, name, status in result:
+        for session_id, name, status, version in result:
             if session_id not in datas:
                 datas[session_id] = {}
-            try:
-                datas[session_id][name] = eval(status)
-            except:
-                datas[session_id][name] = status
+            datas[session_id][name] = self._decode(status)
+            self._version = max(self._version, version)
         return datas
 
+    def load_session(self, session_id: str) -> Dict[str, Any]:
+        """Load the status of one session, including queued writes.
+
+        The lookup uses the ``(session_id, name)`` unique index.
+        """
+        with self.pool.lock:
+            with self.pool.reader() as conn:
+                result = conn.execute(
+                    "SELECT name, status FROM status WHERE session_id = ?",
+                    (session_id,),
+                ).fetchall()
+            with self._pending_lock:
+                result.extend(
+                    (name, status)
+                    for (pending_session, name), status in self._pending.items()
+                    if pending_session == session_id
+                )
+        return {name: self._decode(status) for name, status in result}
+
+    def load_many(self, session_ids: Iterable[str], name: str) -> Dict[str, Any]:
+        """Load one status of many sessions, queued writes are flushed first.
+
+        Returns:
+            Dict[str, Any]: status per session id, sessions without it are left out.
+        """
+        self.flush()
+        session_ids = list(dict.fromkeys(session_ids))
+        results = {}
+        with self.pool.reader() as conn:
+            for start in range(0, len(session_ids), BATCH_SIZE):
+                batch = session_ids[start : start + BATCH_SIZE]
+                cursor = conn.execute(
+                    "SELECT session_id, status FROM status "
+                    f"WHERE name = ? AND session_id IN ({', '.join('?' * len(batch))})",
+                    (name, *batch),
+                )
+                for session_id, status in cursor:
+                    results[session_id] = self._decode(status)
+        return results
+
+    def find(self, name: str, status: str) -> List[str]:
+        """Find sessions whose status ``name`` is stored as ``status``.
+
+        Queued writes are flushed first, the lookup uses the ``(name, status)`` index.
+        """
+        self.flush()
+        with self.pool.reader() as conn:
+            cursor = conn.execute(
+                "SELECT session_id FROM status WHERE name = ? AND status = ?",
+                (name, status),
+            )
+            return [session_id for session_id, in cursor]
+
+    @staticmethod
+    def _decode(status: str) -> Any:
+        try:
+            return eval(status)
+        except:
+            return status
+
+    def changed(self) -> bool:
+        """Check cheaply whether another connection wrote to the database."""
+        data_version = self.pool.data_version()
+        if data_version == self._data_version:
+            return False
+        self._data_version = data_version
+        return True
+
+    def changes(self) -> List[Tuple[str, str, Any]]:
+        """Load status values written since the last load or changes.
+
+        Returns:
+            List[Tuple[str, str, Any]]: ``(session_id, name, status)`` tuples.
+        """
+        # The writer lock keeps ``flush`` from moving ``_version`` meanwhile.
+        with self.pool.lock, self.pool.reader() as conn:
+            cursor = conn.execute(
+                "SELECT session_id, name, status, version FROM status "
+                "WHERE version > ? ORDER BY version",
+                (self._version,),
+            )
+            result = cursor.fetchall()
+            cursor.close()
+            written = self._written
+            if result:
+                self._version = result[-1][3]
+                self._written = {
+                    version for version in written if version > self._version
+                }
+        with self._pending_lock:
+            # Queued writes are newer than anything in the database.
+            pending = set(self._pending)
+        return [
+            (session_id, name, self._decode(status))
+            for session_id, name, status, version in result
+            if (session_id, name) not in pending and version not in written
+        ]
+
+    def backup(self, target: Union[str, Path], **kwargs) -> Path:
+        return self.pool.backup(target, **kwargs)
+
+    def restore(self, source: Union[str, Path]) -> None:
+        self.pool.restore(source)
+        self._create_table()
+        self._version = 0
+        self._written = set()
+        self._data_version = -1
+
     def close(self):
-        self.conn.close()
+        self.flush()
+        self.pool.close()
+
+
+class Subscription:
+    """One subscriber of ``Subscriptions``, cancel it to stop notifications."""
+
+    def __init__(
+        self,
+        subscriptions: "Subscriptions",
+        subscriber: Subscriber,
+        name: str,
+        session_id: Optional[str],
+    ):
+        self.subscriptions = subscriptions
+        self.subscriber = subscriber
+        self.name = name
+        self.session_id = session_id
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        if isinstance(subscriber, asyncio.Queue):
+            try:
+                self.loop = asyncio.get_running_loop()
+            except RuntimeError:
+                pass
+
+    def notify(self, session_id: str, name: str, status: Any) -> None:
+        if not isinstance(self.subscriber, asyncio.Queue):
+            self.subscriber(session_id, name, status)
+        elif self.loop is not None:
+            self.loop.call_soon_threadsafe(
+                self.subscriber.put_nowait, (session_id, name, status)
+            )
+        else:
+            self.subscriber.put_nowait((session_id, name, status))
+
+    def cancel(self) -> None:
+        self.subscriptions.unsubscribe(self)
+
+
+class Subscriptions:
+    """Subscribers to status changes of one bot.
+
+    Subscribers are indexed by exact ``(session_id, name)``, with ``None``
+    for any session, and names containing ``fnmatch`` wildcards are matched
+    once per status name and cached, so notifying a change only visits the
+    subscribers of that change.
+    """
+
+    def __init__(self):
+        self._exact: Dict[Tuple[Optional[str], str], List[Subscription]] = {}
+        self._patterns: List[Subscription] = []
+        self._pattern_cache: Dict[str, List[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(map(len, self._exact.values())) + len(self._patterns)
+
+    def subscribe(
+        self, name: str, subscriber: Subscriber, session_id: Optional[str] = None
+    ) -> Subscription:
+        """Notify ``subscriber`` of every change to matching status.
+
+        Args:
+            name (str): Status name, may contain ``fnmatch`` wildcards.
+            subscriber (Subscriber): Called with ``(session_id, name, status)``,
+                or an ``asyncio.Queue`` receiving that tuple in its event loop.
+            session_id (Optional[str], optional): Only this session. Defaults to any session.
+        """
+        subscription = Subscription(self, subscriber, name, session_id)
+        with self._lock:
+            if any(char in name for char in _PATTERN_CHARS):
+                self._patterns.append(subscription)
+                self._pattern_cache = {}
+            else:
+                self._exact.setdefault((session_id, name), []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._patterns:
+                self._patterns.remove(subscription)
+                self._pattern_cache = {}
+                return
+            key = (subscription.session_id, subscription.name)
+            subscriptions = self._exact.get(key, [])
+            if subscription in subscriptions:
+                subscriptions.remove(subscription)
+            if not subscriptions:
+                self._exact.pop(key, None)
+
+    def _match(self, name: str) -> List[Subscription]:
+        matches = self._pattern_cache.get(name)
+        if matches is None:
+            matches = [
+                subscription
+                for subscription in self._patterns
+                if fnmatch.fnmatchcase(name, subscription.name)
+            ]
+            if len(self._pattern_cache) >= MAX_PATTERN_CACHE:
+                self._pattern_cache = {}
+            self._pattern_cache[name] = matches
+        return matches
+
+    def notify(self, session_id: str, name: str, status: Any) -> None:
+        """Call the subscribers of a change, in the calling thread."""
+        with self._lock:
+            subscriptions = [
+                *self._exact.get((session_id, name), ()),
+                *self._exact.get((None, name), ()),
+            ]
+            if self._patterns:
+                subscriptions.extend(
+                    subscription
+                    for subscription in self._match(name)
+                    if subscription.session_id in (None, session_id)
+                )
+        for subscription in subscriptions:
+            subscription.notify(session_id, name, status)
 
 
 class Status:
+    """Status values of one bot, keyed by session and name.
+
+    Sessions are loaded from the database on first access and dropped from
+    ``data`` once unused for ``session_ttl`` seconds or beyond
+    ``max_sessions``, to be loaded again on the next access.
+    """
+
     status_manager: StatusManager
 
-    def __init__(self, bot_name: str):
+    def __init__(
+        self,
+        bot_name: str,
+        session_ttl: float = SESSION_TTL,
+        max_sessions: int = MAX_SESSIONS,
+    ):
         self.bot_name = bot_name
-        self.data: Dict[str, Dict[str, Any]] = {}
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        self.data: Dict[str, Dict[str, Any]] = OrderedDict()
         self.status_manager = StatusManager(f"{bot_name}.db")
-        self.load()
+        self.subscriptions = Subscriptions()
+        self._accessed: Dict[str, float] = {}
+        self._lock = threading.RLock()
 
     def __repr__(self) -> str:
         return f"Status(db='{self.bot_name}.db')"
@@ -95,25 +503,120 @@ class Status:
         self.saveall()
         self.status_manager.close()
 
+    def close(self) -> None:
+        self.status_manager.close()
+
     def load(self) -> None:
-        self.data = self.status_manager.load()
+        """Load every session at once instead of on first access."""
+        with self._lock:
+            now = time.monotonic()
+            self.data = OrderedDict(self.status_manager.load())
+            self._accessed = dict.fromkeys(self.data, now)
+
+    def _session(self, session_id: str) -> Mapping[str, Any]:
+        with self._lock:
+            session = self.data.get(session_id)
+            if session is None:
+                session = self.status_manager.load_session(session_id) or _NO_STATUS
+                self.data[session_id] = session
+            else:
+                self.data.move_to_end(session_id)
+            now = self._accessed[session_id] = time.monotonic()
+            self._expire(now)
+            return session
+
+    def _expire(self, now: float) -> None:
+        deadline = now - self.session_ttl
+        while self.data:
+            session_id = next(iter(self.data))
+            if len(self.data) <= self.max_sessions and (
+                self._accessed.get(session_id, now) >= deadline
+            ):
+                break
+            del self.data[session_id]
+            self._accessed.pop(session_id, None)
 
-    def set(self, session_id: str, name: str, status: Any) -> None:
-        if session_id not in self.data:
-            self.data[session_id] = {}
-        self.data[session_id][name] = status
-        self.status_manager.save(session_id, name, status=str(status))
+    def sync(self) -> None:
+        """Refresh values changed by other connections since the last check."""
+        if not self.status_manager.changed():
+            return
+        with self._lock:
+            changes = self.status_manager.changes()
+            for session_id, name, status in changes:
+                session = self.data.get(session_id)
+                if session is _NO_STATUS:
+                    del self.data[session_id]
+                elif session is not None:
+                    session[name] = status
+        for session_id, name, status in changes:
+            self.subscriptions.notify(session_id, name, status)
+
+    def flush(self, durable: bool = False) -> None:
+        self.status_manager.flush(durable=durable)
+
+    def set(
+        self, session_id: str, name: str, status: Any, durable: bool = False
+    ) -> None:
+        with self._lock:
+            session = self._session(session_id)
+            if session is _NO_STATUS:
+                session = self.data[session_id] = {}
+            session[name] = status
+        self.status_manager.save(
+            session_id, name, status=str(status), durable=durable
+        )
+        self.subscriptions.notify(session_id, name, status)
+
+    def subscribe(
+        self, name: str, subscriber: Subscriber, session_id: Optional[str] = None
+    ) -> Subscription:
+        """Subscribe to changes by ``set`` here or by other connections,
+        see ``Subscriptions.subscribe``. The latter are noticed on ``sync``.
+        """
+        return self.subscriptions.subscribe(name, subscriber, session_id)
 
     def get(self, session_id: str, name: str) -> Any:
-        if session_id not in self.data:
-            self.data[session_id] = {}
-        if name not in self.data[session_id]:
-            self.data[session_id][name] = False
-        return self.data[session_id][name]
+        self.sync()
+        return self._session(session_id).get(name, False)
+
+    def get_many(self, session_ids: Iterable[str], name: str) -> Dict[str, Any]:
+        """Get one status of many sessions with a single query per batch.
+
+        Sessions are not loaded into ``data``, missing values are ``False``.
+        """
+        session_ids = list(session_ids)
+        results = self.status_manager.load_many(session_ids, name)
+        return {
+            session_id: results.get(session_id, False) for session_id in session_ids
+        }
+
+    def sessions_where(self, name: str, value: Any) -> List[str]:
+        """List sessions whose status ``name`` was set to ``value``.
+
+        Sessions that never set ``name`` are not listed, even for ``False``.
+        """
+        return self.status_manager.find(name, str(value))
 
 
 class StatusPool(object):
+    """Status of every registered bot.
+
+    Bots unused for ``idle_timeout`` seconds, and the least recently used
+    ones beyond ``max_size``, are dropped from the pool and reopened on their
+    next access. Dropped status is closed once no caller holds it, and handed
+    out again if its bot is accessed before that.
+    """
+
     _status_pool = {}
+    _evicted: "weakref.WeakValueDictionary[str, Status]" = (
+        weakref.WeakValueDictionary()
+    )
+    _registered = set()
+    _last_access: Dict[str, float] = {}
+    _subscriptions: Dict[str, Subscriptions] = {}
+    _lock = threading.RLock()
+    max_size: int = POOL_MAX_SIZE
+    idle_timeout: float = POOL_IDLE_TIMEOUT
 
     def __str__(self) -> str:
         return self.__repr__()
@@ -123,17 +626,77 @@ class StatusPool(object):
 
     @staticmethod
     def register(bot_name: str) -> Status:
-        if bot_name not in StatusPool._status_pool.keys():
-            StatusPool._status_pool[bot_name] = Status(bot_name)
-        return StatusPool._status_pool[bot_name]
+        with StatusPool._lock:
+            StatusPool._registered.add(bot_name)
+            return StatusPool.get(bot_name)
 
     @staticmethod
     def get(bot_name: str) -> Optional[Status]:
-        return StatusPool._status_pool.get(bot_name)
+        with StatusPool._lock:
+            if bot_name not in StatusPool._registered:
+                return None
+            if bot_name not in StatusPool._status_pool.keys():
+                status = StatusPool._evicted.pop(bot_name, None)
+                if status is None:
+                    status = Status(bot_name)
+                    weakref.finalize(status, status.status_manager.close)
+                    # Subscriptions outlive eviction of the status.
+                    status.subscriptions = StatusPool._subscriptions.setdefault(
+                        bot_name, status.subscriptions
+                    )
+                StatusPool._status_pool[bot_name] = status
+            StatusPool._last_access[bot_name] = time.monotonic()
+            for name in expired(
+                StatusPool._last_access, StatusPool.max_size, StatusPool.idle_timeout
+            ):
+                if name != bot_name:
+                    StatusPool.evict(name)
+            return StatusPool._status_pool[bot_name]
 
     @staticmethod
-    def reload(bot_name: str):
-        if bot_name not in StatusPool._status_pool.keys():
+    def evict(bot_name: str) -> None:
+        """Flush the status of a bot and drop it, it reopens on next access.
+
+        Status still held by a caller stays open until released.
+        """
+        with StatusPool._lock:
+            StatusPool._last_access.pop(bot_name, None)
+            status = StatusPool._status_pool.pop(bot_name, None)
+            if status is not None:
+                status.flush()
+                StatusPool._evicted[bot_name] = status
+
+    @staticmethod
+    def subscribe(
+        bot_name: str,
+        name: str,
+        subscriber: Subscriber,
+        session_id: Optional[str] = None,
+    ) -> Subscription:
+        """Subscribe to status changes of a registered bot, see ``Status.subscribe``.
+
+        Raises:
+            UnkownMode: If the bot was not registered yet.
+        """
+        status = StatusPool.get(bot_name)
+        if status is None:
             raise UnkownMode(f'Bot "{bot_name}" was not regitered yet.')
-        StatusPool._status_pool[bot_name] = Status(bot_name)
-        return StatusPool._status_pool[bot_name]
+        return status.subscribe(name, subscriber, session_id)
+
+    @staticmethod
+    def sizes() -> Dict[str, int]:
+        """Count registered bots and open status."""
+        return {
+            "registered": len(StatusPool._registered),
+            "status": len(StatusPool._status_pool),
+        }
+
+    @staticmethod
+    def reload(bot_name: str):
+        with StatusPool._lock:
+            if bot_name not in StatusPool._registered:
+                raise UnkownMode(f'Bot "{bot_name}" was not regitered yet.')
+            StatusPool.evict(bot_name)
+            # Reopen even if a caller still holds the evicted status.
+            StatusPool._evicted.pop(bot_name, None)
+            return StatusPool.get(bot_name)
@@ -0,0 +1,150 @@
+from diceutils.backends import CardsBackend, DbmBackend, MemoryBackend
+from diceutils.cards import Cards, CardsManager, MAX_CARDS_PER_USER
+from diceutils.exceptions import TooManyCardsError
+
+import io
+import pytest
+import time
+
+
+@pytest.fixture(params=["sqlite", "memory", "dbm"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        backend = CardsManager(tmp_path / "cards.db")
+    elif request.param == "memory":
+        backend = MemoryBackend(tmp_path / "cards.json")
+    else:
+        backend = DbmBackend(tmp_path / "cards")
+    yield backend
+    backend.close()
+
+
+def test_backend(backend):
+    assert backend.get("0") == ([], 0)
+
+    backend.put("0", [{"name": "简律纯"}, {"name": "雪花"}], 1)
+    assert backend.get("0") == ([{"name": "简律纯"}, {"name": "雪花"}], 1)
+
+    assert backend.putmany([("1", [{"name": "1"}], 0), ("2", [{"name": "2"}], 0)]) == 2
+    assert sorted(user_id for user_id, _, _ in backend.iterate()) == ["0", "1", "2"]
+
+    backend.delete("1")
+    backend.delete("missing")
+    assert backend.get("1") == ([], 0)
+
+    with pytest.raises(TooManyCardsError):
+        backend.put("3", [{}] * (MAX_CARDS_PER_USER + 1))
+
+
+def test_cards_backend(backend):
+    cards = Cards("coc", backend=backend)
+    cards.update("0", attributes={"name": "简律纯"})
+    cards.new("0", {"name": "雪花"})
+    cards.select("0", 1)
+    cards.update("1", attributes={"name": "1"})
+    cards.save()
+    cards.delete("1")
+    cards.save()
+
+    reloaded = Cards("coc", backend=backend)
+    assert reloaded.get("0") == {"name": "雪花"}
+    assert reloaded.getall("0") == [{"name": "简律纯"}, {"name": "雪花"}]
+    assert reloaded.get("1") is None
+
+
+def test_cards_backend_import(backend):
+    cards = Cards("coc", backend=backend)
+    cards.new("0", {"name": "简律纯"})
+    source = io.StringIO(
+        '{"user_id": "7", "selected": 1, "cards": [{"name": "雪花"}, {"name": "7"}]}\n'
+    )
+    assert cards.import_ndjson(source) == 1
+    assert cards.get("7") == {"name": "7"}
+    assert cards.count("7") == 2
+
+    cards.new("7", {"name": "欧若可"})
+    assert backend.get("7")[0] == [{"name": "雪花"}, {"name": "7"}, {"name": "欧若可"}]
+    assert backend.get("0")[0] == [{"name": "简律纯"}]
+
+
+class DictBackend:
+    """Implements just the ``CardsBackend`` protocol, without a base class."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, user_id):
+        return self.data.get(user_id, ([], 0))
+
+    def put(self, user_id, cards, selected_card=0):
+        self.data[user_id] = (cards, selected_card)
+
+    def delete(self, user_id):
+        self.data.pop(user_id, None)
+
+    def iterate(self, batch_size=500):
+        for user_id, (cards, selected_card) in list(self.data.items()):
+            yield user_id, cards, selected_card
+
+    def putmany(self, rows):
+        rows = list(rows)
+        for user_id, cards, selected_card in rows:
+            self.put(user_id, cards, selected_card)
+        return len(rows)
+
+    def save(self, cards, selected_cards):
+        self.data = {
+            user_id: (list(user_cards), selected_cards.get(user_id) or 0)
+            for user_id, user_cards in cards.items()
+        }
+
+    def load(self, target="*"):
+        if target != "*":
+            return self.get(target)
+        return (
+            {user_id: cards for user_id, (cards, _) in self.data.items()},
+            {user_id: selected for user_id, (_, selected) in self.data.items()},
+        )
+
+    def changed(self):
+        return False
+
+    def changes(self):
+        return []
+
+    def removed(self, user_ids):
+        return []
+
+    def close(self):
+        pass
+
+
+def test_protocol_backend(backend):
+    assert isinstance(backend, CardsBackend)
+    assert isinstance(DictBackend(), CardsBackend)
+
+    dict_backend = DictBackend()
+    cards = Cards("coc", backend=dict_backend)
+    cards.update("0", attributes={"name": "简律纯"})
+    cards.new("0", {"name": "雪花"})
+    cards.select("0", 1)
+    cards.save()
+    assert dict_backend.get("0") == ([{"name": "简律纯"}, {"name": "雪花"}], 1)
+
+    reloaded = Cards("coc", backend=dict_backend)
+    assert reloaded.get("0") == {"name": "雪花"}
+    assert reloaded.export_ndjson(io.StringIO()) == 1
+
+
+def test_memory_snapshot(tmp_path):
+    path = tmp_path / "cards.json"
+    backend = MemoryBackend(path, snapshot_interval=0.01)
+    backend.put("0", [{"name": "简律纯"}])
+    deadline = time.monotonic() + 5
+    while not path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert MemoryBackend(path).get("0") == ([{"name": "简律纯"}], 0)
+
+    backend.put("1", [{"name": "雪花"}])
+    backend.close()
+    assert MemoryBackend(path).get("1") == ([{"name": "雪花"}], 0)
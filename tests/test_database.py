@@ -0,0 +1,148 @@
+from concurrent.futures import ThreadPoolExecutor
+from diceutils.cards import Cards
+from diceutils.database import ConnectionPool
+from diceutils.logging import LogManager
+
+import sqlite3
+import threading
+import pytest
+
+
+def test_pragmas(tmp_path):
+    pool = ConnectionPool(tmp_path / "test.db")
+    assert pool.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert pool.conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+    with pool.reader() as conn:
+        assert conn.execute("PRAGMA cache_size").fetchone()[0] < 0
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("CREATE TABLE test (id INTEGER)")
+    pool.close()
+
+
+def test_close(tmp_path):
+    pool = ConnectionPool(tmp_path / "test.db", max_readers=1)
+    errors = []
+
+    def wait_for_reader():
+        try:
+            with pool.reader():
+                pass
+        except sqlite3.ProgrammingError as err:
+            errors.append(err)
+
+    with pool.reader() as conn:
+        waiter = threading.Thread(target=wait_for_reader)
+        waiter.start()
+        pool.close()
+        waiter.join(5)
+        assert not waiter.is_alive()
+        assert conn.execute("SELECT 1").fetchone() == (1,)
+
+    assert len(errors) == 1
+    assert pool._readers_count == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+    with pytest.raises(sqlite3.ProgrammingError):
+        with pool.reader():
+            pass
+
+
+def test_writer_rollback():
+    pool = ConnectionPool()
+    with pool.writer() as conn:
+        conn.execute("CREATE TABLE test (id INTEGER)")
+    with pytest.raises(ValueError):
+        with pool.writer() as conn:
+            conn.execute("INSERT INTO test VALUES (1)")
+            raise ValueError
+    with pool.reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM test").fetchone()[0] == 0
+    pool.close()
+
+
+def test_threads(tmp_path):
+    manager = LogManager(tmp_path / "dicergirl.db")
+
+    def work(index: int):
+        manager.add(
+            str(index % 8),
+            "0",
+            user_id=str(index),
+            user_role="PL",
+            card_name="User",
+            date="2024-03-01 00:00:00",
+            data=str([{"type": "text", "data": {"text": str(index)}}]),
+            message_sequence=str(index),
+        )
+        return len(manager.load(str(index % 8), "0"))
+
+    with ThreadPoolExecutor(16) as executor:
+        assert all(executor.map(work, range(200)))
+
+    assert sum(len(logs["0"]) for logs in manager.loadall().values()) == 200
+    manager.close()
+
+
+@pytest.mark.parametrize("compression", [None, "gzip", "bz2", "lzma"])
+def test_backup_restore(tmp_path, compression):
+    manager = LogManager(tmp_path / "dicergirl.db")
+    manager.add(
+        "0",
+        "0",
+        user_id="0",
+        user_role="KP",
+        card_name="User",
+        date="2024-03-01 00:00:00",
+        data=str([{"type": "text", "data": {"text": "test"}}]),
+        message_sequence="0",
+    )
+    snapshot = manager.backup(tmp_path / "backup.db", compression=compression)
+    manager.clear("0", "0")
+    assert manager.load("0", "0") == []
+
+    manager.restore(snapshot)
+    assert manager.load("0", "0")[0]["data"] == [
+        {"type": "text", "data": {"text": "test"}}
+    ]
+    manager.close()
+
+
+def test_backup_with_writes(tmp_path):
+    pool = ConnectionPool(tmp_path / "test.db")
+    with pool.writer() as conn:
+        conn.execute("CREATE TABLE test (data BLOB)")
+        conn.executemany("INSERT INTO test VALUES (?)", [(b"0" * 1024,)] * 2000)
+
+    stop = threading.Event()
+
+    def write():
+        while not stop.is_set():
+            with pool.writer() as conn:
+                conn.execute("INSERT INTO test VALUES (?)", (b"1",))
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    try:
+        pool.backup(tmp_path / "backup.db", pages=16, sleep=0.001)
+    finally:
+        stop.set()
+        thread.join()
+
+    conn = sqlite3.connect(tmp_path / "backup.db")
+    assert conn.execute("SELECT COUNT(*) FROM test").fetchone()[0] >= 2000
+    assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    conn.close()
+    pool.close()
+
+
+def test_restore_cards(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cards = Cards("coc", store=True)
+    cards.new("0", {"name": "简律纯"})
+    snapshot = cards.cards_manager.backup(tmp_path / "coc.db.gz", compression="gzip")
+    cards.delete("0")
+    cards.new("1", {"name": "雪花"})
+
+    cards.cards_manager.restore(snapshot)
+    assert cards.getall("0") == [{"name": "简律纯"}]
+    assert cards.getall("1") is None
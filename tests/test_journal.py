@@ -0,0 +1,84 @@
+from diceutils.exceptions import TooManyCardsError
+from diceutils.journal import JournaledCards
+
+import json
+import pytest
+import time
+
+
+def test_journaled_card(tmp_path):
+    cards = JournaledCards("coc", tmp_path / "coc.journal")
+    cards.update("0", attributes={"name": "简律纯"})
+    cards.new("0", {"name": "雪花"})
+    cards.select("0", 1)
+    cards.new("1", {"name": "1"})
+    cards.delete("1", 0)
+    cards.new("2")
+    cards.delete("2")
+    cards.update("0", attributes={"hp": 10})
+    with pytest.raises(TooManyCardsError):
+        cards.select("0", 5)
+    cards.close()
+
+    records = [
+        json.loads(line)
+        for segment in (tmp_path / "coc.journal").glob("segment-*")
+        for line in segment.read_text(encoding="utf-8").splitlines()
+    ]
+    assert records[-1]["op"] == "update"
+    assert records[-1]["index"] == 1
+    assert records[-1]["attributes"] == {"hp": 10}
+    assert not any("cards" in record for record in records)
+
+    cards = JournaledCards("coc", tmp_path / "coc.journal")
+    assert cards.get("0") == {"name": "雪花", "hp": 10}
+    assert cards.getall("0") == [{"name": "简律纯"}, {"name": "雪花", "hp": 10}]
+    assert cards.getall("1") == []
+    assert cards.getall("2") is None
+    cards.close()
+
+
+def test_journal_compaction(tmp_path):
+    path = tmp_path / "coc.journal"
+    cards = JournaledCards("coc", path, threshold=512, history=2)
+    for index in range(200):
+        cards.update(str(index % 10), attributes={"hp": index})
+    cards.cards_manager.compact()
+    # Background compactions may have skipped most segments, a second
+    # snapshot makes every segment before the first one prunable.
+    cards.update("9", attributes={"hp": 199})
+    cards.cards_manager.compact()
+
+    assert len(list(path.glob("snapshot-*"))) <= 2
+    assert sum(file.stat().st_size for file in path.glob("segment-*")) < 200 * 100
+    cards.close()
+
+    cards = JournaledCards("coc", path, threshold=512)
+    assert [cards.get(str(user))["hp"] for user in range(10)] == list(range(190, 200))
+    cards.close()
+
+
+def test_journal_restore(tmp_path):
+    cards = JournaledCards("coc", tmp_path / "coc.journal", threshold=1024)
+    cards.update("0", attributes={"name": "简律纯"})
+    cards.update("1", attributes={"name": "1"})
+    cards.cards_manager.compact()
+    time.sleep(0.01)
+    checkpoint = time.time()
+    time.sleep(0.01)
+    for hp in range(20):
+        cards.update("0", attributes={"hp": hp})
+    cards.new("0", {"name": "雪花"})
+    cards.select("0", 1)
+    cards.cards_manager.compact()
+
+    assert cards.restore("0", checkpoint) == [{"name": "简律纯"}]
+    assert cards.get("0") == {"name": "简律纯"}
+    assert cards.get("1") == {"name": "1"}
+    cards.close()
+
+    cards = JournaledCards("coc", tmp_path / "coc.journal")
+    assert cards.getall("0") == [{"name": "简律纯"}]
+    with pytest.raises(ValueError):
+        cards.restore("0", 0)
+    cards.close()
@@ -1,8 +1,14 @@
 from typing import Any
 from diceutils.exceptions import TooManyLoggersError
-from diceutils.logging import Logger
+from datetime import datetime, timedelta
+from diceutils.logging import SCHEMA_VERSION, LogManager, Logger, timestamp
 
+import diceutils.logging
+import os
 import pytest
+import sqlite3
+import threading
+import time
 
 
 @pytest.fixture
@@ -116,3 +122,708 @@ def test_multiple(logger):
         exception = err
 
     assert isinstance(exception, TooManyLoggersError)
+
+
+def test_schema(tmp_path):
+    path = tmp_path / "log.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE log (session_id TEXT, id TEXT, user_id TEXT, user_role TEXT, "
+        "card_name TEXT, date TEXT, data TEXT, message_sequence TEXT)"
+    )
+    conn.close()
+
+    logger = Logger(path)
+    conn = logger.log_manager.conn
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    for query, params in (
+        ("SELECT DISTINCT id FROM log WHERE session_id = ?", ("0",)),
+        ("SELECT data FROM log WHERE session_id = ? AND id = ?", ("0", "0")),
+    ):
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+        assert "INDEX log_session" in str(plan)
+    logger.rescue()
+    Logger(path).rescue()
+
+
+def test_count_cache(tmp_path):
+    logger = Logger(tmp_path / "log.db")
+    other = Logger(tmp_path / "log.db")
+    for id in range(3):
+        logger.add("0", id, user_id="0", data=[{"type": "text"}], message_sequence="x")
+    assert logger.log_manager._ids == {"0": {"0", "1", "2"}}
+    assert logger.next_id("0") == 3
+
+    logger.clear("0", 1)
+    assert logger.next_id("0") == 2
+    other.add("0", 1, user_id="0", data=[{"type": "text"}], message_sequence="x")
+    assert logger.next_id("0") == 3
+    with pytest.raises(TooManyLoggersError):
+        logger.add("0", 3, user_id="0", data=[{"type": "text"}], message_sequence="x")
+
+    logger.remove("0", 2, "x")
+    assert logger.next_id("0") == 2
+
+
+def test_background_writer(tmp_path):
+    path = tmp_path / "log.db"
+    logger = Logger(path, background=True)
+    logger.log_manager._queue.maxsize = 8
+
+    def worker(session_id: str):
+        for index in range(200):
+            logger.add(
+                session_id,
+                0,
+                user_id="0",
+                data=[{"type": "text", "data": index}],
+                message_sequence=str(index),
+            )
+
+    threads = [threading.Thread(target=worker, args=(str(i),)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [log["data"][0]["data"] for log in logger.load("0", 0)] == list(range(200))
+    logger.add("0", 0, user_id="0", data=[{"type": "text"}], message_sequence="x")
+    logger.remove("0", 0, "x")
+    logger.add("4", 0, user_id="0", data=[{"type": "text"}], message_sequence="x")
+    logger.rescue()
+
+    logger = Logger(path)
+    assert len(logger.load("0", 0)) == 200
+    assert sum(map(len, logger.loadall()["3"].values())) == 200
+    assert len(logger.load("4", 0)) == 1
+
+
+def test_iterload(tmp_path):
+    logger = Logger(tmp_path / "log.db")
+    for index in range(25):
+        logger.add(
+            "0",
+            0,
+            user_id="0",
+            data=[{"type": "text", "data": index}],
+            message_sequence=f"{24 - index:03d}",
+        )
+    logger.add("1", 0, user_id="1", data=[{"type": "text"}], message_sequence="x")
+
+    records = list(logger.iterload("0", 0, batch_size=4))
+    assert [record["data"][0]["data"] for record in records] == list(range(25))
+    assert records[0].items() >= logger.load("0", 0)[0].items()
+
+    after = records[9]["rowid"]
+    assert [
+        record["data"][0]["data"]
+        for record in logger.iterload("0", 0, batch_size=4, after=after)
+    ] == list(range(10, 25))
+    assert [
+        record["message_sequence"]
+        for record in logger.iterload(
+            "0", 0, batch_size=4, order_by="message_sequence", after="020"
+        )
+    ] == ["021", "022", "023", "024"]
+
+    rows = list(logger.iterloadall(batch_size=4))
+    assert [(session_id, id) for session_id, id, _ in rows] == [("0", "0")] * 25 + [
+        ("1", "0")
+    ]
+
+    conn = logger.log_manager.conn
+    for query, params in (
+        (
+            "SELECT * FROM log WHERE session_id = ? AND id = ? AND rowid > ? "
+            "ORDER BY rowid LIMIT 4",
+            ("0", "0", 0),
+        ),
+        (
+            "SELECT * FROM log WHERE session_id = ? AND id = ? "
+            "AND (message_sequence, rowid) > (?, ?) "
+            "ORDER BY message_sequence, rowid LIMIT 4",
+            ("0", "0", "", 0),
+        ),
+    ):
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+        assert "TEMP B-TREE" not in str(plan)
+
+
+def test_search(tmp_path):
+    path = tmp_path / "log.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE log (session_id TEXT, id TEXT, user_id TEXT, user_role TEXT, "
+        "card_name TEXT, date TEXT, data TEXT, message_sequence TEXT)"
+    )
+    conn.execute(
+        "INSERT INTO log VALUES ('0', '0', '0', 'KP', 'User', '', ?, 'a')",
+        (str([{"type": "text", "data": "调查员推开了古老的木门"}]),),
+    )
+    conn.commit()
+    conn.close()
+
+    logger = Logger(path)
+    logger.add(
+        "0",
+        0,
+        user_id="1",
+        data=[
+            {"type": "image", "data": "木门"},
+            {"type": "text", "data": "门外是 50% 的迷雾"},
+        ],
+        message_sequence="b",
+    )
+    logger.add(
+        "1",
+        0,
+        user_id="2",
+        data=[{"type": "text", "data": "古老的木门"}],
+        message_sequence="c",
+    )
+
+    hits = logger.search("0", "古老的")
+    assert [hit["message_sequence"] for hit in hits] == ["a"]
+    assert "[古老的]" in hits[0]["snippet"]
+    assert len(logger.search(None, "古老的木门")) == 2
+    assert [hit["user_id"] for hit in logger.search("0", "木门")] == ["0"]
+    hits = logger.search("0", "0%")
+    assert [hit["snippet"] for hit in hits] == ["门外是 5[0%] 的迷雾"]
+    assert logger.search("0", "不存在的内容") == []
+
+    logger.add(
+        "0",
+        0,
+        user_id="1",
+        data=[{"type": "text", "data": "Roll D100"}],
+        message_sequence="d",
+    )
+    assert [hit["snippet"] for hit in logger.search("0", "d1")] == ["Roll [D1]00"]
+
+    logger.remove("0", 0, "a")
+    assert logger.search("0", "古老的") == []
+    logger.rescue()
+
+
+def test_search_without_trigram(tmp_path, monkeypatch):
+    path = tmp_path / "log.db"
+    monkeypatch.setattr(diceutils.logging, "_trigram_available", lambda conn: False)
+    logger = Logger(path)
+    for sequence, text in (("a", "调查员推开了古老的木门"), ("b", "Roll D100")):
+        logger.add(
+            "0",
+            0,
+            user_id="0",
+            data=[{"type": "text", "data": text}],
+            message_sequence=sequence,
+        )
+    conn = sqlite3.connect(path)
+    tables = {name for name, in conn.execute("SELECT name FROM sqlite_master")}
+    conn.close()
+    assert "log_fts" not in tables
+
+    hits = logger.search("0", "古老的")
+    assert [hit["snippet"] for hit in hits] == ["调查员推开了[古老的]木门"]
+    assert [hit["rank"] for hit in logger.search(None, "roll d")] == [0.0]
+    logger.log_manager.max_size = logger.log_manager.used_size() - 1
+    assert logger.prune() == 2
+    logger.log_manager.max_size = None
+    logger.add(
+        "0",
+        0,
+        user_id="0",
+        data=[{"type": "text", "data": "古老的木门"}],
+        message_sequence="c",
+    )
+    logger.rescue()
+
+    # Opened where trigrams are available, the index is built then.
+    monkeypatch.undo()
+    logger = Logger(path)
+    hits = logger.search("0", "古老的")
+    assert hits[0]["snippet"] == "[古老的]木门"
+    assert hits[0]["rank"] != 0.0
+    logger.rescue()
+
+
+def test_archive(tmp_path):
+    path = tmp_path / "log.db"
+    logger = Logger(path)
+    for index in range(25):
+        logger.add(
+            "0",
+            0,
+            user_id="0",
+            data=[{"type": "text", "data": f"第{index}条 " + "调查记录" * 200}],
+            message_sequence=f"{24 - index:03d}",
+        )
+    logger.add("0", 1, user_id="1", data=[{"type": "text"}], message_sequence="x")
+    records = list(logger.iterload("0", 0))
+    loaded = logger.load("0", 0)
+    loadall = logger.loadall()
+    logger.vacuum()
+    size = path.stat().st_size
+
+    assert logger.archive("0", 0, chunk_size=10, compression="lzma", vacuum=True) == 25
+    assert path.stat().st_size < size / 2
+    conn = logger.log_manager.conn
+    assert conn.execute("SELECT COUNT(*) FROM log").fetchone()[0] == 1
+    assert conn.execute("SELECT COUNT(*) FROM log_archive").fetchone()[0] == 3
+    assert logger.load("0", 0) == loaded
+    assert logger.loadall() == loadall
+    assert list(logger.iterload("0", 0, batch_size=4)) == records
+    assert [
+        record["message_sequence"]
+        for record in logger.iterload(
+            "0", 0, batch_size=4, order_by="message_sequence", after="020"
+        )
+    ] == ["021", "022", "023", "024"]
+    assert [row[2] for row in logger.iterloadall()] == records + [
+        logger.iterload("0", 1).__next__()
+    ]
+    assert logger.search("0", "调查记录") == []
+
+    logger.add("0", 0, user_id="0", data=[{"type": "text"}], message_sequence="y")
+    assert [record["message_sequence"] for record in logger.iterload("0", 0)][-2:] == [
+        "000",
+        "y",
+    ]
+    other = Logger(path)
+    assert other.next_id("0") == 2
+    other.rescue()
+
+    logger.remove("0", 0, "012")
+    assert len(logger.load("0", 0)) == 25
+    records = list(logger.iterload("0", 0))
+    assert "012" not in [record["message_sequence"] for record in records]
+    logger.clear("0", 0)
+    assert logger.load("0", 0) == []
+    assert logger.next_id("0") == 1
+    logger.rescue()
+
+
+def test_load_range(tmp_path):
+    path = tmp_path / "log.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE log (session_id TEXT, id TEXT, user_id TEXT, user_role TEXT, "
+        "card_name TEXT, date TEXT, data TEXT, message_sequence TEXT)"
+    )
+    conn.execute(
+        "INSERT INTO log VALUES ('0', '0', '0', 'KP', 'User', "
+        "'2026-10-01 20:00:00', '[]', 'old')"
+    )
+    conn.commit()
+    conn.close()
+
+    logger = Logger(path)
+    night = datetime(2026, 10, 18, 20)
+    for hour in range(6):
+        logger.add(
+            "0",
+            0,
+            user_id="0",
+            data=[{"type": "text", "data": hour}],
+            date=night + timedelta(hours=hour),
+            message_sequence=str(hour),
+        )
+    logger.add("0", 0, user_id="0", data=[{"type": "text"}], message_sequence="now")
+
+    def sequences(*args, **kwargs):
+        records = logger.load_range("0", 0, *args, **kwargs)
+        return [record["message_sequence"] for record in records]
+
+    assert sequences(night, night + timedelta(hours=3)) == ["0", "1", "2"]
+    assert sequences(end=night) == ["old"]
+    assert sequences(datetime(2026, 10, 1), datetime(2026, 10, 2)) == ["old"]
+    assert sequences(timestamp(night) + 3600, batch_size=2) == [
+        *"12345",
+        "now",
+    ]
+
+    logger.archive("0", 0, chunk_size=3)
+    assert sequences(night + timedelta(hours=4)) == ["4", "5", "now"]
+
+    plan = logger.log_manager.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM log WHERE session_id = ? AND id = ? "
+        "AND (ts, rowid) > (?, ?) AND ts < ? ORDER BY ts, rowid LIMIT 2",
+        ("0", "0", 0, 0, 0),
+    ).fetchall()
+    assert "log_session_ts" in str(plan) and "TEMP B-TREE" not in str(plan)
+    logger.rescue()
+
+
+def test_idempotent_add(tmp_path):
+    path = tmp_path / "log.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE log (session_id TEXT, id TEXT, user_id TEXT, user_role TEXT, "
+        "card_name TEXT, date TEXT, data TEXT, message_sequence TEXT)"
+    )
+    conn.executemany(
+        "INSERT INTO log VALUES ('0', '0', ?, 'KP', 'User', '', '[]', 'a')",
+        [("first",), ("again",)],
+    )
+    conn.commit()
+    conn.close()
+
+    logger = Logger(path)
+    assert [record["user_id"] for record in logger.load("0", 0)] == ["first"]
+
+    def message(sequence: str, user_id: str = "0", session_id: str = "0", id: int = 0):
+        return {
+            "session_id": session_id,
+            "id": id,
+            "user_id": user_id,
+            "data": [{"type": "text", "data": user_id}],
+            "message_sequence": sequence,
+        }
+
+    logger.add_many([message("b"), message("c"), message("b", "retried")])
+    logger.add(**message("c", "retried"))
+    assert [record["user_id"] for record in logger.load("0", 0)] == ["first", "0", "0"]
+    logger.add(**message("b", "edited"), on_conflict="replace")
+    assert [record["user_id"] for record in logger.load("0", 0)] == [
+        "first",
+        "edited",
+        "0",
+    ]
+    assert [hit["user_id"] for hit in logger.search("0", "edited")] == ["edited"]
+
+    with pytest.raises(TooManyLoggersError):
+        logger.add_many([message("x", id=id) for id in range(1, 5)])
+    assert logger.next_id("0") == 1
+    logger.rescue()
+
+    logger = Logger(path, background=True)
+    logger.add_many([message(str(index)) for index in range(10)])
+    logger.add_many([message(str(index), "retried") for index in range(10)])
+    assert len(logger.load("0", 0)) == 13
+
+    logger.remove("0", 0, "b")
+    assert len(logger.load("0", 0)) == 12
+    plan = logger.log_manager.conn.execute(
+        "EXPLAIN QUERY PLAN DELETE FROM log "
+        "WHERE session_id = ? AND id = ? AND message_sequence = ?",
+        ("0", "0", "b"),
+    ).fetchall()
+    assert "INDEX log_session_message" in str(plan)
+    logger.rescue()
+
+
+def test_archive_redelivery(tmp_path):
+    path = tmp_path / "log.db"
+    logger = Logger(path)
+
+    def message(sequence: str, text: str = "夜色渐深"):
+        return {
+            "session_id": "0",
+            "id": 0,
+            "user_id": "0",
+            "data": [{"type": "text", "data": text}],
+            "message_sequence": sequence,
+        }
+
+    logger.add_many([message(sequence) for sequence in "abc"])
+    logger.archive("0", 0, chunk_size=2)
+    logger.add_many([message("b", ".r 重投"), message("d")])
+    records = list(logger.iterload("0", 0))
+    assert [record["message_sequence"] for record in records] == list("abcd")
+    assert records[1]["data"][0]["data"] == "夜色渐深"
+
+    logger.add(**message("c", ".r 修改"), on_conflict="replace")
+    records = list(logger.iterload("0", 0))
+    assert [record["message_sequence"] for record in records] == list("abcd")
+    assert records[2]["data"][0]["data"] == ".r 修改"
+    assert logger.stats("0", 0)[0]["rolls"] == 1
+
+    # Archived before the key table of version 10, its migration drops
+    # redelivered duplicates.
+    logger.rescue()
+    conn = sqlite3.connect(path)
+    conn.execute("DROP TABLE log_archive_keys")
+    conn.execute(
+        "INSERT INTO log (session_id, id, message_sequence) VALUES ('0', '0', 'a')"
+    )
+    for statement in diceutils.logging._MIGRATIONS[9]:
+        if callable(statement):
+            statement(conn)
+        else:
+            conn.execute(statement)
+    conn.commit()
+    conn.close()
+    logger = Logger(path)
+    records = logger.iterload("0", 0)
+    assert [record["message_sequence"] for record in records] == list("abcd")
+    logger.add(**message("a"))
+    assert len(logger.load("0", 0)) == 4
+
+    logger.clear("0", 0)
+    logger.add(**message("a"))
+    assert len(logger.load("0", 0)) == 1
+    logger.rescue()
+
+
+def test_remove_archived(monkeypatch):
+    logger = Logger(":memory:")
+    for index in range(9):
+        logger.add(
+            "0", 0, user_id="0", data=[{"type": "text"}], message_sequence=str(index)
+        )
+    logger.archive("0", 0, chunk_size=3)
+    logger.add("0", 0, user_id="0", data=[{"type": "text"}], message_sequence="9")
+
+    unpacked = []
+    unpack = LogManager._unpack
+    monkeypatch.setattr(
+        LogManager,
+        "_unpack",
+        staticmethod(lambda *block: unpacked.append(block) or unpack(*block)),
+    )
+    logger.remove("0", 0, "9")
+    assert unpacked == []
+    logger.remove("0", 0, "4")
+    assert len(unpacked) == 1
+    monkeypatch.undo()
+    records = logger.iterload("0", 0)
+    assert [record["message_sequence"] for record in records] == [
+        "0",
+        "1",
+        "2",
+        "3",
+        "5",
+        "6",
+        "7",
+        "8",
+    ]
+    logger.rescue()
+
+
+def test_stats(tmp_path):
+    path = tmp_path / "log.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE log (session_id TEXT, id TEXT, user_id TEXT, user_role TEXT, "
+        "card_name TEXT, date TEXT, data TEXT, message_sequence TEXT)"
+    )
+    conn.executemany(
+        "INSERT INTO log VALUES ('0', '0', '1', 'PL', 'User', '', ?, ?)",
+        [(str([{"type": "text", "data": ".ra 侦查"}]), "a"), ("[]", "b")],
+    )
+    conn.commit()
+    conn.close()
+
+    logger = Logger(path)
+    for index, (user_id, role, text) in enumerate(
+        [("0", "KP", "夜色渐深"), ("1", "PL", "。r3d6"), ("2", "PL", "/sc 1/1d6")]
+    ):
+        logger.add(
+            "0",
+            0,
+            user_id=user_id,
+            user_role=role,
+            data=[{"type": "text", "data": text}],
+            message_sequence=str(index),
+        )
+    logger.add("0", 1, user_id="0", data=[{"type": "text"}], message_sequence="x")
+    assert logger.stats("0", 0) == [
+        {"id": "0", "user_id": "0", "user_role": "KP", "messages": 1, "rolls": 0},
+        {"id": "0", "user_id": "1", "user_role": "PL", "messages": 3, "rolls": 2},
+        {"id": "0", "user_id": "2", "user_role": "PL", "messages": 1, "rolls": 1},
+    ]
+    assert [row["id"] for row in logger.stats("0")] == ["0", "0", "0", "1"]
+
+    logger.add(
+        "0",
+        0,
+        user_id="2",
+        user_role="PL",
+        data=[{"type": "text", "data": "“快跑！”"}],
+        message_sequence="2",
+        on_conflict="replace",
+    )
+    logger.remove("0", 0, "1")
+    expected = [
+        {"id": "0", "user_id": "0", "user_role": "KP", "messages": 1, "rolls": 0},
+        {"id": "0", "user_id": "1", "user_role": "PL", "messages": 2, "rolls": 1},
+        {"id": "0", "user_id": "2", "user_role": "PL", "messages": 1, "rolls": 0},
+    ]
+    assert logger.stats("0", 0) == expected
+
+    logger.archive("0", 0)
+    assert logger.stats("0", 0) == expected
+    logger.remove("0", 0, "a")
+    assert logger.stats("0", 0)[1] == {**expected[1], "messages": 1, "rolls": 0}
+    logger.remove("0", 0, "0")
+    assert [row["user_id"] for row in logger.stats("0", 0)] == ["1", "2"]
+
+    logger.clear("0", 0)
+    assert logger.stats("0", 0) == []
+    assert len(logger.stats("0")) == 1
+    logger.rescue()
+
+
+def test_retention(tmp_path):
+    path = tmp_path / "log.db"
+    logger = Logger(
+        path, max_age=7 * 24 * 3600, rotate_dir=tmp_path / "rotated", prune_interval=60
+    )
+    now = datetime.now()
+    for index, date in enumerate(
+        [datetime(2026, 8, 1), datetime(2026, 8, 31), datetime(2026, 9, 1), now]
+    ):
+        logger.add(
+            "0",
+            0,
+            user_id="0",
+            data=[{"type": "text", "data": f".r 第{index}次检定"}],
+            date=date,
+            message_sequence=str(index),
+        )
+    assert logger.log_manager.prune(batch_size=2) == 3
+    assert [record["message_sequence"] for record in logger.iterload("0", 0)] == ["3"]
+    assert logger.stats("0")[0]["rolls"] == 1
+    assert logger.rotations() == ["2026-08", "2026-09"]
+    rotated = logger.rotation("2026-08")
+    records = rotated.iterload("0", 0)
+    assert [record["message_sequence"] for record in records] == ["0", "1"]
+    assert len(rotated.search("0", "次检定")) == 2
+    rotated.rescue()
+    with pytest.raises(FileNotFoundError):
+        logger.rotation("2026-07")
+    logger.rescue()
+
+    logger = Logger(path, max_rows_per_session=5)
+    for index in range(8):
+        logger.add(
+            "1",
+            index % 2,
+            user_id="0",
+            data=[{"type": "text"}],
+            message_sequence=str(index),
+        )
+    assert logger.prune() == 3
+    sequences = [
+        record["message_sequence"]
+        for session_id, _, record in logger.iterloadall()
+        if session_id == "1"
+    ]
+    assert sorted(sequences) == ["3", "4", "5", "6", "7"]
+    assert len(logger.load("0", 0)) == 1
+    logger.rescue()
+
+    logger = Logger(path, max_size=256 * 1024)
+    logger.add_many(
+        {
+            "session_id": "2",
+            "id": 0,
+            "user_id": "0",
+            "data": [{"type": "text", "data": f"{index}" + "记录" * 500}],
+            "message_sequence": str(index),
+        }
+        for index in range(200)
+    )
+    assert logger.log_manager.used_size() > 256 * 1024
+    assert 0 < logger.log_manager.prune(batch_size=10) < 200
+    assert logger.log_manager.used_size() <= 256 * 1024
+    assert logger.load("2", 0)[-1]["data"][0]["data"].startswith("199")
+    logger.rescue()
+
+    logger = Logger(path, max_age=3600, prune_interval=0.01)
+    logger.add(
+        "3",
+        0,
+        user_id="0",
+        data=[{"type": "text"}],
+        date=datetime(2026, 1, 1),
+        message_sequence="x",
+    )
+    deadline = time.monotonic() + 5
+    while logger.load("3", 0) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert logger.load("3", 0) == []
+    assert logger.next_id("3") == 0
+    logger.rescue()
+
+
+def test_prune_plan(tmp_path):
+    logger = Logger(tmp_path / "log.db")
+    conn = logger.log_manager.conn
+    for where, index in (
+        ("ts < ? ORDER BY ts", "log_ts"),
+        ("session_id = ? ORDER BY rowid", "log_session "),
+    ):
+        plan = str(
+            conn.execute(
+                f"EXPLAIN QUERY PLAN SELECT * FROM log WHERE {where} LIMIT 10", (0,)
+            ).fetchall()
+        )
+        assert f"INDEX {index}" in plan
+        assert "TEMP B-TREE" not in plan
+    plan = str(
+        conn.execute(
+            "EXPLAIN QUERY PLAN SELECT COUNT(*) FROM log WHERE session_id = ?", ("0",)
+        ).fetchall()
+    )
+    assert "COVERING INDEX" in plan
+    plan = str(
+        conn.execute(
+            "EXPLAIN QUERY PLAN SELECT session_id FROM log_stats GROUP BY session_id"
+        ).fetchall()
+    )
+    assert "TEMP B-TREE" not in plan
+    logger.rescue()
+
+
+def test_prune_size_archived(tmp_path):
+    logger = Logger(tmp_path / "log.db")
+    logger.add_many(
+        {
+            "session_id": "0",
+            "id": 0,
+            "user_id": "0",
+            "data": [{"type": "text", "data": os.urandom(1500).hex()}],
+            "message_sequence": str(index),
+        }
+        for index in range(200)
+    )
+    logger.archive("0", 0)
+    conn = sqlite3.connect(tmp_path / "log.db")
+    (archived_size,) = conn.execute(
+        "SELECT SUM(length(data)) FROM log_archive"
+    ).fetchone()
+    conn.close()
+    for index in range(20):
+        logger.add(
+            "1",
+            0,
+            user_id="0",
+            data=[{"type": "text", "data": f"第{index}次检定"}],
+            message_sequence=str(index),
+        )
+
+    # The archive alone exceeds the limit, pruning live records cannot help.
+    logger.log_manager.max_size = archived_size // 2
+    assert logger.prune() == 0
+    assert len(logger.load("1", 0)) == 20
+    logger.rescue()
+
+
+def test_prune_error(tmp_path, monkeypatch):
+    logger = Logger(tmp_path / "log.db", max_age=3600, prune_interval=0.01)
+    failed = threading.Event()
+
+    def fail(*args):
+        failed.set()
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(logger.log_manager, "_prune_batch", fail)
+    assert failed.wait(5)
+    logger.add("0", 0, user_id="0", data=[{"type": "text"}], message_sequence="x")
+    logger.flush()
+    assert len(logger.load("0", 0)) == 1
+    with pytest.raises(sqlite3.OperationalError):
+        logger.prune()
+    monkeypatch.undo()
+    assert logger.prune() == 0
+    logger.rescue()
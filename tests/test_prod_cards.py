@@ -1,5 +1,22 @@
-from diceutils.cards import Cards, MAX_CARDS_PER_USER
+from diceutils.cards import (
+    Cards,
+    CardsPool,
+    CardsManager,
+    NormalizedCards,
+    NormalizedCardsManager,
+    MAX_CARDS_PER_USER,
+)
+from diceutils.charactors import Attribute, AttributeGroup, Template
+from diceutils.database import ConnectionPool
 from diceutils.exceptions import TooManyCardsError
+from diceutils.journal import JournaledCards
+
+import gc
+import json
+import pytest
+import threading
+import time
+import weakref
 
 
 def test_card():
@@ -22,3 +39,373 @@ def test_card():
         exception = err
     finally:
         assert isinstance(exception, TooManyCardsError)
+
+
+def test_normalized_card():
+    cards = NormalizedCards("coc")
+    cards.clear("0")
+
+    cards.update("0", attributes={"name": "简律纯"})
+    cards.update("0", 1, attributes={"name": "雪花"})
+    assert cards.get("0") == {"name": "简律纯"}
+    cards.select("0", 1)
+    assert cards.get("0") == {"name": "雪花"}
+    cards.update("0", attributes={"age": 18})
+    assert cards.get("0") == {"name": "雪花", "age": 18}
+
+    for _ in range(MAX_CARDS_PER_USER - 2):
+        cards.new("0")
+    assert cards.count("0") == MAX_CARDS_PER_USER
+
+    try:
+        cards.new("0")
+        exception = None
+    except Exception as err:
+        exception = err
+    finally:
+        assert isinstance(exception, TooManyCardsError)
+
+    assert cards.delete("0", 0)
+    assert cards.get("0", 0) == {"name": "雪花", "age": 18}
+    assert cards.count("0") == MAX_CARDS_PER_USER - 1
+    assert not cards.delete("0", MAX_CARDS_PER_USER)
+
+    try:
+        cards.select("0", MAX_CARDS_PER_USER)
+        exception = None
+    except Exception as err:
+        exception = err
+    finally:
+        assert isinstance(exception, TooManyCardsError)
+
+    assert cards.delete("0")
+    assert cards.getall("0") is None
+    assert cards.get_selected_id("0") == 0
+
+    # Like ``Cards``, cleared users and users without cards have an empty list.
+    cards.new("1", {"name": "雪花"})
+    cards.clear("1")
+    assert cards.getall("1") == []
+    cards.new("2", {"name": "欧若可"})
+    assert cards.delete("2", 0)
+    assert cards.getall("2") == []
+    assert cards.getall("3") is None
+
+
+@pytest.mark.parametrize("store", [False, True])
+def test_normalized_update_threads(tmp_path, monkeypatch, store):
+    monkeypatch.chdir(tmp_path)
+    cards = NormalizedCards("threads", store=store)
+    barrier = threading.Barrier(MAX_CARDS_PER_USER)
+    update = NormalizedCardsManager.update
+
+    def slow_update(*args):
+        # Widens the gap between a failed update and its fallback append.
+        updated = update(*args)
+        time.sleep(0.01)
+        return updated
+
+    monkeypatch.setattr(NormalizedCardsManager, "update", slow_update)
+
+    def worker(seed: int):
+        barrier.wait()
+        cards.update("0", 0, attributes={"seed": seed})
+
+    threads = [
+        threading.Thread(target=worker, args=(seed,))
+        for seed in range(MAX_CARDS_PER_USER)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # A missing card is appended once, later updates merge into it.
+    assert cards.count("0") == 1
+    cards.close()
+
+
+def test_normalized_migrate(tmp_path):
+    db_path = tmp_path / "coc.db"
+    legacy = CardsManager(db_path)
+    legacy.save({"0": [{"name": "简律纯"}, {"name": "雪花"}]}, {"0": 1})
+    legacy.close()
+
+    manager = NormalizedCardsManager(db_path)
+    assert manager.migrate() == 1
+    assert manager.getall("0") == [{"name": "简律纯"}, {"name": "雪花"}]
+    assert manager.selected("0") == 1
+    manager.close()
+
+
+def test_normalized_migrate_on_open(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(CardsPool, "_cards_pool", {})
+    monkeypatch.setattr(CardsPool, "_cache_cards_pool", {})
+    monkeypatch.setattr(CardsPool, "_shared_pool", None)
+    monkeypatch.setattr(CardsPool, "_registered", {})
+    monkeypatch.setattr(CardsPool, "_last_access", {})
+    legacy = Cards("coc", store=True)
+    legacy.new("0", {"name": "简律纯"})
+    legacy.close()
+
+    CardsPool.register("coc", normalized=True)
+    cards = CardsPool.get("coc")
+    assert isinstance(cards, NormalizedCards)
+    assert cards.data == {} and cards.selected_cards == {}
+    assert cards.getall("0") == [{"name": "简律纯"}]
+    cards.update("0", attributes={"name": "雪花"})
+    cards.close()
+
+    reopened = NormalizedCards("coc", store=True)
+    assert reopened.getall("0") == [{"name": "雪花"}]
+    assert reopened.cards_manager.migrate_once() == 0
+    reopened.close()
+
+
+def test_normalized_query():
+    template = Template(
+        "coc",
+        [
+            AttributeGroup(
+                "basic",
+                "基础属性",
+                [
+                    Attribute("name", str, ["名字"]),
+                    Attribute("san", int, ["理智"]),
+                    Attribute("luck", int, ["幸运"]),
+                ],
+            )
+        ],
+    )
+    cards = NormalizedCards("coc")
+    cards.index_attributes(template, ["理智"])
+    cards.new("0", {"name": "简律纯", "san": 25, "luck": 60})
+    cards.new("0", {"name": "雪花", "san": 70, "luck": 40})
+    cards.new("1", {"name": "欧若可", "san": 10, "luck": 80})
+    cards.new("2", {"name": "苏向夜", "san": 50, "luck": 20})
+
+    results = cards.query([("san", "<", 30)], order_by="san")
+    assert [(user_id, index) for user_id, index, _ in results] == [("1", 0), ("0", 0)]
+
+    results = cards.query(order_by="luck", descending=True, limit=1)
+    assert results[0][2]["name"] == "欧若可"
+
+    cards.select("0", 1)
+    results = cards.query(
+        [("san", ">=", 0)], user_ids=["0", "2"], selected_only=True, order_by="name"
+    )
+    assert [card["name"] for _, _, card in results] == ["苏向夜", "雪花"]
+
+    plan = cards.cards_manager.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM cards WHERE mode = 'coc' AND \"attr:san\" < 30"
+    ).fetchall()
+    assert "cards_attr:san" in str(plan)
+
+
+def test_normalized_query_affinity(tmp_path):
+    template = Template(
+        "coc",
+        [AttributeGroup("basic", "基础属性", [Attribute("san", int, ["理智"])])],
+    )
+    cards = NormalizedCards("coc", pool=ConnectionPool(tmp_path / "cards.db"))
+    cards.new("0", {"san": 50})
+    cards.new("1", {"san": "50"})
+    cards.new("2", {"san": 40})
+    queries = [[("san", "=", 50)], [("san", "=", "50")], [("san", "<", 60)]]
+
+    def results():
+        return [
+            [user_id for user_id, _, _ in cards.query(where, order_by="san")]
+            for where in queries
+        ]
+
+    unindexed = results()
+    assert unindexed == [["0"], ["1"], ["2", "0"]]
+    cards.index_attributes(template)
+    assert results() == unindexed
+
+    # Columns declared with a type by earlier versions are rebuilt untyped.
+    conn = cards.cards_manager.conn
+    conn.execute('DROP INDEX "cards_attr:san"')
+    conn.execute('ALTER TABLE cards DROP COLUMN "attr:san"')
+    conn.execute(
+        'ALTER TABLE cards ADD COLUMN "attr:san" INTEGER '
+        "GENERATED ALWAYS AS (json_extract(card_data, '$.\"san\"')) VIRTUAL"
+    )
+    conn.execute('CREATE INDEX "cards_attr:san" ON cards (mode, "attr:san")')
+    conn.commit()
+    cards = NormalizedCards("coc", pool=cards.cards_manager.pool)
+    columns = conn.execute("PRAGMA table_xinfo(cards)").fetchall()
+    assert [column[2] for column in columns if column[1] == "attr:san"] == [""]
+    assert results() == unindexed
+
+
+def test_shared_cards_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(CardsPool, "_cards_pool", {})
+    monkeypatch.setattr(CardsPool, "_cache_cards_pool", {})
+    monkeypatch.setattr(CardsPool, "_shared_pool", None)
+    monkeypatch.setattr(CardsPool, "_shared_cache_pool", None)
+    monkeypatch.setattr(CardsPool, "_registered", {})
+    monkeypatch.setattr(CardsPool, "_last_access", {})
+    CardsPool.share(tmp_path / "cards.db")
+
+    CardsPool.register("coc")
+    CardsPool.register("dnd")
+    coc, dnd = CardsPool.get("coc"), CardsPool.get("dnd")
+    assert isinstance(coc, NormalizedCards) and isinstance(dnd, NormalizedCards)
+    assert coc.cards_manager.pool is dnd.cards_manager.pool
+
+    coc.new("0", {"name": "简律纯"})
+    dnd.new("0", {"name": "雪花"})
+    dnd.new("0", {"name": "欧若可"})
+    assert coc.getall("0") == [{"name": "简律纯"}]
+    assert dnd.count("0") == 2
+
+    CardsPool.reload("coc")
+    assert CardsPool.get("coc") is coc
+    assert [path.name for path in tmp_path.glob("*.db")] == ["cards.db"]
+
+
+def test_cards_coherence(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first = Cards("coc", store=True)
+    second = Cards("coc", store=True)
+
+    first.new("0", {"name": "简律纯"})
+    assert second.get("0") == {"name": "简律纯"}
+
+    second.update("1", attributes={"name": "雪花"})
+    second.update("0", attributes={"age": 18})
+    assert first.get("1") == {"name": "雪花"}
+    assert first.get("0") == {"name": "简律纯", "age": 18}
+
+    first.delete("0")
+    assert second.getall("0") is None
+    assert second.getall("1") == [{"name": "雪花"}]
+    assert Cards("coc", store=True).data == {"1": [{"name": "雪花"}]}
+
+
+def test_cards_sync_after_delete(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first = Cards("coc", store=True)
+    second = Cards("coc", store=True)
+
+    second.new("u1", {"name": "简律纯"})
+    second.new("u2", {"name": "雪花"})
+    assert first.get("u2") == {"name": "雪花"}
+
+    # Deleting the newest row must not hand its version out again.
+    second.delete("u2")
+    second.update("u1", attributes={"age": 18})
+    assert first.get("u1") == {"name": "简律纯", "age": 18}
+    assert first.getall("u2") is None
+
+    first.update("u1", attributes={"san": 60})
+    assert second.get("u1") == {"name": "简律纯", "age": 18, "san": 60}
+
+
+@pytest.mark.parametrize("cards_class", [Cards, NormalizedCards])
+def test_ndjson(tmp_path, cards_class):
+    source = cards_class("coc")
+    for user_id in range(25):
+        source.new(str(user_id), {"name": "简律纯", "luck": user_id})
+        source.new(str(user_id), {"name": "雪花"})
+        source.select(str(user_id), 1)
+    assert source.export_ndjson(tmp_path / "coc.ndjson", batch_size=4) == 25
+
+    target = cards_class("coc")
+    target.new("0", {"name": "欧若可"})
+    assert target.import_ndjson(tmp_path / "coc.ndjson", batch_size=4) == 25
+    assert target.getall("0") == [{"name": "简律纯", "luck": 0}, {"name": "雪花"}]
+    assert target.get("24") == {"name": "雪花"}
+
+    with open(tmp_path / "invalid.ndjson", "w", encoding="utf-8") as file:
+        file.write(
+            json.dumps({"user_id": "0", "cards": [{}] * (MAX_CARDS_PER_USER + 1)})
+        )
+    with pytest.raises(TooManyCardsError):
+        target.import_ndjson(tmp_path / "invalid.ndjson")
+
+
+@pytest.mark.parametrize(
+    "open_cards",
+    [
+        lambda path: Cards("threads"),
+        lambda path: NormalizedCards("threads"),
+        lambda path: JournaledCards("threads", path / "threads.journal"),
+    ],
+    ids=["cards", "normalized", "journaled"],
+)
+def test_cards_threads(tmp_path, open_cards):
+    cards = open_cards(tmp_path)
+    users = [str(user_id) for user_id in range(50)]
+    errors = []
+
+    def worker(seed: int):
+        try:
+            for user_id in users:
+                cards.new(user_id, {"seed": seed})
+                cards.select(user_id, 0)
+                cards.update(user_id, attributes={"hp": seed})
+        except Exception as err:
+            errors.append(err)
+
+    threads = [
+        threading.Thread(target=worker, args=(seed,))
+        for seed in range(MAX_CARDS_PER_USER)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    stored = {user_id: data for user_id, data, _ in cards.cards_manager.iterate()}
+    for user_id in users:
+        seeds = sorted(card["seed"] for card in cards.getall(user_id))
+        assert seeds == list(range(MAX_CARDS_PER_USER))
+        assert stored[user_id] == cards.getall(user_id)
+        with pytest.raises(TooManyCardsError):
+            cards.new(user_id)
+    cards.close()
+
+
+def test_cards_pool_eviction(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(CardsPool, "_cards_pool", {})
+    monkeypatch.setattr(CardsPool, "_cache_cards_pool", {})
+    monkeypatch.setattr(CardsPool, "_evicted", weakref.WeakValueDictionary())
+    monkeypatch.setattr(CardsPool, "_evicted_cache", weakref.WeakValueDictionary())
+    monkeypatch.setattr(CardsPool, "_shared_pool", None)
+    monkeypatch.setattr(CardsPool, "_registered", {})
+    monkeypatch.setattr(CardsPool, "_last_access", {})
+    monkeypatch.setattr(CardsPool, "max_size", 2)
+
+    for mode in ("coc", "dnd", "scp"):
+        CardsPool.register(mode)
+    assert CardsPool.sizes() == {"registered": 3, "cards": 2, "cache": 2}
+
+    coc = CardsPool.get("coc")
+    coc.new("0", {"name": "简律纯"})
+    CardsPool.get_cache("coc").new("0", {"name": "雪花"})
+    CardsPool.get("dnd")
+    CardsPool.get("scp")
+    assert "coc" not in CardsPool._cards_pool
+    assert CardsPool._cache_cards_pool["coc"].get("0") == {"name": "雪花"}
+
+    # Evicted cards held by a caller stay open and are handed out again.
+    coc.update("0", attributes={"age": 18})
+    assert CardsPool.get("coc") is coc
+    CardsPool.get("dnd")
+    CardsPool.get("scp")
+    manager = coc.cards_manager
+    del coc
+    gc.collect()
+    assert manager.pool.closed
+    assert CardsPool.get("coc").get("0") == {"name": "简律纯", "age": 18}
+    assert CardsPool.get("unknown") is None
+
+    monkeypatch.setattr(CardsPool, "idle_timeout", 0)
+    CardsPool.get("dnd")
+    assert list(CardsPool._cards_pool) == ["dnd"]
@@ -1,4 +1,5 @@
-from diceutils.renderer import Renderer, Messages, Role
+from diceutils.logging import Logger
+from diceutils.renderer import ExportConfig, Renderer, Messages, Role, log_messages
 from diceutils.renderer.docx import DocxRenderer
 from diceutils.renderer.html import HTMLRenderer
 
@@ -64,3 +65,58 @@ def test_render():
 
     Renderer.render(messages, HTMLRenderer())
     Renderer.render(messages, DocxRenderer())
+
+
+def test_render_log():
+    logger = Logger(":memory:")
+    for index in range(100):
+        logger.add(
+            "0",
+            0,
+            user_id=str(index % 3),
+            user_role=("KP", "PL", "DICER")[index % 3],
+            card_name=f"调查员{index % 3}",
+            data=[
+                {"type": "text", "data": f"“第{index}句”"},
+                {"type": "image", "data": {"url": "https://example.com/a.png"}},
+            ],
+            message_sequence=str(index),
+        )
+
+    messages = log_messages(logger.iterload("0", 0, batch_size=10))
+    assert not isinstance(messages, list)
+    renderer = Renderer.render(messages, HTMLRenderer())
+    assert renderer.plain_text.count("调查员1") == 33
+    assert "第99句" in renderer.plain_text
+    logger.rescue()
+
+
+def test_log_rolls():
+    logger = Logger(":memory:")
+    messages = [
+        [{"type": "text", "data": " .r 侦查"}],
+        [{"type": "text", "data": "\u3000。r3d6"}],
+        [{"type": "text", "data": "\n\t/sc 1/1d6"}],
+        [{"type": "text", "data": {"text": ".ra 聆听"}}],
+        [{"type": "text", "data": "推开木门"}, {"type": "text", "data": ".r 侦查"}],
+        [{"type": "image", "data": {"url": "https://example.com/a.png"}}],
+        [
+            {"type": "image", "data": {"url": "https://example.com/a.png"}},
+            {"type": "text", "data": ".r 侦查"},
+        ],
+        [{"type": "at", "data": "0"}, {"type": "text", "data": "。r"}],
+    ]
+    for index, data in enumerate(messages):
+        logger.add(
+            "0", 0, user_id="0", user_role="PL", data=data, message_sequence=str(index)
+        )
+
+    config = ExportConfig()
+    config.display_dice_command = False
+    hidden = [
+        Renderer.parse_message(message, config) is None
+        for message in log_messages(logger.iterload("0", 0))
+    ]
+    assert hidden == [True, True, True, True, False, False, False, True]
+    assert logger.stats("0", 0)[0]["rolls"] == sum(hidden)
+    logger.rescue()
@@ -1,5 +1,9 @@
-from diceutils.status import StatusPool, StatusManager
+from diceutils.status import Status, StatusPool, StatusManager
+import asyncio
+import gc
 import pytest
+import threading
+import weakref
 
 
 @pytest.fixture
@@ -29,3 +33,193 @@ def test_set_str(status):
     assert status.get("0", "keeper") == "1264983312"
     status.set("0", "player", status=["1264983312", "3582529065"])
     assert status.get("0", "player") == ["1264983312", "3582529065"]
+
+
+def test_coherence(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first = Status("dicergirl")
+    second = Status("dicergirl")
+
+    first.set("0", "log_on", True, durable=True)
+    assert second.get("0", "log_on")
+    second.set("1", "sleep", True)
+    second.set("0", "log_on", False)
+    second.flush()
+    assert first.get("1", "sleep")
+    assert not first.get("0", "log_on")
+
+
+def test_pool_eviction(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(StatusPool, "_status_pool", {})
+    monkeypatch.setattr(StatusPool, "_evicted", weakref.WeakValueDictionary())
+    monkeypatch.setattr(StatusPool, "_registered", set())
+    monkeypatch.setattr(StatusPool, "_last_access", {})
+    monkeypatch.setattr(StatusPool, "max_size", 1)
+
+    first = StatusPool.register("first")
+    first.set("0", "log_on", True)
+    StatusPool.register("second")
+    assert StatusPool.sizes() == {"registered": 2, "status": 1}
+
+    # Evicted status held by a caller stays open and is handed out again.
+    first.set("1", "sleep", True)
+    assert StatusPool.get("first") is first
+    StatusPool.get("second")
+    manager = first.status_manager
+    del first
+    gc.collect()
+    assert manager.pool.closed
+
+    assert StatusPool.get("first").get("0", "log_on")
+    assert StatusPool.get("first").get("1", "sleep")
+    assert StatusPool.get("unknown") is None
+
+
+def test_coalesced_writes(tmp_path):
+    manager = StatusManager(tmp_path / "status.db", flush_interval=60)
+    for value in range(100):
+        manager.save("0", "sleep", status=str(value))
+    manager.save("1", "log_on", status="True")
+    assert StatusManager(tmp_path / "status.db").load() == {}
+
+    manager.flush()
+    assert manager.conn.execute("SELECT MAX(version) FROM status").fetchone()[0] == 2
+    assert StatusManager(tmp_path / "status.db").load() == {
+        "0": {"sleep": 99},
+        "1": {"log_on": True},
+    }
+
+    manager.save("0", "dnd", status="True", durable=True)
+    assert StatusManager(tmp_path / "status.db").load()["0"]["dnd"] is True
+
+    manager.save("0", "sleep", status="0")
+    manager.close()
+    assert StatusManager(tmp_path / "status.db").load()["0"]["sleep"] == 0
+
+
+def test_lazy_sessions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first = Status("dicergirl")
+    first.set("0", "log_on", True)
+    first.set("1", "sleep", True)
+    first.flush()
+
+    second = Status("dicergirl", session_ttl=60, max_sessions=2)
+    assert second.data == {}
+    assert second.get("0", "log_on")
+    assert list(second.data) == ["0"]
+
+    for session_id in range(100, 200):
+        assert not second.get(str(session_id), "log_on")
+    assert len(second.data) == 2
+    assert second.data["199"] is second.data["198"]
+
+    second.set("199", "dnd", True)
+    assert second.data["199"] == {"dnd": True}
+    assert second.get("1", "sleep")
+
+    second.session_ttl = 0
+    assert second.get("0", "log_on")
+    assert list(second.data) == ["0"]
+
+    plan = second.status_manager.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT name, status FROM status WHERE session_id = ?",
+        ("0",),
+    ).fetchall()
+    assert "USING INDEX" in str(plan)
+
+
+def test_bulk_status(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    status = Status("dicergirl")
+    for session_id in range(1200):
+        status.set(str(session_id), "log_on", session_id % 3 == 0)
+    status.set("0", "keeper", "1264983312")
+
+    session_ids = [str(session_id) for session_id in range(1300)]
+    values = status.get_many(session_ids, "log_on")
+    assert list(values) == session_ids
+    assert [session_id for session_id, value in values.items() if value] == [
+        str(session_id) for session_id in range(0, 1200, 3)
+    ]
+    assert sorted(status.sessions_where("log_on", True), key=int) == [
+        str(session_id) for session_id in range(0, 1200, 3)
+    ]
+    assert status.sessions_where("keeper", "1264983312") == ["0"]
+    assert len(status.sessions_where("log_on", False)) == 800
+
+    plan = status.status_manager.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT session_id FROM status WHERE name = ? AND status = ?",
+        ("log_on", "True"),
+    ).fetchall()
+    assert "status_name" in str(plan)
+
+
+def test_subscriptions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(StatusPool, "_status_pool", {})
+    monkeypatch.setattr(StatusPool, "_registered", set())
+    monkeypatch.setattr(StatusPool, "_last_access", {})
+    monkeypatch.setattr(StatusPool, "_subscriptions", {})
+    status = StatusPool.register("dicergirl")
+
+    exact, named, patterned = [], [], []
+    subscription = status.subscribe("log_on", lambda *event: exact.append(event), "0")
+    StatusPool.subscribe("dicergirl", "log_on", lambda *event: named.append(event))
+    status.subscribe("log_*", lambda *event: patterned.append(event))
+
+    status.set("0", "log_on", True)
+    status.set("1", "log_on", False)
+    status.set("0", "log_file", "a.log")
+    status.set("0", "sleep", True)
+    assert exact == [("0", "log_on", True)]
+    assert named == [("0", "log_on", True), ("1", "log_on", False)]
+    assert patterned == [
+        ("0", "log_on", True),
+        ("1", "log_on", False),
+        ("0", "log_file", "a.log"),
+    ]
+
+    subscription.cancel()
+    StatusPool.evict("dicergirl")
+    StatusPool.get("dicergirl").set("0", "log_on", False)
+    assert exact == [("0", "log_on", True)]
+    assert named[-1] == ("0", "log_on", False)
+
+    other = Status("dicergirl")
+    other.set("2", "log_on", True, durable=True)
+    StatusPool.get("dicergirl").get("2", "log_on")
+    assert named[-1] == ("2", "log_on", True)
+
+    # Own flushed writes are not replayed when syncing a foreign write.
+    named.clear()
+    status = StatusPool.get("dicergirl")
+    status.set("3", "log_on", True)
+    other.set("4", "log_on", False, durable=True)
+    status.flush()
+    assert not status.get("4", "log_on")
+    status.set("5", "log_on", True, durable=True)
+    other.set("6", "log_on", True, durable=True)
+    assert status.get("6", "log_on")
+    assert named == [
+        ("3", "log_on", True),
+        ("4", "log_on", False),
+        ("5", "log_on", True),
+        ("6", "log_on", True),
+    ]
+
+
+def test_subscription_queue(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    status = Status("dicergirl")
+
+    async def main():
+        queue = asyncio.Queue()
+        status.subscribe("sleep", queue)
+        thread = threading.Thread(target=status.set, args=("0", "sleep", True))
+        thread.start()
+        thread.join()
+        return await asyncio.wait_for(queue.get(), 1)
+
+    assert asyncio.run(main()) == ("0", "sleep", True)